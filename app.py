@@ -1,13 +1,13 @@
 import streamlit as st
 import os
 import sys
+import uuid
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
-import chromadb
 
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
-from llm_integration import enrich_movie_recommendations, optimize_search_query
+from search import N_RESULTS, SearchError, load_engine
+from profiling import maybe_profile
 
 st.set_page_config(
     page_title="Film Suggester AI",
@@ -77,23 +77,40 @@ st.markdown("""
 @st.cache_resource
 def load_models():
     """
-    Carga el modelo y conecta a ChromaDB.
-    Se ejecuta solo una vez gracias a @st.cache_resource
+    Carga el motor de búsqueda: modelo, conexión a ChromaDB e índices.
+    Se ejecuta solo una vez gracias a @st.cache_resource; si la API HTTP
+    corre en este proceso (SEARCH_API_PORT), comparte el mismo motor.
     """
-    print("🔄 (Re)Cargando modelos y conexión a DB...")
-    model = SentenceTransformer('Alibaba-NLP/gte-multilingual-base', trust_remote_code=True)
+    engine = load_engine()
     
-    client = chromadb.PersistentClient(path='./chroma_db')
-    collection = client.get_collection(name='movies')
+    api_port = os.getenv("SEARCH_API_PORT")
+    if api_port:
+        from search_api import start_background_server
+        start_background_server(engine, port=int(api_port))
+        print(f"🌐 API de búsqueda escuchando en el puerto {api_port}")
     
-    return model, collection
+    return engine
 
 try:
-    model, collection = load_models()
+    engine = load_models()
 except Exception as e:
     st.error(f"Error conectando con la base de datos: {e}")
     st.stop()
 
+def report_fast_path(index):
+    """Muestra y registra la tasa de aciertos y la latencia ahorrada"""
+    stats = index.stats
+    lookups = stats['lookups'] or 1
+    avg_slow_ms = engine.stats['slow_ms'] / max(engine.stats['slow_searches'], 1)
+    saved_s = stats['hits'] * avg_slow_ms / 1000
+    print(f"⚡ Ruta rápida: {stats['hits']}/{stats['lookups']} aciertos, "
+          f"{stats['lookup_ms'] / lookups:.3f} ms/consulta, ~{saved_s:.1f}s ahorrados")
+    with st.sidebar:
+        st.markdown("### ⚡ Ruta rápida")
+        st.metric("Tasa de aciertos", f"{index.hit_rate():.0%}")
+        st.metric("Latencia de búsqueda", f"{stats['lookup_ms'] / lookups:.3f} ms")
+        st.metric("Tiempo ahorrado (estimado)", f"{saved_s:.1f} s")
+
 # Título de la aplicación
 st.title("🎬 Film Suggester AI")
 st.markdown("Encuentra tu próxima película favorita usando búsqueda semántica avanzada.")
@@ -107,113 +124,153 @@ query = st.text_input(
 
 # Búsqueda
 if query:
-    with st.spinner("🤖 Optimizando tu búsqueda con IA..."):
-        optimized_query = optimize_search_query(query)
-    
-    # Mostrar queries si son diferentes
-    if optimized_query.lower().strip() != query.lower().strip():
-        st.info(f"💡 **Query original:** {query}\n\n🎯 **Query optimizada por IA:** {optimized_query}")
-    
-    with st.spinner("🎬 Buscando las mejores coincidencias..."):
-        query_embedding = model.encode(optimized_query).tolist()
-        
+    # La búsqueda (y su cursor) se guarda en la sesión: "Mostrar más" pagina
+    # los candidatos ya ordenados sin volver a llamar al LLM ni al encoder
+    if st.session_state.get('search_query') != query:
         try:
-            results = collection.query(
-                query_embeddings=[query_embedding],
-                n_results=20
-            )
-        except Exception as e:
+            # ?profile=1 en la URL (o SEARCH_PROFILE) perfila esta búsqueda
+            with st.spinner("🎬 Buscando las mejores coincidencias..."), \
+                    maybe_profile(query, st.query_params.get('profile'), engine.metrics) as session:
+                response = engine.search(query)
+            if session:
+                st.caption(f"🔬 Perfil guardado en `{session.path}`")
+        except SearchError as e:
             st.error("⚠️ Error de conexión con la base de datos. Por favor, recarga la página (F5) para restablecer la conexión.")
-            print(f"Error query: {e}")
+            print(e)
             st.stop()
+        st.session_state.search_query = query
+        st.session_state.search_response = response
+        st.session_state.shown = N_RESULTS
+        st.session_state.similar = {}
+        st.session_state.recommendation = None
+    
+    response = st.session_state.search_response
+    cursor = response['cursor']
+    if engine.memory:
+        session_id = st.session_state.setdefault('session_id', uuid.uuid4().hex)
+        engine.memory.track_session(session_id, dict(st.session_state), exclude=(engine,))
+    top_results = response['results']
+    
+    if response['cached']:
+        # Consulta repetida: sin encoder, ChromaDB ni LLM
+        st.caption(f"⚡ Resultados servidos desde la caché "
+                   f"(tasa de aciertos {engine.result_cache.hit_rate():.0%})")
+    
+    fast_match = response['fast_match']
+    if fast_match:
+        kind = "la película" if fast_match['kind'] == 'title' else "el reparto de"
+        st.info(f"⚡ Coincidencia directa con {kind} **{fast_match['name']}** "
+                f"({fast_match['confidence']:.0%}) — sin expansión IA ni embeddings")
+    
+    if response['filters']:
+        st.caption(f"🎛️ Filtros aplicados: {response['filters']}")
+    
+    # Mostrar las variantes si el LLM generó alguna
+    if len(response['variants']) > 1:
+        expanded = "\n".join(f"- {v}" for v in response['variants'][1:])
+        st.info(f"💡 **Query original:** {query}\n\n🎯 **Variantes generadas por IA:**\n{expanded}")
+    
+    if engine.fuzzy_index and not response['cached'] and st.session_state.shown == N_RESULTS:
+        report_fast_path(engine.fuzzy_index)
+    
+    if not response['cached'] and response['timings']:
+        with st.sidebar.expander("⏱️ Tiempos de la búsqueda"):
+            for span in response['timings']:
+                status = "" if span['outcome'] == 'ok' else f" ⚠️ {span['outcome']}"
+                st.text(f"{span['stage']:<13} {span['ms']:>9.1f} ms{status}")
+    
+    # Última muestra del monitor de memoria (se toma en segundo plano)
+    if engine.memory and engine.memory.last:
+        snapshot = engine.memory.last
+        with st.sidebar.expander(f"🧠 Memoria: {snapshot['rss_mb']:.0f} MB"):
+            for name, size_mb in snapshot['components'].items():
+                st.text(f"{name:<24} {size_mb:>8.1f} MB")
+            for alert in snapshot['over_budget']:
+                st.warning(f"{alert['name']} supera su presupuesto ({alert['mb']:.0f}/{alert['budget_mb']:.0f} MB)")
     
     # Mostrar resultados
     st.markdown("---")
     st.subheader(f"🎯 Resultados para: *'{query}'*")
     
-    if results and results['metadatas'] and len(results['metadatas'][0]) > 0:
-        raw_metadatas = results['metadatas'][0]
-        raw_distances = results['distances'][0]
-        
-        # Lógica de Re-ranking (Similitud + Rating)
-        scored_results = []
-        for meta, dist in zip(raw_metadatas, raw_distances):
-            similarity = max(0, 1 - dist)
-            
-            rating = float(meta.get('rating', 0.0))
-            if rating == 0:
-                rating = float(meta.get('vote_average', 0.0)) / 2.0
-            norm_rating = min(max(rating / 5.0, 0), 1)
-            #reranking 
-            final_score = (similarity * 0.6) + (norm_rating * 0.4)
-            
-            scored_results.append({
-                'metadata': meta,
-                'distance': dist,
-                'final_score': final_score,
-                'rating': rating
-            })
+    if top_results:
+        if st.session_state.recommendation is None:
+            with st.spinner("🤖 Generando recomendaciones personalizadas con IA..."):
+                # '' = el LLM no respondió a tiempo (no se reintenta en cada rerun)
+                st.session_state.recommendation = engine.recommend(response) or ''
+        ai_recommendation = st.session_state.recommendation
         
-        scored_results.sort(key=lambda x: x['final_score'], reverse=True)
-        
-        top_results = scored_results[:6]
-        
-        metadatas = [r['metadata'] for r in top_results]
-        distances = [r['distance'] for r in top_results]
-        
-        # Preparar datos para LLM
-        movie_results = []
-        for metadata, distance in zip(metadatas, distances):
-            match_score = max(0, (1 - distance) * 100)
-            movie_results.append({
-                'title': metadata['title'],
-                'overview': metadata['overview'],
-                'genres': metadata.get('genres_text', 'N/A'),
-                'similarity': match_score
-            })
-        
-        with st.spinner("🤖 Generando recomendaciones personalizadas con IA..."):
-            ai_recommendation = enrich_movie_recommendations(query, movie_results)
-        
-        # Mostrar recomendación del LLM
-        st.markdown(f"""
-        <div class="ai-recommendation">
-            <span class="ai-badge">🤖 RECOMENDACIÓN IA - NVIDIA NIMs + DeepSeek</span>
-            <div style="margin-top: 10px; line-height: 1.6;">
-                {ai_recommendation}
+        # Mostrar recomendación del LLM (sin ella, solo las tarjetas)
+        if ai_recommendation:
+            st.markdown(f"""
+            <div class="ai-recommendation">
+                <span class="ai-badge">🤖 RECOMENDACIÓN IA - NVIDIA NIMs + DeepSeek</span>
+                <div style="margin-top: 10px; line-height: 1.6;">
+                    {ai_recommendation}
+                </div>
             </div>
-        </div>
-        """, unsafe_allow_html=True)
+            """, unsafe_allow_html=True)
+        else:
+            st.caption("🤖 La recomendación de IA no está disponible ahora mismo")
+        if 'llm_expand' in response['degraded']:
+            st.caption("🤖 Búsqueda hecha con tu consulta original: la expansión con IA tardó demasiado")
         
         st.markdown("### 🎬 Películas Encontradas")
         
-        # Crear grid de 3 columnas
-        for i in range(0, len(metadatas), 3):
-            cols = st.columns(3)
-            
-            for j in range(3):
-                idx = i + j
-                if idx < len(metadatas):
-                    metadata = metadatas[idx]
-                    distance = distances[idx]
-                    
-                    match_score = max(0, (1 - distance) * 100)
-                    
-                    with cols[j]:
-                        # Crear tarjeta con HTML
-                        card_html = f"""
-                        <div class="movie-card">
-                            <div class="card-content">
-                                <span class="movie-icon">🍿</span>
-                                <div class="movie-title">{metadata['title']}</div>
-                                <span class="match-score">🎯 {match_score:.1f}% Match</span>
-                            </div>
-                        </div>
-                        """
-                        st.markdown(card_html, unsafe_allow_html=True)
+        try:
+            shown_results = cursor.fetch(st.session_state.shown)
+        except SearchError as e:
+            print(e)
+            shown_results = cursor.pool[:st.session_state.shown]
+        metadatas = [r['metadata'] for r in shown_results]
+        distances = [r['distance'] for r in shown_results]
+        
+        # Solo se consultan los vecinos de las películas nuevas en pantalla
+        similar = st.session_state.similar
+        missing = [r.get('id') for r in shown_results if r.get('id') not in similar]
+        try:
+            fetched = engine.similar_many(missing)
+            similar.update({movie_id: fetched.get(movie_id) for movie_id in missing})
+        except SearchError as e:
+            print(e)
+        
+        # Crear grid de 3 columnas (el tiempo de render se mide como una etapa más)
+        with engine.metrics.span('render'):
+            for i in range(0, len(metadatas), 3):
+                cols = st.columns(3)
+                
+                for j in range(3):
+                    idx = i + j
+                    if idx < len(metadatas):
+                        metadata = metadatas[idx]
+                        distance = distances[idx]
                         
-                        with st.expander("📖 Leer trama"):
-                            st.write(metadata['overview'])
+                        match_score = max(0, (1 - distance) * 100)
+                        
+                        with cols[j]:
+                            # Crear tarjeta con HTML
+                            card_html = f"""
+                            <div class="movie-card">
+                                <div class="card-content">
+                                    <span class="movie-icon">🍿</span>
+                                    <div class="movie-title">{metadata['title']}</div>
+                                    <span class="match-score">🎯 {match_score:.1f}% Match</span>
+                                </div>
+                            </div>
+                            """
+                            st.markdown(card_html, unsafe_allow_html=True)
+                            
+                            with st.expander("📖 Leer trama"):
+                                st.write(metadata['overview'])
+                            
+                            if similar.get(shown_results[idx].get('id')):
+                                with st.expander("🎞️ Películas similares"):
+                                    for movie in similar[shown_results[idx]['id']]:
+                                        st.markdown(f"- {movie['title']} ({movie['score']:.0%})")
+        
+        if cursor.has_more(len(shown_results)):
+            if st.button("➕ Mostrar más"):
+                st.session_state.shown += N_RESULTS
+                st.rerun()
         
     else:
         st.warning("⚠️ No se encontraron resultados")
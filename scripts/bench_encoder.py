@@ -0,0 +1,121 @@
+"""
+Prueba de carga del encoder: llamadas individuales a model.encode desde
+varios hilos (como hace cada sesión de Streamlit) frente a BatchEncoder.
+
+Uso:
+    python scripts/bench_encoder.py --threads 16 --queries 20
+    python scripts/bench_encoder.py --batch-size 64 --window-ms 10
+    python scripts/bench_encoder.py --simulated   # Sin descargar el modelo
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from batch_encoder import BatchEncoder, ENCODER_BATCH_SIZE, ENCODER_WINDOW_MS
+
+QUERIES = [
+    "película de terror psicológica de los 90",
+    "comedia romántica en París",
+    "acción y explosiones en el espacio",
+    "thriller psicológico con giros",
+    "aventuras de piratas",
+    "historia de amor imposible",
+    "una película triste sobre pérdida",
+    "animación para toda la familia",
+]
+
+
+class SimulatedModel:
+    """
+    Coste fijo por llamada más un coste por texto, con un lock que imita la
+    contención entre forward passes concurrentes.
+    """
+
+    def __init__(self, call_ms=8.0, text_ms=0.5, dim=768):
+        self.call_ms = call_ms
+        self.text_ms = text_ms
+        self.dim = dim
+        self.lock = threading.Lock()
+
+    def encode(self, sentences, show_progress_bar=False):
+        texts = [sentences] if isinstance(sentences, str) else sentences
+        with self.lock:
+            time.sleep((self.call_ms + self.text_ms * len(texts)) / 1000)
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        return embeddings[0] if isinstance(sentences, str) else embeddings
+
+
+def run(encode, threads, queries_per_thread):
+    """Lanza `threads` clientes que codifican queries de una en una"""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(worker_id):
+        for i in range(queries_per_thread):
+            query = QUERIES[(worker_id + i) % len(QUERIES)]
+            start = time.perf_counter()
+            encode(query)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(client, range(threads)))
+    total = time.perf_counter() - start
+
+    return {
+        'qps': len(latencies) / total,
+        'p50': float(np.percentile(latencies, 50)),
+        'p95': float(np.percentile(latencies, 95)),
+    }
+
+
+def report(name, result):
+    print(f"   {name:<22} {result['qps']:>8.1f} q/s   "
+          f"p50 {result['p50']:>7.1f} ms   p95 {result['p95']:>7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--queries', type=int, default=20, help="Queries por hilo")
+    parser.add_argument('--batch-size', type=int, default=ENCODER_BATCH_SIZE)
+    parser.add_argument('--window-ms', type=float, default=ENCODER_WINDOW_MS)
+    parser.add_argument('--model', default='Alibaba-NLP/gte-multilingual-base')
+    parser.add_argument('--simulated', action='store_true', help="Usar un modelo simulado")
+    args = parser.parse_args()
+
+    if args.simulated:
+        model = SimulatedModel()
+    else:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(args.model, trust_remote_code=True)
+    model.encode(QUERIES)  # Calentamiento
+
+    print("="*60)
+    print(f"⚙️  BENCHMARK DEL ENCODER ({args.threads} hilos × {args.queries} queries)")
+    print("="*60)
+
+    direct = run(lambda q: model.encode(q, show_progress_bar=False), args.threads, args.queries)
+    report("model.encode directo", direct)
+
+    encoder = BatchEncoder(model, max_batch_size=args.batch_size, window_ms=args.window_ms)
+    batched = run(encoder.encode, args.threads, args.queries)
+    encoder.close()
+    report(f"BatchEncoder ({args.batch_size}, {args.window_ms:g} ms)", batched)
+
+    print(f"\n📦 Tamaño medio de lote: {encoder.avg_batch_size():.1f}")
+    print(f"🚀 Throughput: x{batched['qps'] / direct['qps']:.2f}")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
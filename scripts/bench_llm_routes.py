@@ -0,0 +1,148 @@
+"""
+Benchmark de las rutas del LLM para la expansión de queries: latencia,
+tokens, errores y formato de las variantes de cada modelo por separado y
+de la cadena configurada (LLM_EXPAND_ROUTES), sobre las queries de
+data/eval_queries.json.
+
+Por defecto usa el LLM simulado (scripts/stub_llm.py) con un perfil de
+latencia por modelo parecido al de NVIDIA NIMs; con --llm-url mide los
+modelos reales. Para medir el efecto en la calidad de la búsqueda, usa
+scripts/evaluate.py con cada modelo en LLM_EXPAND_ROUTES.
+
+Uso:
+    python scripts/bench_llm_routes.py
+    python scripts/bench_llm_routes.py --llm-url https://integrate.api.nvidia.com/v1 --concurrency 2
+    python scripts/bench_llm_routes.py --models meta/llama-3.1-8b-instruct deepseek-ai/deepseek-r1
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', 'src'))
+
+from load_test import DEFAULT_QUERIES_FILE, load_queries
+from stub_llm import StubLLMServer
+
+# Perfiles del LLM simulado (latencia hasta el primer token, tokens/s y
+# tokens de razonamiento antes de la respuesta)
+STUB_MODELS = {
+    'meta/llama-3.1-8b-instruct': {'ttft_ms': 150, 'tokens_per_s': 150},
+    'mistralai/mistral-7b-instruct-v0.3': {'ttft_ms': 200, 'tokens_per_s': 120},
+    'meta/llama-3.3-70b-instruct': {'ttft_ms': 350, 'tokens_per_s': 60},
+    'deepseek-ai/deepseek-r1': {'ttft_ms': 500, 'tokens_per_s': 100, 'reasoning_tokens': 150},
+}
+
+
+def bench_route(name, routes, queries, concurrency, budget_ms):
+    """
+    Expande todas las queries con la cadena `routes`.
+
+    Returns:
+        Dict con la latencia de extremo a extremo (p50/p95), la fracción de
+        queries con variantes en el formato ES/EN, los fallos y los tokens
+    """
+    import llm_integration
+    from llm_guard import LLMGuard, LLMUnavailable
+    from llm_router import LLM_ROUTER
+
+    # Estado limpio por configuración: contadores y circuit breakers
+    LLM_ROUTER.routes = {**LLM_ROUTER.routes, 'expand': routes}
+    LLM_ROUTER.stats = {}
+    LLM_ROUTER.guard = LLMGuard()
+
+    def expand(query):
+        start = time.perf_counter()
+        try:
+            variants = llm_integration.request_query_variants(query, budget_ms=budget_ms)
+        except LLMUnavailable:
+            variants = None
+        return (time.perf_counter() - start) * 1000, variants
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(expand, queries))
+
+    latencies = [ms for ms, _ in outcomes]
+    answered = [v for _, v in outcomes if v is not None]
+    routes_summary = LLM_ROUTER.summary().get('expand', {})
+    ok = sum(s['ok'] for s in routes_summary.values())
+    return {
+        'route': name,
+        'queries': len(queries),
+        'failed': len(queries) - len(answered),
+        'format_ok': sum(len(v) == 3 for v in answered) / len(queries),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'completion_tokens': sum(s['completion_tokens'] for s in routes_summary.values()) / ok if ok else 0.0,
+        'fallbacks': sum(s['fallbacks'] for s in routes_summary.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', nargs='+', help="Modelos a comparar (por defecto, los del LLM simulado)")
+    parser.add_argument('--queries', default=DEFAULT_QUERIES_FILE, help="JSON de evaluación o texto (una por línea)")
+    parser.add_argument('--limit', type=int, help="Usar solo las primeras N queries")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--budget-ms', type=float, default=30000.0,
+                        help="Presupuesto de cada modelo por separado (la cadena usa LLM_EXPAND_BUDGET_MS)")
+    parser.add_argument('--llm-url', help="LLM externo (por defecto se arranca uno simulado)")
+    parser.add_argument('--output', help="Guardar los resultados en un CSV")
+    args = parser.parse_args()
+
+    stub = None
+    if args.llm_url:
+        os.environ['NVIDIA_BASE_URL'] = args.llm_url
+    else:
+        # Antes de importar llm_integration: lee la URL al importarse
+        stub = StubLLMServer(models=STUB_MODELS, jitter=0.2).__enter__()
+        os.environ['NVIDIA_BASE_URL'] = stub.base_url
+        os.environ.setdefault('NVIDIA_API_KEY', 'stub')
+
+    from llm_guard import LLM_EXPAND_BUDGET_MS
+    from llm_router import Route, routes_from_env
+
+    queries = load_queries(args.queries)[:args.limit]
+    models = args.models or list(STUB_MODELS)
+    chain = routes_from_env()['expand']
+
+    print("="*78)
+    print(f"🔀 BENCHMARK DE RUTAS DEL LLM: expansión de {len(queries)} queries "
+          f"({stub.base_url + ' simulado' if stub else args.llm_url})")
+    print(f"   Cadena configurada: {' -> '.join(r.model for r in chain)} ({LLM_EXPAND_BUDGET_MS:g} ms)")
+    print("="*78)
+    print(f"\n   {'ruta':<38} {'fallos':>6} {'formato':>8} {'p50 ms':>8} {'p95 ms':>8} {'tokens':>7} {'fallb.':>6}")
+
+    configs = [(model, [Route(model, None)], args.budget_ms) for model in models]
+    configs.append(('cadena configurada', chain, LLM_EXPAND_BUDGET_MS))
+    results = []
+    for name, routes, budget_ms in configs:
+        result = bench_route(name, routes, queries, args.concurrency, budget_ms)
+        results.append(result)
+        print(f"   {name[:38]:<38} {result['failed']:>6} {result['format_ok']:>8.0%} {result['p50_ms']:>8.0f} "
+              f"{result['p95_ms']:>8.0f} {result['completion_tokens']:>7.0f} {result['fallbacks']:>6}")
+
+    answered = [r for r in results[:-1] if r['format_ok'] >= 0.9]
+    if answered:
+        fastest = min(answered, key=lambda r: r['p95_ms'])
+        print("="*78)
+        print(f"🚀 Modelo más rápido con formato correcto: {fastest['route']} (p95 {fastest['p95_ms']:.0f} ms)")
+
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"💾 Resultados guardados en {args.output}")
+
+    if stub:
+        stub.__exit__(None, None, None)
+
+
+if __name__ == "__main__":
+    main()
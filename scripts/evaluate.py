@@ -0,0 +1,157 @@
+"""
+Evaluación offline de la búsqueda: recall@k, nDCG@k, MRR y latencia por
+configuración sobre las queries etiquetadas de data/eval_queries.json.
+
+Los embeddings de las películas se cachean por modelo y prefijo en
+data/.cache/eval_embeddings/, así que probar otro encoder, otro esquema de
+prefijos u otros pesos del re-ranking no requiere volver a ingerir nada.
+
+Las configuraciones gte-thesaurus y gte-llm añaden la expansión de la
+query (tesauro local o LLM) para comparar su calidad y su latencia con la
+búsqueda sin expansión (gte-llm necesita NVIDIA_API_KEY).
+
+Uso:
+    python scripts/evaluate.py                        # Configuración de producción
+    python scripts/evaluate.py --configs gte gte-dense e5
+    python scripts/evaluate.py --configs gte gte-thesaurus gte-llm
+    python scripts/evaluate.py --configs gte --relevance-weight 0.8 --verbose
+    python scripts/evaluate.py --list
+"""
+import argparse
+import csv
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from evaluation import (EVAL_K, EVAL_QUERIES_FILE, Corpus, cached_document_embeddings,
+                        default_config, evaluate, load_eval_queries, resolve_labels)
+from dedup import canonical_map
+from lexical_index import PROJECT_ROOT
+from search import EMBEDDING_MODEL
+from thesaurus import ThesaurusExpander, catalog_vocabulary
+
+CSV_FILE = os.path.join(PROJECT_ROOT, 'data', 'movies_clean.csv')
+MAX_MOVIES = 5000  # Igual que 02_ingest.py
+
+CONFIGS = {
+    'gte': default_config('gte', EMBEDDING_MODEL),
+    'gte-dense': default_config('gte-dense', EMBEDDING_MODEL, hybrid=False),
+    'gte-relevance': default_config('gte-relevance', EMBEDDING_MODEL, relevance_weight=1.0, rating_weight=0.0),
+    'gte-thesaurus': default_config('gte-thesaurus', EMBEDDING_MODEL, expansion='thesaurus'),
+    'gte-llm': default_config('gte-llm', EMBEDDING_MODEL, expansion='llm'),
+    'e5': default_config('e5', 'intfloat/multilingual-e5-base',
+                         query_prefix='query: ', doc_prefix='passage: '),
+    'bge-m3': default_config('bge-m3', 'BAAI/bge-m3'),
+    'minilm': default_config('minilm', 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'),
+}
+
+
+def expansion_function(expansion, df):
+    """Función query -> variantes de una expansión (None = sin expansión)"""
+    if expansion == 'thesaurus':
+        empty = [''] * len(df)
+        vocabulary = catalog_vocabulary(df.get('genres_text', empty), df.get('keywords_text', empty))
+        return ThesaurusExpander(vocabulary=vocabulary).expand
+    if expansion == 'llm':
+        from llm_integration import generate_query_variants
+        return generate_query_variants
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', nargs='+', default=['gte'], help="Configuraciones a comparar")
+    parser.add_argument('--queries', default=EVAL_QUERIES_FILE)
+    parser.add_argument('--max-movies', type=int, default=MAX_MOVIES)
+    parser.add_argument('--relevance-weight', type=float, help="Sobrescribe el peso de relevancia")
+    parser.add_argument('--rating-weight', type=float, help="Sobrescribe el peso del rating")
+    parser.add_argument('--output', help="Guardar el resumen en un CSV")
+    parser.add_argument('--verbose', action='store_true', help="Detalle por query")
+    parser.add_argument('--list', action='store_true', help="Listar las configuraciones disponibles")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, config in CONFIGS.items():
+            print(f"   {name:<14} {config['model']}  hybrid={config['hybrid']}  "
+                  f"prefijos={config['query_prefix']!r}/{config['doc_prefix']!r}  expansión={config['expansion']}")
+        return
+
+    unknown = [name for name in args.configs if name not in CONFIGS]
+    if unknown:
+        parser.error(f"Configuraciones desconocidas: {', '.join(unknown)} (usa --list)")
+
+    if not os.path.exists(CSV_FILE):
+        print(f"❌ ERROR: No encuentro '{CSV_FILE}'. Ejecuta primero 01_clean_data.py")
+        return
+
+    print("="*60)
+    print("📏 EVALUACIÓN OFFLINE DE LA BÚSQUEDA")
+    print("="*60)
+
+    df = pd.read_csv(CSV_FILE).head(args.max_movies)
+    # El mismo catálogo que la colección: sin las películas que la ingesta colapsó
+    collapsed = canonical_map()
+    if collapsed:
+        df = df[~df['id'].astype(str).isin(collapsed)]
+        print(f"\n🔁 {len(collapsed)} películas colapsadas por la ingesta excluidas del corpus")
+    corpus = Corpus.from_frame(df)
+    queries, missing = resolve_labels(load_eval_queries(args.queries), corpus.titles, corpus.years)
+    print(f"\n📂 {len(corpus)} películas, {len(queries)} queries etiquetadas")
+    if missing:
+        print(f"   ⚠️  Títulos etiquetados que no están en el corpus: {', '.join(missing)}")
+
+    from sentence_transformers import SentenceTransformer
+
+    models = {}
+    results = []
+    for name in args.configs:
+        config = dict(CONFIGS[name])
+        if args.relevance_weight is not None:
+            config['relevance_weight'] = args.relevance_weight
+        if args.rating_weight is not None:
+            config['rating_weight'] = args.rating_weight
+
+        if config['model'] not in models:
+            print(f"\n🤖 Cargando {config['model']}...")
+            models[config['model']] = SentenceTransformer(config['model'], trust_remote_code=True)
+        model = models[config['model']]
+
+        doc_embeddings, encoded = cached_document_embeddings(
+            model, config['model'], corpus.texts, prefix=config['doc_prefix'])
+        print(f"   📦 Embeddings de documentos: {len(corpus) - encoded} en caché, {encoded} codificados")
+
+        result = evaluate(config, corpus, queries, model, doc_embeddings,
+                          expand=expansion_function(config['expansion'], df))
+        results.append(result)
+
+        if args.verbose:
+            for q in result['queries']:
+                print(f"   {q['mrr']:.2f}  {q['query'][:50]:<50} → {', '.join(q['top'][:3])}")
+                if len(q['variants']) > 1:
+                    print(f"         variantes: {' | '.join(q['variants'][1:])[:100]}")
+
+    k_max = max(EVAL_K)
+    columns = [f'recall@{k}' for k in EVAL_K] + [f'ndcg@{k_max}', 'mrr', 'p50_ms', 'p95_ms', 'expand_ms']
+    print("\n" + "="*60)
+    print(f"   {'config':<14}" + "".join(f"{c:>11}" for c in columns))
+    for result in results:
+        s = result['summary']
+        print(f"   {result['config']['name']:<14}" + "".join(f"{s[c]:>11.3f}" for c in columns))
+    print("="*60)
+
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['config', 'model', 'relevance_weight', 'rating_weight'] + list(results[0]['summary']))
+            for result in results:
+                c = result['config']
+                writer.writerow([c['name'], c['model'], c['relevance_weight'], c['rating_weight']]
+                                + list(result['summary'].values()))
+        print(f"💾 Resumen guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
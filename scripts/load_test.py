@@ -0,0 +1,263 @@
+"""
+Prueba de carga de extremo a extremo: reproduce una mezcla de queries con
+un número creciente de usuarios concurrentes y mide throughput, latencia
+de cola y uso de recursos en cada nivel.
+
+Por defecto arranca un LLM simulado (scripts/stub_llm.py) y apunta el
+pipeline a él, así la prueba no depende ni consume cuota de NVIDIA NIMs.
+
+Objetivos:
+    - En proceso (por defecto): el mismo SearchEngine que usa la app
+    - HTTP (--url): una API ya arrancada (src/search_api.py); para que use
+      el LLM simulado, arráncala con NVIDIA_BASE_URL apuntando a
+      `python scripts/stub_llm.py` y pasa su PID con --pid para medir su CPU/RSS
+
+Uso:
+    python scripts/load_test.py --concurrency 1 2 4 8 16 --duration 20
+    python scripts/load_test.py --enrich --ttft-ms 800 --tokens-per-s 30
+    python scripts/load_test.py --url http://127.0.0.1:8000 --pid 12345
+    python scripts/load_test.py --llm-url https://integrate.api.nvidia.com/v1   # LLM real
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', 'src'))
+
+from stub_llm import StubLLMServer
+
+DEFAULT_QUERIES_FILE = os.path.join(SCRIPT_DIR, '..', 'data', 'eval_queries.json')
+
+
+def load_queries(path):
+    """
+    Queries de un JSON de evaluación ({"queries": [{"query": ...}]}), del
+    registro de búsquedas (.jsonl, ver query_log.py) o de un texto (una por línea)
+    """
+    if path.endswith('.jsonl'):
+        from query_log import read_query_log
+        return [entry.get('raw') or entry['q'] for entry in read_query_log(path=path) if entry.get('q')]
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            return [item['query'] for item in json.load(f)['queries']]
+        return [line.strip() for line in f if line.strip()]
+
+
+def process_usage(pid=None):
+    """
+    CPU consumida (s) y memoria residente (MB) de un proceso, leyendo /proc
+    (Linux); sin /proc, solo las del proceso actual (memoria 0 si tampoco
+    hay `resource`, como en Windows).
+    """
+    pid = pid or os.getpid()
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        with open(f"/proc/{pid}/status") as f:
+            rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+        return cpu, rss_kb / 1024
+    except (OSError, IndexError, StopIteration, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return time.process_time(), 0.0
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss / 1024
+
+
+def run_level(call, queries, concurrency, duration=None, requests=None, pid=None):
+    """
+    Lanza `concurrency` usuarios que hacen búsquedas seguidas (bucle
+    cerrado) durante `duration` segundos o hasta `requests` búsquedas.
+
+    Args:
+        call: Función que ejecuta una búsqueda; una excepción cuenta como error
+
+    Returns:
+        Dict con requests, errors, qps, p50/p95/p99 (ms), cpu_pct y rss_mb
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    mix = itertools.cycle(queries)
+    deadline = time.perf_counter() + duration if duration else None
+    remaining = [requests] if requests else None
+
+    def next_query():
+        with lock:
+            if remaining is not None:
+                if remaining[0] <= 0:
+                    return None
+                remaining[0] -= 1
+            return next(mix)
+
+    def user():
+        while deadline is None or time.perf_counter() < deadline:
+            query = next_query()
+            if query is None:
+                return
+            start = time.perf_counter()
+            try:
+                call(query)
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                if error:
+                    errors.append(error)
+
+    cpu_start, _ = process_usage(pid)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(user) for _ in range(concurrency)]:
+            future.result()
+    wall = time.perf_counter() - start
+    cpu_end, rss_mb = process_usage(pid)
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'qps': len(latencies) / wall if wall else 0.0,
+        'p50': float(np.percentile(latencies, 50)) if latencies else 0.0,
+        'p95': float(np.percentile(latencies, 95)) if latencies else 0.0,
+        'p99': float(np.percentile(latencies, 99)) if latencies else 0.0,
+        'cpu_pct': (cpu_end - cpu_start) / wall * 100 if wall else 0.0,
+        'rss_mb': rss_mb,
+        'first_error': errors[0] if errors else None,
+    }
+
+
+def in_process_target(expand, enrich, keep_cache):
+    """Búsqueda con el SearchEngine compartido (modelo, ChromaDB e índices reales)"""
+    from search import load_engine
+    from result_cache import ResultCache
+
+    engine = load_engine()
+    if not keep_cache:
+        # LRU de una entrada: con la mezcla en bucle, todas las búsquedas hacen el pipeline completo
+        engine.result_cache = ResultCache(max_entries=1)
+
+    def call(query):
+        response = engine.search(query, expand=expand)
+        if enrich and response['results']:
+            if engine.recommend(response) is None:
+                raise RuntimeError("Recomendación del LLM no disponible")
+        return response
+
+    return call
+
+
+def http_target(url, expand, enrich):
+    """Búsqueda contra la API HTTP (una sesión por hilo)"""
+    import requests
+
+    local = threading.local()
+
+    def call(query):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        response = local.session.get(f"{url.rstrip('/')}/search", timeout=120, params={
+            'q': query, 'expand': str(expand).lower(), 'enrich': str(enrich).lower()
+        })
+        response.raise_for_status()
+        return response.json()
+
+    return call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--duration', type=float, default=20.0, help="Segundos por nivel")
+    parser.add_argument('--requests', type=int, help="Búsquedas por nivel (en lugar de --duration)")
+    parser.add_argument('--queries', default=DEFAULT_QUERIES_FILE, help="JSON de evaluación, registro de búsquedas (.jsonl) o texto (una por línea)")
+    parser.add_argument('--url', help="URL de la API HTTP (por defecto, en proceso)")
+    parser.add_argument('--pid', type=int, help="PID de la API, para medir su CPU y memoria")
+    parser.add_argument('--no-expand', action='store_true', help="Sin variantes del LLM")
+    parser.add_argument('--enrich', action='store_true', help="Pedir también la recomendación del LLM")
+    parser.add_argument('--keep-cache', action='store_true', help="Mantener la caché de resultados (en proceso)")
+    parser.add_argument('--llm-url', help="LLM externo (por defecto se arranca uno simulado)")
+    parser.add_argument('--ttft-ms', type=float, default=300.0, help="LLM simulado: latencia hasta el primer token")
+    parser.add_argument('--tokens-per-s', type=float, default=50.0, help="LLM simulado: tokens por segundo")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="LLM simulado: fracción de errores")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Guardar los resultados en un CSV")
+    args = parser.parse_args()
+
+    stub = None
+    if args.llm_url:
+        os.environ['NVIDIA_BASE_URL'] = args.llm_url
+    elif not args.url:
+        # Antes de importar el pipeline: llm_integration lee la URL al importarse
+        stub = StubLLMServer(args.ttft_ms, args.tokens_per_s, error_rate=args.error_rate).__enter__()
+        os.environ['NVIDIA_BASE_URL'] = stub.base_url
+        os.environ.setdefault('NVIDIA_API_KEY', 'stub')
+    # Las búsquedas sintéticas no van al registro de queries ni se calienta la caché
+    os.environ['QUERY_LOG_FILE'] = ''
+
+    queries = load_queries(args.queries)
+    random.Random(args.seed).shuffle(queries)
+    expand = not args.no_expand
+
+    print("="*78)
+    print(f"🚦 PRUEBA DE CARGA ({len(queries)} queries, expand={expand}, enrich={args.enrich})")
+    print(f"   Objetivo: {args.url or 'en proceso'}   "
+          f"LLM: {stub.base_url + ' (simulado)' if stub else os.getenv('NVIDIA_BASE_URL', 'según la API')}")
+    print("="*78)
+
+    if args.url:
+        call = http_target(args.url, expand, args.enrich)
+    else:
+        print("🔄 Cargando el motor de búsqueda...")
+        call = in_process_target(expand, args.enrich, args.keep_cache)
+    call(queries[0])  # Calentamiento (modelo, conexiones)
+
+    print(f"\n   {'usuarios':>8} {'búsq.':>7} {'err':>5} {'q/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'CPU %':>7} {'RSS MB':>8}")
+    results = []
+    for concurrency in args.concurrency:
+        llm_before = dict(stub.stats) if stub else None
+        result = run_level(call, queries, concurrency, None if args.requests else args.duration,
+                           args.requests, args.pid)
+        if stub:
+            result['llm_calls'] = stub.stats['requests'] - llm_before['requests']
+        results.append(result)
+        print(f"   {concurrency:>8} {result['requests']:>7} {result['errors']:>5} {result['qps']:>8.2f} "
+              f"{result['p50']:>9.1f} {result['p95']:>9.1f} {result['p99']:>9.1f} "
+              f"{result['cpu_pct']:>7.0f} {result['rss_mb']:>8.0f}")
+        if result['first_error']:
+            print(f"            ⚠️  {result['first_error'][:100]}")
+
+    best = max(results, key=lambda r: r['qps'])
+    print("="*78)
+    print(f"🚀 Máximo throughput: {best['qps']:.2f} q/s con {best['concurrency']} usuarios "
+          f"(p95 {best['p95']:.0f} ms)")
+
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"💾 Resultados guardados en {args.output}")
+
+    if stub:
+        stub.__exit__(None, None, None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+LLM local compatible con la API de OpenAI (/v1/chat/completions) para
+pruebas de carga sin llamar a NVIDIA NIMs.
+
+Simula la latencia de un LLM real: un tiempo hasta el primer token más un
+ritmo de generación (tokens/s), con jitter y una tasa de errores
+configurables. Responde variantes "ES: / EN:" a los prompts de expansión
+de queries y un texto de relleno al resto. Soporta `stream=True` (SSE).
+
+Cada modelo puede tener su propio perfil de latencia; los de razonamiento
+(reasoning_tokens > 0) generan antes un bloque <think>...</think>, como
+DeepSeek-R1.
+
+Uso:
+    python scripts/stub_llm.py --port 8001 --ttft-ms 400 --tokens-per-s 40
+    NVIDIA_BASE_URL=http://127.0.0.1:8001/v1 streamlit run app.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILLER = ("Estas películas comparten una atmósfera intensa y personajes memorables que "
+          "encajan con lo que buscas; empieza por la primera si prefieres un ritmo ágil y "
+          "deja la última para una noche tranquila con tiempo para disfrutarla").split()
+
+_QUERY_RE = re.compile(r'Consulta: "(.*?)"', re.DOTALL)
+
+
+class StubLLMServer:
+    """
+    Servidor OpenAI-compatible en un hilo.
+
+    Args:
+        ttft_ms: Milisegundos hasta el primer token
+        tokens_per_s: Velocidad de generación (0 = instantánea)
+        output_tokens: Tokens de las respuestas de texto libre (limitados por max_tokens)
+        jitter: Variación relativa aleatoria de las latencias (0.2 = ±20 %)
+        error_rate: Fracción de peticiones que responden 500
+        host, port: Dirección de escucha (port=0 elige uno libre)
+        models: Perfiles por modelo {modelo: {ttft_ms, tokens_per_s,
+            reasoning_tokens}} que sustituyen a los valores generales
+    """
+
+    def __init__(self, ttft_ms=300.0, tokens_per_s=50.0, output_tokens=150, jitter=0.2,
+                 error_rate=0.0, host='127.0.0.1', port=0, models=None):
+        self.models = models or {}
+        self.ttft_ms = ttft_ms
+        self.tokens_per_s = tokens_per_s
+        self.output_tokens = output_tokens
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stats = {'requests': 0, 'errors': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip('/').endswith('/models'):
+                    self._send_json(200, {'object': 'list', 'data': [{'id': 'stub', 'object': 'model'}]})
+                else:
+                    self._send_json(404, {'error': {'message': 'Not found'}})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    self._send_json(400, {'error': {'message': 'Invalid JSON'}})
+                    return
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._send_json(404, {'error': {'message': 'Not found'}})
+                    return
+                server.handle_completion(self, body)
+
+            def _send_json(self, status, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _jittered(self, seconds):
+        return max(0.0, seconds * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def profile(self, model):
+        """Latencias del modelo: (ttft_ms, tokens_per_s, reasoning_tokens)"""
+        profile = self.models.get(model, {})
+        return (profile.get('ttft_ms', self.ttft_ms), profile.get('tokens_per_s', self.tokens_per_s),
+                profile.get('reasoning_tokens', 0))
+
+    def reply_text(self, messages, max_tokens, reasoning_tokens=0):
+        """Respuesta simulada según el tipo de prompt"""
+        prompt = messages[-1].get('content', '') if messages else ''
+        match = _QUERY_RE.search(prompt)
+        thinking = ''
+        if reasoning_tokens:
+            thinking = '<think> ' + ' '.join(FILLER[i % len(FILLER)] for i in range(reasoning_tokens)) + ' </think> '
+        if 'ES:' in prompt and match:
+            query = match.group(1)
+            return (f"{thinking}ES: {query} con temas, ambiente y estilo similares\n"
+                    f"EN: {query} with similar themes, mood and style")
+        n_tokens = min(self.output_tokens, max_tokens)
+        return thinking + ' '.join(FILLER[i % len(FILLER)] for i in range(n_tokens))
+
+    def handle_completion(self, handler, body):
+        messages = body.get('messages', [])
+        model = body.get('model', 'stub')
+        ttft_ms, tokens_per_s, reasoning_tokens = self.profile(model)
+        prompt_tokens = sum(len(str(m.get('content', '')).split()) for m in messages)
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['prompt_tokens'] += prompt_tokens
+
+        time.sleep(self._jittered(ttft_ms / 1000))
+        if random.random() < self.error_rate:
+            with self.lock:
+                self.stats['errors'] += 1
+            handler._send_json(500, {'error': {'message': 'Simulated upstream error'}})
+            return
+
+        tokens = self.reply_text(messages, int(body.get('max_tokens') or 1024), reasoning_tokens).split(' ')
+        with self.lock:
+            self.stats['completion_tokens'] += len(tokens)
+        token_delay = self._jittered(1 / tokens_per_s) if tokens_per_s else 0.0
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        if body.get('stream'):
+            handler.send_response(200)
+            handler.send_header('Content-Type', 'text/event-stream')
+            handler.send_header('Connection', 'close')
+            handler.end_headers()
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(token_delay)
+                chunk = {
+                    'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                    'model': model,
+                    'choices': [{'index': 0, 'delta': {'content': token if i == 0 else ' ' + token},
+                                 'finish_reason': None}]
+                }
+                handler.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                handler.wfile.flush()
+            handler.wfile.write(b"data: [DONE]\n\n")
+            handler.close_connection = True
+            return
+
+        time.sleep(token_delay * max(len(tokens) - 1, 0))
+        handler._send_json(200, {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ' '.join(tokens)},
+                         'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': len(tokens),
+                      'total_tokens': prompt_tokens + len(tokens)},
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--ttft-ms', type=float, default=300.0, help="Latencia hasta el primer token")
+    parser.add_argument('--tokens-per-s', type=float, default=50.0, help="Velocidad de generación")
+    parser.add_argument('--output-tokens', type=int, default=150, help="Longitud de las respuestas libres")
+    parser.add_argument('--jitter', type=float, default=0.2)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.ttft_ms, args.tokens_per_s, args.output_tokens, args.jitter,
+                           args.error_rate, host=args.host, port=args.port)
+    print(f"🤖 LLM simulado en {server.base_url} "
+          f"(primer token {args.ttft_ms:g} ms, {args.tokens_per_s:g} tokens/s)")
+    print(f"   Usa NVIDIA_BASE_URL={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"\n📊 {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
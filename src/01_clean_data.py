@@ -2,6 +2,8 @@ import pandas as pd
 import json
 import os
 
+from build_cache import BuildCache
+
 # Configuración de archivos
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
@@ -11,10 +13,22 @@ DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
 MOVIES_FILE = os.path.join(DATA_DIR, 'movies_metadata.csv')
 KEYWORDS_FILE = os.path.join(DATA_DIR, 'keywords.csv')
 CREDITS_FILE = os.path.join(DATA_DIR, 'credits.csv')
+LINKS_FILE = os.path.join(DATA_DIR, 'links.csv')
+RATINGS_FILE = os.path.join(DATA_DIR, 'ratings.csv')
+RATINGS_SMALL_FILE = os.path.join(DATA_DIR, 'ratings_small.csv')
+
+# Este script es una entrada más de la caché: si cambia el código (p. ej.
+# las columnas de salida), movies_clean.csv se regenera aunque los CSV no cambien
+CLEAN_SCRIPT = os.path.abspath(__file__)
 
 # Archivo de salida
 OUTPUT_FILE = os.path.join(PROJECT_ROOT, 'data', 'movies_clean.csv')
 
+# Delta generado por `fetch_tmdb_data.py --sync`
+DELTA_DIR = os.path.join(DATA_DIR, 'delta')
+DELTA_MANIFEST = os.path.join(DELTA_DIR, 'delta.json')
+DELTA_CLEAN_FILE = os.path.join(DELTA_DIR, 'movies_clean_delta.csv')
+
 def parse_json_field(field, key_to_extract='name', max_items=None):
     """
     Parsea un campo JSON y extrae valores específicos.
@@ -46,90 +60,67 @@ def parse_json_field(field, key_to_extract='name', max_items=None):
     except:
         return ''
 
-def clean_and_combine_data():
-    """
-    Combina múltiples CSV, extrae información enriquecida y crea dataset limpio.
-    """
-    print("="*60)
-    print("🎬 COMBINANDO DATASETS DE PELÍCULAS")
-    print("="*60)
-    
-    # 1. Cargar movies_metadata.csv
-    print("\n📂 Cargando movies_metadata.csv...")
-    if not os.path.exists(MOVIES_FILE):
-        print(f"❌ ERROR: No encuentro '{MOVIES_FILE}'")
-        return
-    
-    # Usar low_memory=False para evitar warnings de tipos mixtos
-    df_movies = pd.read_csv(MOVIES_FILE, low_memory=False)
+def load_movies(path=MOVIES_FILE):
+    """Carga movies_metadata.csv, normaliza IDs y extrae los géneros"""
+    df_movies = pd.read_csv(path, low_memory=False)
     print(f"   ✅ Cargadas {len(df_movies):,} películas")
     
     df_movies = df_movies[pd.to_numeric(df_movies['id'], errors='coerce').notnull()]
     df_movies['id'] = df_movies['id'].astype(float).astype(int).astype(str)
     
-    # 2. Cargar keywords.csv
-    print("\n📂 Cargando keywords.csv...")
-    if os.path.exists(KEYWORDS_FILE):
-        df_keywords = pd.read_csv(KEYWORDS_FILE)
-        df_keywords['id'] = df_keywords['id'].astype(str)
-        print(f"   ✅ Cargadas {len(df_keywords):,} entradas de keywords")
-        
-        # Merge con movies
-        df_movies = df_movies.merge(df_keywords, on='id', how='left')
-        print(f"   🔗 Merge completado")
-    else:
-        print(f"   ⚠️  No encontrado (continuando sin keywords)")
-        df_movies['keywords'] = ''
-    
-    # 3. Cargar credits.csv
-    print("\n📂 Cargando credits.csv...")
-    if os.path.exists(CREDITS_FILE):
-        df_credits = pd.read_csv(CREDITS_FILE)
-        df_credits['id'] = df_credits['id'].astype(str)
-        print(f"   ✅ Cargadas {len(df_credits):,} entradas de credits")
-        
-        # Merge con movies
-        df_movies = df_movies.merge(df_credits, on='id', how='left')
-        print(f"   🔗 Merge completado")
-    else:
-        print(f"   ⚠️  No encontrado (continuando sin credits)")
-        df_movies['cast'] = ''
-        df_movies['crew'] = ''
-    
-    
-    print(f"\n📊 Total películas después de merge: {len(df_movies):,}")
-    
-    # 4. Eliminar duplicados basados en ID
-    print("\n🔄 Eliminando IDs duplicados...")
+    # Eliminar duplicados basados en ID
     initial_count = len(df_movies)
     df_movies = df_movies.drop_duplicates(subset=['id'], keep='first')
     duplicates_removed = initial_count - len(df_movies)
     if duplicates_removed > 0:
         print(f"   ❌ Removidos: {duplicates_removed:,} duplicados")
-    print(f"   ✅ Películas únicas: {len(df_movies):,}")
     
-    # 5. Filtrar películas sin overview (campo crítico)
-    print("\n🧹 Filtrando películas sin sinopsis...")
-    initial_count = len(df_movies)
-    df_movies = df_movies[df_movies['overview'].notna()]
-    df_movies = df_movies[df_movies['overview'].str.strip() != '']
-    removed = initial_count - len(df_movies)
-    print(f"   ❌ Removidas: {removed:,} películas sin overview")
-    print(f"   ✅ Restantes: {len(df_movies):,} películas")
+    print("   📌 Procesando géneros...")
+    df_movies['genres_text'] = df_movies['genres'].apply(
+        lambda x: parse_json_field(x, 'name')
+    )
+    return df_movies
+
+def parse_keywords(path=KEYWORDS_FILE):
+    """Carga keywords.csv y extrae hasta 10 keywords por película"""
+    df_keywords = pd.read_csv(path)
+    df_keywords['id'] = df_keywords['id'].astype(str)
+    print(f"   ✅ Cargadas {len(df_keywords):,} entradas de keywords")
+    
+    df_keywords = df_keywords.drop_duplicates(subset=['id'], keep='first')
+    df_keywords['keywords_text'] = df_keywords['keywords'].apply(
+        lambda x: parse_json_field(x, 'name', max_items=10)
+    )
+    return df_keywords[['id', 'keywords_text']]
+
+def parse_credits(path=CREDITS_FILE):
+    """Carga credits.csv y extrae los nombres de los 5 actores principales"""
+    df_credits = pd.read_csv(path)
+    df_credits['id'] = df_credits['id'].astype(str)
+    print(f"   ✅ Cargadas {len(df_credits):,} entradas de credits")
+    
+    df_credits = df_credits.drop_duplicates(subset=['id'], keep='first')
+    df_credits['cast_text'] = df_credits['cast'].apply(
+        lambda x: parse_json_field(x, 'name', max_items=5)
+    )
+    return df_credits[['id', 'cast_text']]
+
+def aggregate_ratings(ratings_file):
+    """
+    Agrega los ratings de MovieLens por TMDB ID.
     
-    print("\n📊 Cargando ratings y links...")
-    # try:
+    Args:
+        ratings_file: Ruta de ratings.csv (o ratings_small.csv)
+    
+    Returns:
+        DataFrame con columnas tmdbId, ml_rating, ml_count
+    """
     # Cargar links para mapear MovieLens ID -> TMDB ID
-    links_df = pd.read_csv(os.path.join(DATA_DIR, 'links.csv'))
+    links_df = pd.read_csv(LINKS_FILE)
     links_df = links_df.dropna(subset=['tmdbId'])
     links_df['tmdbId'] = links_df['tmdbId'].astype(int).astype(str)
     links_df['movieId'] = links_df['movieId'].astype(str)
     
-    # Cargar ratings (usando el archivo grande si existe, sino el pequeño)
-    ratings_file = os.path.join(DATA_DIR, 'ratings.csv')
-    if not os.path.exists(ratings_file):
-        ratings_file = os.path.join(DATA_DIR, 'ratings_small.csv')
-        
     print(f"   Leyendo ratings desde {os.path.basename(ratings_file)}...")
     # Leer solo columnas necesarias para ahorrar memoria
     ratings_df = pd.read_csv(ratings_file, usecols=['movieId', 'rating'])
@@ -149,80 +140,109 @@ def clean_and_combine_data():
         'ml_rating': 'mean',
         'ml_count': 'sum'
     }).reset_index()
+    return ratings_final
+
+def create_enriched_text(row):
+    """Combina toda la información relevante en un texto natural"""
+    parts = []
+
+    # Título y Sinopsis integrados
+    title = row.get('original_title', '')
+    overview = row.get('overview', '')
+
+    if pd.notna(title) and pd.notna(overview):
+        parts.append(f"{title}. {overview}")
+    elif pd.notna(overview):
+        parts.append(overview)
+
+    # Géneros de forma natural
+    genres = row.get('genres_text', '')
+    if genres:
+        parts.append(f"Esta es una película de {genres}.")
+
+    # Cast
+    cast = row.get('cast_text', '')
+    if cast:
+        parts.append(f"Protagonizada por {cast}.")
+
+    # Keywords
+    keywords = row.get('keywords_text', '')
+    if keywords:
+        parts.append(f"Trata sobre: {keywords}.")
+
+    if pd.notna(row.get('ml_rating')) and row.get('ml_count', 0) > 10:
+        rating = round(row['ml_rating'], 1)
+        parts.append(f"Tiene una calificación de usuarios de {rating} sobre 5.")
+
+    # Tagline
+    tagline = row.get('tagline', '')
+    if pd.notna(tagline) and str(tagline).strip():
+        parts.append(f"{tagline}")
+
+    return ' '.join(parts)
+
+def _report(name, reused):
+    if reused:
+        print(f"   ♻️  {name}: sin cambios, usando caché")
+
+def build_clean_frame(df_movies, df_keywords, df_credits, ratings_final):
+    """
+    Une metadatos, keywords, credits y ratings y genera el texto enriquecido.
     
-    # Unir con dataframe principal
-    print("   Fusionando ratings con metadatos...")
-    df_movies = pd.merge(df_movies, ratings_final[['tmdbId', 'ml_rating', 'ml_count']], 
-                       left_on='id', right_on='tmdbId', how='left')
+    Args:
+        df_movies: Salida de load_movies()
+        df_keywords: Salida de parse_keywords() o None si no hay keywords
+        df_credits: Salida de parse_credits() o None si no hay credits
+        ratings_final: Salida de aggregate_ratings()
     
-    print(f"   ✅ Ratings integrados para {len(ratings_final):,} películas")
+    Returns:
+        DataFrame con las columnas finales de movies_clean.csv
+    """
+    if df_keywords is not None:
+        df_movies = df_movies.merge(df_keywords, on='id', how='left')
+        df_movies['keywords_text'] = df_movies['keywords_text'].fillna('')
+    else:
+        df_movies['keywords_text'] = ''
     
-    print("\n🔧 Procesando campos JSON...")
+    if df_credits is not None:
+        df_movies = df_movies.merge(df_credits, on='id', how='left')
+        df_movies['cast_text'] = df_movies['cast_text'].fillna('')
+    else:
+        df_movies['cast_text'] = ''
     
-    # Extraer nombres de géneros
-    print("   📌 Procesando géneros...")
-    df_movies['genres_text'] = df_movies['genres'].apply(
-        lambda x: parse_json_field(x, 'name')
-    )
+    print(f"\n📊 Total películas después de merge: {len(df_movies):,}")
     
-    # Extraer keywords
-    print("   📌 Procesando keywords...")
-    df_movies['keywords_text'] = df_movies['keywords'].apply(
-        lambda x: parse_json_field(x, 'name', max_items=10)
-    )
+    # Filtrar películas sin overview (campo crítico)
+    print("\n🧹 Filtrando películas sin sinopsis...")
+    initial_count = len(df_movies)
+    df_movies = df_movies[df_movies['overview'].notna()]
+    df_movies = df_movies[df_movies['overview'].str.strip() != '']
+    removed = initial_count - len(df_movies)
+    print(f"   ❌ Removidas: {removed:,} películas sin overview")
+    print(f"   ✅ Restantes: {len(df_movies):,} películas")
     
-    # Extraer nombres de actores principales (top 5)
-    print("   📌 Procesando cast...")
-    df_movies['cast_text'] = df_movies['cast'].apply(
-        lambda x: parse_json_field(x, 'name', max_items=5)
-    )
+    # Unir con dataframe principal
+    print("\n📊 Fusionando ratings con metadatos...")
+    df_movies = pd.merge(df_movies, ratings_final[['tmdbId', 'ml_rating', 'ml_count']], 
+                       left_on='id', right_on='tmdbId', how='left')
     
-    # 6. Crear campo text_to_embed enriquecido
-    print("\n🔗 Creando campo de texto enriquecido...")
+    print(f"   ✅ Ratings integrados para {len(ratings_final):,} películas")
     
-    def create_enriched_text(row):
-        """Combina toda la información relevante en un texto natural"""
-        parts = []
-        
-        # Título y Sinopsis integrados
-        title = row.get('original_title', '')
-        overview = row.get('overview', '')
-        
-        if pd.notna(title) and pd.notna(overview):
-            parts.append(f"{title}. {overview}")
-        elif pd.notna(overview):
-            parts.append(overview)
-            
-        # Géneros de forma natural
-        genres = row.get('genres_text', '')
-        if genres:
-            parts.append(f"Esta es una película de {genres}.")
-            
-        # Cast
-        cast = row.get('cast_text', '')
-        if cast:
-            parts.append(f"Protagonizada por {cast}.")
-            
-        # Keywords
-        keywords = row.get('keywords_text', '')
-        if keywords:
-            parts.append(f"Trata sobre: {keywords}.")
-            
-        if pd.notna(row.get('ml_rating')) and row.get('ml_count', 0) > 10:
-            rating = round(row['ml_rating'], 1)
-            parts.append(f"Tiene una calificación de usuarios de {rating} sobre 5.")
-            
-        # Tagline
-        tagline = row.get('tagline', '')
-        if pd.notna(tagline) and str(tagline).strip():
-            parts.append(f"{tagline}")
-            
-        return ' '.join(parts)
+    # Año de estreno y número de votos (filtros por década y popularidad)
+    if 'release_date' in df_movies.columns:
+        release = pd.to_datetime(df_movies['release_date'], errors='coerce')
+        df_movies['release_year'] = release.dt.year.fillna(0).astype(int)
+    else:
+        df_movies['release_year'] = 0
+    if 'vote_count' in df_movies.columns:
+        df_movies['vote_count'] = pd.to_numeric(df_movies['vote_count'], errors='coerce').fillna(0).astype(int)
     
+    # Crear campo text_to_embed enriquecido
+    print("\n🔗 Creando campo de texto enriquecido...")
     df_movies['text_to_embed'] = df_movies.apply(create_enriched_text, axis=1)
     print("   ✅ Campo text_to_embed creado")
     
-    # 7. Seleccionar columnas finales
+    # Seleccionar columnas finales
     print("\n📋 Seleccionando columnas finales...")
     final_columns = [
         'id',
@@ -233,6 +253,8 @@ def clean_and_combine_data():
         'cast_text',
         'keywords_text',
         'vote_average',
+        'vote_count',
+        'release_year',
         'ml_rating',
         'ml_count',
         'text_to_embed'
@@ -243,13 +265,92 @@ def clean_and_combine_data():
     df_clean = df_movies[available_columns].copy()
     
     # Renombrar para consistencia
-    df_clean = df_clean.rename(columns={'original_title': 'title'})
+    return df_clean.rename(columns={'original_title': 'title'})
+
+def _ratings_file():
+    """Usar el archivo de ratings grande si existe, sino el pequeño"""
+    if os.path.exists(RATINGS_FILE):
+        return RATINGS_FILE
+    return RATINGS_SMALL_FILE
+
+def clean_and_combine_data(force=False):
+    """
+    Combina múltiples CSV, extrae información enriquecida y crea dataset limpio.
+    
+    Cada parte (metadatos, keywords, credits, ratings) se cachea en
+    data/.cache/clean junto con la huella de sus archivos de entrada, y solo
+    se recalcula si esos archivos cambiaron. Los metadatos y el resultado
+    final dependen también de este script, así un cambio en las columnas
+    que produce invalida la caché. Si ninguna entrada cambió desde
+    la última ejecución, no se reescribe movies_clean.csv.
     
-    # 8. Guardar dataset limpio
+    Args:
+        force: Ignorar la caché y reprocesar todas las entradas
+    
+    Returns:
+        DataFrame limpio, o None si no hubo cambios o faltan archivos
+    """
+    print("="*60)
+    print("🎬 COMBINANDO DATASETS DE PELÍCULAS")
+    print("="*60)
+    
+    if not os.path.exists(MOVIES_FILE):
+        print(f"❌ ERROR: No encuentro '{MOVIES_FILE}'")
+        return
+    
+    ratings_file = _ratings_file()
+    
+    cache = BuildCache('clean')
+    if force:
+        cache.manifest['entries'].clear()
+    
+    all_inputs = [CLEAN_SCRIPT, MOVIES_FILE, KEYWORDS_FILE, CREDITS_FILE, LINKS_FILE, ratings_file]
+    if cache.is_fresh('movies_clean', all_inputs, artifact=OUTPUT_FILE):
+        print("\n✅ Ninguna entrada cambió desde la última ejecución")
+        print(f"   📁 {OUTPUT_FILE} está al día")
+        cache.save()
+        return
+    
+    # 1. Cargar movies_metadata.csv
+    print("\n📂 Cargando movies_metadata.csv...")
+    df_movies, reused = cache.cached('movies', [CLEAN_SCRIPT, MOVIES_FILE], load_movies)
+    _report('movies_metadata.csv', reused)
+    
+    # 2. Cargar keywords.csv
+    print("\n📂 Cargando keywords.csv...")
+    df_keywords = None
+    if os.path.exists(KEYWORDS_FILE):
+        df_keywords, reused = cache.cached('keywords', [KEYWORDS_FILE], parse_keywords)
+        _report('keywords.csv', reused)
+    else:
+        print(f"   ⚠️  No encontrado (continuando sin keywords)")
+    
+    # 3. Cargar credits.csv
+    print("\n📂 Cargando credits.csv...")
+    df_credits = None
+    if os.path.exists(CREDITS_FILE):
+        df_credits, reused = cache.cached('credits', [CREDITS_FILE], parse_credits)
+        _report('credits.csv', reused)
+    else:
+        print(f"   ⚠️  No encontrado (continuando sin credits)")
+    
+    # 4. Ratings de MovieLens agregados por TMDB ID
+    print("\n📊 Cargando ratings y links...")
+    ratings_final, reused = cache.cached(
+        'ratings', [LINKS_FILE, ratings_file], lambda: aggregate_ratings(ratings_file)
+    )
+    _report(os.path.basename(ratings_file), reused)
+    
+    # 5. Combinar y generar texto enriquecido
+    df_clean = build_clean_frame(df_movies, df_keywords, df_credits, ratings_final)
+    
+    # 6. Guardar dataset limpio
     print(f"\n💾 Guardando dataset limpio en '{OUTPUT_FILE}'...")
     df_clean.to_csv(OUTPUT_FILE, index=False)
+    cache.record('movies_clean', all_inputs, artifact=OUTPUT_FILE)
+    cache.save()
     
-    # 9. Estadísticas finales
+    # 7. Estadísticas finales
     print("\n" + "="*60)
     print("✨ PROCESO COMPLETADO CON ÉXITO")
     print("="*60)
@@ -273,5 +374,74 @@ def clean_and_combine_data():
     
     return df_clean
 
+def apply_delta():
+    """
+    Aplica el delta de la sincronización con TMDB sobre movies_clean.csv.
+    
+    Procesa solo las películas del delta (reutilizando los ratings
+    agregados de la caché), reemplaza sus filas en movies_clean.csv, elimina
+    las borradas en TMDB y deja las filas nuevas en movies_clean_delta.csv
+    para que 02_ingest.py --delta las aplique a ChromaDB.
+    
+    Returns:
+        DataFrame con las filas limpias del delta, o None si no hay delta
+    """
+    print("="*60)
+    print("🔄 APLICANDO DELTA DE TMDB")
+    print("="*60)
+    
+    if not os.path.exists(DELTA_MANIFEST):
+        print(f"❌ ERROR: No encuentro '{DELTA_MANIFEST}'. Ejecuta fetch_tmdb_data.py --sync")
+        return
+    if not os.path.exists(OUTPUT_FILE):
+        print(f"❌ ERROR: No encuentro '{OUTPUT_FILE}'. Ejecuta primero el proceso completo")
+        return
+    
+    with open(DELTA_MANIFEST, 'r', encoding='utf-8') as f:
+        delta = json.load(f)
+    updated_ids = {str(i) for i in delta.get('updated_ids', [])}
+    deleted_ids = {str(i) for i in delta.get('deleted_ids', [])}
+    print(f"   📝 Actualizadas: {len(updated_ids):,} | 🗑️  Eliminadas: {len(deleted_ids):,}")
+    
+    df_delta = pd.DataFrame(columns=['id'])
+    if updated_ids:
+        print("\n📂 Procesando películas del delta...")
+        df_movies = load_movies(os.path.join(DELTA_DIR, 'movies_metadata.csv'))
+        df_keywords = parse_keywords(os.path.join(DELTA_DIR, 'keywords.csv'))
+        df_credits = parse_credits(os.path.join(DELTA_DIR, 'credits.csv'))
+        
+        # Los ratings de MovieLens no cambian con TMDB: usar la caché
+        ratings_file = _ratings_file()
+        cache = BuildCache('clean')
+        ratings_final, reused = cache.cached(
+            'ratings', [LINKS_FILE, ratings_file], lambda: aggregate_ratings(ratings_file)
+        )
+        _report(os.path.basename(ratings_file), reused)
+        cache.save()
+        
+        df_delta = build_clean_frame(df_movies, df_keywords, df_credits, ratings_final)
+    
+    print(f"\n💾 Actualizando '{OUTPUT_FILE}'...")
+    df_clean = pd.read_csv(OUTPUT_FILE, dtype={'id': str})
+    before = len(df_clean)
+    df_clean = df_clean[~df_clean['id'].isin(updated_ids | deleted_ids)]
+    df_clean = pd.concat([df_clean, df_delta], ignore_index=True)
+    df_clean.to_csv(OUTPUT_FILE, index=False)
+    df_delta.to_csv(DELTA_CLEAN_FILE, index=False)
+    
+    print("\n" + "="*60)
+    print("✨ DELTA APLICADO")
+    print("="*60)
+    print(f"📊 Películas: {before:,} -> {len(df_clean):,}")
+    print(f"📁 Filas para ingesta incremental: {DELTA_CLEAN_FILE}")
+    print("   Siguiente paso: python src/02_ingest.py --delta")
+    print("="*60)
+    
+    return df_delta
+
 if __name__ == "__main__":
-    clean_and_combine_data()
\ No newline at end of file
+    import sys
+    if '--delta' in sys.argv:
+        apply_delta()
+    else:
+        clean_and_combine_data(force='--force' in sys.argv)
@@ -2,7 +2,19 @@ import pandas as pd
 from sentence_transformers import SentenceTransformer
 import chromadb
 from chromadb.config import Settings
+import numpy as np
 import os
+import json
+
+from lexical_index import build_lexical_index, LEXICAL_INDEX_FILE
+from fuzzy_index import build_fuzzy_index, FUZZY_INDEX_FILE
+from query_filters import build_filter_index, genre_key, FILTER_INDEX_FILE
+from thesaurus import build_thesaurus, THESAURUS_FILE
+from token_budget import short_synopsis
+from ratings import movie_rating
+from result_cache import publish_collection_version
+from neighbor_graph import refresh_neighbor_graph, NEIGHBORS_FILE
+from dedup import find_duplicates, save_duplicates, DUPLICATES_FILE
 
 # Configuración - Rutas relativas al directorio raíz del proyecto
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -14,6 +26,116 @@ COLLECTION_NAME = 'movies'
 MODEL_NAME = 'Alibaba-NLP/gte-multilingual-base'
 MAX_MOVIES = 5000  # Reducido para deployment (más rápido, menos memoria)
 
+# Delta generado por `01_clean_data.py --delta`
+DELTA_DIR = os.path.join(PROJECT_ROOT, 'data', 'delta')
+DELTA_MANIFEST = os.path.join(DELTA_DIR, 'delta.json')
+DELTA_CLEAN_FILE = os.path.join(DELTA_DIR, 'movies_clean_delta.csv')
+
+# Columnas de movies_clean.csv de las que dependen los filtros y la deduplicación
+REQUIRED_CLEAN_COLUMNS = ('release_year', 'vote_count')
+
+def check_clean_columns(path=CSV_FILE):
+    """
+    Comprueba que el CSV limpio tenga REQUIRED_CLEAN_COLUMNS. Un
+    movies_clean.csv generado por una versión anterior de 01_clean_data.py
+    no las tiene, y sin ellas todas las películas quedarían con año y votos 0.
+    
+    Returns:
+        True si están todas
+    """
+    missing = [c for c in REQUIRED_CLEAN_COLUMNS if c not in pd.read_csv(path, nrows=0).columns]
+    if missing:
+        print(f"❌ ERROR: A '{path}' le faltan las columnas {', '.join(missing)}. "
+              f"Regenéralo con 01_clean_data.py --force")
+        return False
+    return True
+
+def build_metadata(row):
+    """
+    Metadatos que se guardan en ChromaDB junto a cada embedding.
+    
+    Además de los campos que se muestran, incluye los campos estructurados
+    para filtrar en la propia consulta: año, rating de ranking, votos y un
+    booleano por género (ChromaDB no filtra por subcadenas en metadatos).
+    """
+    rating = float(row['ml_rating']) if pd.notna(row.get('ml_rating')) else 0.0
+    vote_average = float(row['vote_average']) if pd.notna(row.get('vote_average')) else 0.0
+    genres_text = str(row['genres_text']) if pd.notna(row.get('genres_text')) else ''
+    
+    metadata = {
+        'title': str(row['title']),
+        'poster_path': str(row['poster_path']) if pd.notna(row['poster_path']) else '',
+        'overview': str(row['overview'])[:500],
+        # Contexto compacto para el prompt de recomendación del LLM
+        'synopsis': short_synopsis(row['overview']),
+        'genres_text': genres_text,
+        'rating': rating,
+        'vote_average': vote_average,
+        # Sin .get(): si falta la columna es un error, no un año 0 (ver check_clean_columns)
+        'vote_count': int(row['vote_count']) if pd.notna(row['vote_count']) else 0,
+        'year': int(row['release_year']) if pd.notna(row['release_year']) else 0
+    }
+    # Mismo criterio que el re-ranking: rating de MovieLens o, si falta, TMDB
+    metadata['rank_rating'] = movie_rating(metadata)
+    for genre in genres_text.split(','):
+        if genre.strip():
+            metadata[genre_key(genre)] = True
+    return metadata
+
+def build_indexes(collection, df, changed_ids=None):
+    """
+    Reconstruye los índices auxiliares (léxico, difuso, de filtros, tesauro
+    y grafo de vecinos) para que reflejen exactamente las películas de la colección.
+    
+    Args:
+        collection: Colección de ChromaDB ya actualizada
+        df: Filas de movies_clean.csv de las películas de la colección
+        changed_ids: IDs con embedding nuevo o actualizado; si se indica, el
+            grafo de vecinos se actualiza de forma incremental
+    """
+    lexical_index = build_lexical_index(collection)
+    print(f"   🔤 Índice léxico: {len(lexical_index)} documentos en '{LEXICAL_INDEX_FILE}'")
+    
+    metadatas = [build_metadata(row) for _, row in df.iterrows()]
+    fuzzy_index = build_fuzzy_index(df, metadatas)
+    print(f"   🔎 Índice difuso: {len(fuzzy_index.entries)} nombres en '{FUZZY_INDEX_FILE}'")
+    
+    filter_index = build_filter_index(df['id'].astype(str).tolist(), metadatas)
+    print(f"   🎛️  Índice de filtros: {len(filter_index.by_genre)} géneros, "
+          f"{len(filter_index.by_decade)} décadas en '{FILTER_INDEX_FILE}'")
+    
+    thesaurus = build_thesaurus(df)
+    print(f"   📚 Tesauro: {len(thesaurus.groups)} conceptos, "
+          f"{sum(len(g['related']) for g in thesaurus.groups)} keywords del catálogo en '{THESAURUS_FILE}'")
+    
+    graph = refresh_neighbor_graph(collection, changed_ids)
+    print(f"   🎞️  Grafo de vecinos: {len(graph)} películas × {graph.k} vecinos en '{NEIGHBORS_FILE}'")
+
+def collapse_duplicates(df, embeddings):
+    """
+    Detecta las películas casi duplicadas y conserva solo la canónica de
+    cada grupo, para que no ocupen varios huecos entre los candidatos.
+    
+    Returns:
+        Tupla (df, embeddings) sin los duplicados
+    """
+    popularity = df['ml_count'].fillna(0) if 'ml_count' in df.columns else pd.Series(0, index=df.index)
+    if 'vote_count' in df.columns:
+        popularity = popularity + df['vote_count'].fillna(0)
+    
+    duplicates = find_duplicates(
+        df['id'].astype(str).tolist(), embeddings,
+        titles=df['title'].astype(str).tolist(),
+        years=df['release_year'].fillna(0).astype(int).tolist() if 'release_year' in df.columns else None,
+        popularity=popularity.tolist()
+    )
+    save_duplicates(duplicates)
+    
+    keep = ~df['id'].astype(str).isin(set(duplicates['id'])).to_numpy()
+    print(f"   ❌ Colapsadas: {len(duplicates)} películas en {duplicates['canonical_id'].nunique()} canónicas")
+    print(f"   📁 Detalle en '{DUPLICATES_FILE}'")
+    return df[keep].reset_index(drop=True), embeddings[keep]
+
 def ingest_movies():
     """
     Carga películas, genera embeddings y los almacena en ChromaDB.
@@ -23,6 +145,8 @@ def ingest_movies():
     if not os.path.exists(CSV_FILE):
         print(f"❌ ERROR: No encuentro '{CSV_FILE}'. Ejecuta primero 01_clean_data.py")
         return
+    if not check_clean_columns(CSV_FILE):
+        return
     
     print("="*60)
     print("🎬 INICIANDO INGESTA DE PELÍCULAS A CHROMADB")
@@ -59,47 +183,57 @@ def ingest_movies():
     )
     print(f"   ✅ Colección '{COLLECTION_NAME}' creada")
     
-    # 5. Generar embeddings e insertar en ChromaDB
-    print(f"\n🔄 Generando embeddings e insertando en ChromaDB...")
+    # 5. Generar embeddings
+    print(f"\n🔄 Generando embeddings...")
     print(f"   Progreso:")
     
     # Procesar en lotes para mejor rendimiento
     batch_size = 100
     total_movies = len(df)
     
+    all_embeddings = []
+    for i in range(0, total_movies, batch_size):
+        texts = df['text_to_embed'].iloc[i:i+batch_size].tolist()
+        all_embeddings.append(model.encode(texts, show_progress_bar=False))
+        
+        progress = min(i + batch_size, total_movies)
+        percentage = (progress / total_movies) * 100
+        print(f"   [{progress}/{total_movies}] {percentage:.1f}% completado")
+    all_embeddings = np.vstack(all_embeddings)
+    
+    # 6. Colapsar casi duplicados (remakes, reediciones, filas repetidas)
+    print(f"\n🔁 Buscando películas casi duplicadas...")
+    df, all_embeddings = collapse_duplicates(df, all_embeddings)
+    total_movies = len(df)
+    
+    # 7. Insertar en ChromaDB
+    print(f"\n💾 Insertando {total_movies} películas en ChromaDB...")
     for i in range(0, total_movies, batch_size):
         batch_df = df.iloc[i:i+batch_size]
-
-        texts = batch_df['text_to_embed'].tolist()
-        embeddings = model.encode(texts, show_progress_bar=False)
         
         # Preparar datos para ChromaDB
         ids = [str(row['id']) for _, row in batch_df.iterrows()]
-        metadatas = [
-            {
-                'title': str(row['title']),
-                'poster_path': str(row['poster_path']) if pd.notna(row['poster_path']) else '',
-                'overview': str(row['overview'])[:500],
-                'rating': float(row['ml_rating']) if pd.notna(row.get('ml_rating')) else 0.0,
-                'vote_average': float(row['vote_average']) if pd.notna(row.get('vote_average')) else 0.0
-            }
-            for _, row in batch_df.iterrows()
-        ]
-        documents = texts
+        metadatas = [build_metadata(row) for _, row in batch_df.iterrows()]
+        documents = batch_df['text_to_embed'].tolist()
         
         # Insertar en ChromaDB
         collection.add(
-            embeddings=embeddings.tolist(),
+            embeddings=all_embeddings[i:i+batch_size].tolist(),
             documents=documents,
             metadatas=metadatas,
             ids=ids
         )
-        
-        progress = min(i + batch_size, total_movies)
-        percentage = (progress / total_movies) * 100
-        print(f"   [{progress}/{total_movies}] {percentage:.1f}% completado")
     
-    # 6. Resumen final
+    # 8. Índices auxiliares: BM25 (títulos y reparto), difuso (ruta rápida
+    # sin LLM ni encoder) y listas de postings por género y década
+    print(f"\n🗂️  Construyendo índices auxiliares...")
+    build_indexes(collection, df)
+    
+    # Nueva versión: la app descarta los resultados cacheados de la anterior
+    version = publish_collection_version()
+    print(f"   🏷️  Versión de la colección publicada: {version}")
+    
+    # 9. Resumen final
     print("\n" + "="*60)
     print("✨ INGESTA COMPLETADA CON ÉXITO")
     print("="*60)
@@ -118,5 +252,69 @@ def ingest_movies():
     
     return collection
 
+def ingest_delta():
+    """
+    Aplica a ChromaDB el delta producido por `01_clean_data.py --delta`.
+    
+    Solo se recalculan los embeddings de las películas actualizadas que ya
+    están en la colección; las eliminadas en TMDB se borran.
+    """
+    if not os.path.exists(DELTA_MANIFEST) or not os.path.exists(DELTA_CLEAN_FILE):
+        print(f"❌ ERROR: No encuentro el delta en '{DELTA_DIR}'. Ejecuta primero 01_clean_data.py --delta")
+        return
+    if not check_clean_columns(CSV_FILE) or not check_clean_columns(DELTA_CLEAN_FILE):
+        return
+    
+    print("="*60)
+    print("🔄 INGESTA INCREMENTAL EN CHROMADB")
+    print("="*60)
+    
+    with open(DELTA_MANIFEST, 'r', encoding='utf-8') as f:
+        delta = json.load(f)
+    deleted_ids = [str(i) for i in delta.get('deleted_ids', [])]
+    
+    df = pd.read_csv(DELTA_CLEAN_FILE, dtype={'id': str})
+    
+    client = chromadb.PersistentClient(path=CHROMA_DB_DIR)
+    collection = client.get_collection(name=COLLECTION_NAME)
+    
+    # Solo refrescar películas que ya forman parte del índice (MAX_MOVIES)
+    if len(df) > 0:
+        existing = set(collection.get(ids=df['id'].tolist(), include=[])['ids'])
+        df = df[df['id'].isin(existing)]
+    
+    if len(df) > 0:
+        print(f"\n🤖 Cargando modelo de embeddings: {MODEL_NAME}")
+        model = SentenceTransformer(MODEL_NAME, trust_remote_code=True)
+        
+        texts = df['text_to_embed'].tolist()
+        embeddings = model.encode(texts, show_progress_bar=False)
+        collection.upsert(
+            embeddings=embeddings.tolist(),
+            documents=texts,
+            metadatas=[build_metadata(row) for _, row in df.iterrows()],
+            ids=df['id'].tolist()
+        )
+    print(f"   📝 Embeddings actualizados: {len(df)}")
+    
+    if deleted_ids:
+        collection.delete(ids=deleted_ids)
+    print(f"   🗑️  Películas eliminadas: {len(deleted_ids)}")
+    
+    # Los índices se reconstruyen desde movies_clean.csv (ya con el delta)
+    df_all = pd.read_csv(CSV_FILE, dtype={'id': str})
+    df_all = df_all[df_all['id'].isin(set(collection.get(include=[])['ids']))]
+    build_indexes(collection, df_all, changed_ids=df['id'].tolist())
+    print(f"   🏷️  Versión de la colección publicada: {publish_collection_version()}")
+    print(f"🔍 Total de embeddings: {collection.count()}")
+    print("="*60)
+    
+    return collection
+
 if __name__ == "__main__":
-    ingest_movies()
+    import sys
+    if '--delta' in sys.argv:
+        ingest_delta()
+    else:
+        ingest_movies()
+
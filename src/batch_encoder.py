@@ -0,0 +1,133 @@
+"""
+Servicio de codificación con micro-batching entre peticiones.
+
+Cada sesión de Streamlit codifica sus queries desde su propio hilo; con
+varios usuarios a la vez, el modelo ejecuta muchos forward passes diminutos
+que compiten por el GIL y por los hilos de torch. BatchEncoder agrupa las
+peticiones que llegan dentro de una ventana de pocos milisegundos y las
+codifica en un único lote desde un hilo trabajador.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+ENCODER_BATCH_SIZE = int(os.getenv("ENCODER_BATCH_SIZE", "32"))
+ENCODER_WINDOW_MS = float(os.getenv("ENCODER_WINDOW_MS", "5"))
+
+_STOP = object()
+
+
+class BatchEncoder:
+    """
+    Envoltorio de un modelo con `encode(list[str])` que agrupa peticiones
+    concurrentes.
+
+    Args:
+        model: Modelo de embeddings (ej: SentenceTransformer)
+        max_batch_size: Máximo de textos por lote
+        window_ms: Tiempo máximo que espera el primer texto de un lote a
+            que lleguen más
+    """
+
+    def __init__(self, model, max_batch_size=ENCODER_BATCH_SIZE, window_ms=ENCODER_WINDOW_MS):
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.window = max(0.0, float(window_ms)) / 1000
+        self.stats = {'requests': 0, 'texts': 0, 'batches': 0}
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name='batch-encoder', daemon=True)
+        self._worker.start()
+
+    def submit(self, texts):
+        """
+        Encola textos para codificar.
+
+        Returns:
+            Future que se resuelve con un array (len(texts), dim)
+        """
+        future = Future()
+        # Bajo el cerrojo: nada puede encolarse detrás del _STOP de close()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BatchEncoder cerrado")
+            self._queue.put((list(texts), future))
+        return future
+
+    def encode(self, sentences, timeout=None):
+        """
+        Mismo contrato que `model.encode`: un texto devuelve un vector y una
+        lista de textos, una matriz.
+        """
+        single = isinstance(sentences, str)
+        embeddings = self.submit([sentences] if single else sentences).result(timeout)
+        return embeddings[0] if single else embeddings
+
+    def avg_batch_size(self):
+        return self.stats['texts'] / self.stats['batches'] if self.stats['batches'] else 0.0
+
+    def close(self):
+        """Procesa lo pendiente y detiene el hilo trabajador"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._worker.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            n_texts = len(item[0])
+            deadline = time.monotonic() + self.window
+            while n_texts < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                n_texts += len(item[0])
+
+            self._encode_batch(batch)
+
+        # Lo que quede en la cola ya no se codificará: que nadie espere para siempre
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item[1].set_exception(RuntimeError("BatchEncoder cerrado"))
+
+    def _encode_batch(self, batch):
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        try:
+            embeddings = np.asarray(self.model.encode(texts, show_progress_bar=False)) if texts else None
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.stats['requests'] += len(batch)
+        self.stats['texts'] += len(texts)
+        self.stats['batches'] += 1
+
+        start = 0
+        for request_texts, future in batch:
+            end = start + len(request_texts)
+            future.set_result(embeddings[start:end] if embeddings is not None else np.empty((0, 0)))
+            start = end
@@ -0,0 +1,184 @@
+"""
+Caché de construcción para las etapas del pipeline de datos.
+
+Cada archivo de entrada se identifica por su huella (tamaño, mtime y hash
+SHA-256 del contenido). Los resultados intermedios se guardan en disco junto
+con las huellas de las entradas que los produjeron, de modo que solo se
+recalculan las partes cuyas entradas cambiaron.
+"""
+import hashlib
+import json
+import os
+import pickle
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+
+CACHE_DIR = os.path.join(PROJECT_ROOT, 'data', '.cache')
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_fingerprint(path, previous=None):
+    """
+    Calcula la huella de un archivo.
+
+    Si el tamaño y el mtime coinciden con la huella anterior se reutiliza su
+    hash, así una ejecución sin cambios no vuelve a leer archivos de cientos
+    de MB (como ratings.csv).
+
+    Args:
+        path: Ruta del archivo
+        previous: Huella registrada en la ejecución anterior (opcional)
+
+    Returns:
+        Dict con size, mtime y sha256, o None si el archivo no existe
+    """
+    if not path or not os.path.exists(path):
+        return None
+
+    stat = os.stat(path)
+    if (previous
+            and previous.get('size') == stat.st_size
+            and previous.get('mtime') == stat.st_mtime_ns):
+        return dict(previous)
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            sha.update(chunk)
+
+    return {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'sha256': sha.hexdigest()
+    }
+
+
+def _same_content(a, b):
+    """Dos huellas son equivalentes si el contenido es el mismo (o ambas faltan)"""
+    if a is None or b is None:
+        return a is b
+    return a.get('sha256') == b.get('sha256')
+
+
+class BuildCache:
+    """
+    Manifiesto de huellas y almacén de resultados intermedios de una etapa.
+
+    El manifiesto guarda, por cada nombre de resultado, las huellas de sus
+    entradas. Las huellas de cada archivo se calculan una sola vez por
+    ejecución aunque varios resultados dependan de él.
+    """
+
+    def __init__(self, stage, cache_dir=CACHE_DIR):
+        self.stage = stage
+        self.stage_dir = os.path.join(cache_dir, stage)
+        self.manifest_file = os.path.join(cache_dir, f'{stage}_manifest.json')
+        self.manifest = self._load_manifest()
+        self._fingerprints = {}
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'files': {}, 'entries': {}}
+
+    def save(self):
+        """Persiste el manifiesto en disco"""
+        os.makedirs(os.path.dirname(self.manifest_file), exist_ok=True)
+        tmp_file = self.manifest_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+    def fingerprint(self, path):
+        """Huella de un archivo, memorizada durante la ejecución"""
+        if path not in self._fingerprints:
+            previous = self.manifest['files'].get(path)
+            fp = file_fingerprint(path, previous)
+            self._fingerprints[path] = fp
+            if fp is None:
+                self.manifest['files'].pop(path, None)
+            else:
+                self.manifest['files'][path] = fp
+        return self._fingerprints[path]
+
+    def fingerprints(self, inputs):
+        return {path: self.fingerprint(path) for path in inputs}
+
+    def is_fresh(self, name, inputs, artifact=None):
+        """
+        Indica si el resultado `name` fue producido con las entradas actuales.
+
+        Args:
+            name: Nombre del resultado
+            inputs: Lista de rutas de las que depende
+            artifact: Ruta del archivo producido (por defecto el pickle interno)
+        """
+        entry = self.manifest['entries'].get(name)
+        if not entry:
+            return False
+
+        artifact = artifact or self._artifact_path(name)
+        if not os.path.exists(artifact):
+            return False
+
+        recorded = entry.get('inputs', {})
+        if set(recorded) != set(inputs):
+            return False
+
+        if 'artifact' in entry:
+            current_artifact = file_fingerprint(artifact, entry['artifact'])
+            if not _same_content(entry['artifact'], current_artifact):
+                return False
+
+        current = self.fingerprints(inputs)
+        return all(_same_content(recorded[p], current[p]) for p in inputs)
+
+    def record(self, name, inputs, artifact=None):
+        """
+        Registra las huellas de las entradas que produjeron `name`.
+
+        Si se indica `artifact` (un archivo de salida externo a la caché)
+        también se guarda su huella, para detectar ediciones manuales.
+        """
+        entry = {'inputs': self.fingerprints(inputs)}
+        if artifact:
+            entry['artifact'] = file_fingerprint(artifact)
+        self.manifest['entries'][name] = entry
+
+    def cached(self, name, inputs, compute):
+        """
+        Devuelve el resultado intermedio `name`, recalculándolo solo si
+        alguna de sus entradas cambió.
+
+        Args:
+            name: Nombre del resultado intermedio
+            inputs: Lista de rutas de las que depende
+            compute: Función sin argumentos que produce el resultado
+
+        Returns:
+            Tupla (resultado, reutilizado)
+        """
+        path = self._artifact_path(name)
+        if self.is_fresh(name, inputs):
+            try:
+                with open(path, 'rb') as f:
+                    return pickle.load(f), True
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+
+        result = compute()
+
+        os.makedirs(self.stage_dir, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        self.record(name, inputs)
+        return result, False
+
+    def _artifact_path(self, name):
+        return os.path.join(self.stage_dir, f'{name}.pkl')
@@ -0,0 +1,186 @@
+"""
+Detección de películas casi duplicadas (remakes, reediciones y filas de
+metadatos repetidas con distinto ID) a partir de sus embeddings y de su
+título y año normalizados.
+
+Los pares candidatos se obtienen con productos de matrices por bloques
+(memoria O(bloque × N)); solo los que superan el umbral de similitud más
+bajo se comparan en Python. Los pares aceptados se agrupan con union-find
+y cada grupo se representa con su película más popular (ID canónico).
+
+Uso:
+    python src/dedup.py          # Informe de duplicados de la colección actual
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from lexical_index import PROJECT_ROOT, normalize_text, tokenize
+
+DUPLICATES_FILE = os.path.join(PROJECT_ROOT, 'data', 'duplicates.csv')
+BLOCK_SIZE = 1024
+
+# Umbrales de similitud coseno entre embeddings:
+# - textos prácticamente idénticos, sea cual sea el título
+SAME_TEXT_THRESHOLD = 0.97
+# - mismo título normalizado (remake o reedición), de cualquier año
+SAME_TITLE_THRESHOLD = 0.88
+# - mismo título y mismo año (±1): fila de metadatos repetida
+SAME_RELEASE_THRESHOLD = 0.80
+
+# Numeración de secuelas ("Rocky II", "Toy Story 2"); "i" no, es un pronombre
+_SEQUEL_NUMBER_RE = re.compile(r'^(?:\d+|ii|iii|iv|v|vi|vii|viii|ix|x|xi|xii)$')
+
+
+def _title_key(title):
+    return ' '.join(tokenize(normalize_text(title)))
+
+
+def distinct_titles(title_a, title_b):
+    """
+    True si los títulos nombran películas distintas de una misma saga
+    aunque sus embeddings se parezcan: difieren en un número o numeral
+    romano ("Toy Story" / "Toy Story 2"), en el subtítulo tras ":"
+    ("The Godfather" / "The Godfather: Part II") o en un plural
+    ("Alien" / "Aliens").
+    """
+    subtitle_a = _title_key(str(title_a).partition(':')[2])
+    subtitle_b = _title_key(str(title_b).partition(':')[2])
+    if subtitle_a != subtitle_b:
+        return True
+
+    tokens_a, tokens_b = set(_title_key(title_a).split()), set(_title_key(title_b).split())
+    only_a, only_b = tokens_a - tokens_b, tokens_b - tokens_a
+    if any(_SEQUEL_NUMBER_RE.match(token) for token in only_a | only_b):
+        return True
+    return any(a in (b + 's', b + 'es') or b in (a + 's', a + 'es') for a in only_a for b in only_b)
+
+
+def _candidate_pairs(matrix, min_similarity, block_size):
+    """Pares (i, j, similitud) con i < j y similitud >= min_similarity"""
+    pairs = []
+    for start in range(0, len(matrix), block_size):
+        block = matrix[start:start + block_size]
+        sims = block @ matrix.T
+        rows, cols = np.nonzero(sims >= min_similarity)
+        rows_abs = rows + start
+        keep = cols > rows_abs
+        for i, j, r, c in zip(rows_abs[keep], cols[keep], rows[keep], cols[keep]):
+            pairs.append((int(i), int(j), float(sims[r, c])))
+    return pairs
+
+
+def is_duplicate(similarity, title_a, title_b, year_a=0, year_b=0):
+    """
+    Decide si un par candidato es la misma película. Las secuelas nunca lo
+    son (ver distinct_titles); por lo demás hace falta un texto casi
+    idéntico o el mismo título normalizado.
+    """
+    if distinct_titles(title_a, title_b):
+        return False
+    if similarity >= SAME_TEXT_THRESHOLD:
+        return True
+    key_a, key_b = _title_key(title_a), _title_key(title_b)
+    if not key_a or key_a != key_b:
+        return False
+    if year_a and year_b and abs(int(year_a) - int(year_b)) <= 1:
+        return similarity >= SAME_RELEASE_THRESHOLD
+    return similarity >= SAME_TITLE_THRESHOLD
+
+
+def find_duplicates(ids, embeddings, titles, years=None, popularity=None, block_size=BLOCK_SIZE):
+    """
+    Agrupa las películas casi duplicadas.
+
+    Args:
+        ids: IDs de las películas
+        embeddings: Embeddings en el mismo orden que `ids`
+        titles: Títulos
+        years: Años de estreno (0 si se desconoce)
+        popularity: Número de votos/ratings; el más popular es el canónico
+
+    Returns:
+        DataFrame con id, canonical_id, title, canonical_title y similarity,
+        una fila por película que debe colapsarse en su canónica
+    """
+    ids = [str(i) for i in ids]
+    n = len(ids)
+    years = list(years) if years is not None else [0] * n
+    popularity = list(popularity) if popularity is not None else [0] * n
+    columns = ['id', 'canonical_id', 'title', 'canonical_title', 'similarity']
+    if n < 2:
+        return pd.DataFrame(columns=columns)
+
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    best_similarity = {}
+    for i, j, sim in _candidate_pairs(matrix, SAME_RELEASE_THRESHOLD, block_size):
+        if is_duplicate(sim, titles[i], titles[j], years[i], years[j]):
+            parent[find(i)] = find(j)
+            best_similarity[i] = max(best_similarity.get(i, 0.0), sim)
+            best_similarity[j] = max(best_similarity.get(j, 0.0), sim)
+
+    clusters = {}
+    for i in best_similarity:
+        clusters.setdefault(find(i), []).append(i)
+
+    rows = []
+    for members in clusters.values():
+        # Canónica: la más popular; a igualdad, la primera del catálogo
+        canonical = max(members, key=lambda i: (popularity[i], -i))
+        for i in sorted(members):
+            if i != canonical:
+                rows.append({
+                    'id': ids[i],
+                    'canonical_id': ids[canonical],
+                    'title': titles[i],
+                    'canonical_title': titles[canonical],
+                    'similarity': round(best_similarity[i], 4)
+                })
+    return pd.DataFrame(rows, columns=columns)
+
+
+def save_duplicates(duplicates, path=DUPLICATES_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    duplicates.to_csv(path, index=False)
+
+
+def canonical_map(path=DUPLICATES_FILE):
+    """Dict {id duplicado: id canónico} del último análisis, vacío si no existe"""
+    if not os.path.exists(path):
+        return {}
+    df = pd.read_csv(path, dtype={'id': str, 'canonical_id': str})
+    return dict(zip(df['id'], df['canonical_id']))
+
+
+if __name__ == "__main__":
+    import chromadb
+
+    client = chromadb.PersistentClient(path=os.path.join(PROJECT_ROOT, 'chroma_db'))
+    collection = client.get_collection(name='movies')
+    data = collection.get(include=['embeddings', 'metadatas'])
+
+    duplicates = find_duplicates(
+        data['ids'], data['embeddings'],
+        titles=[m.get('title', '') for m in data['metadatas']],
+        years=[m.get('year', 0) for m in data['metadatas']],
+        popularity=[m.get('vote_count', 0) for m in data['metadatas']]
+    )
+    save_duplicates(duplicates)
+
+    print(f"🔁 Duplicados encontrados: {len(duplicates)} de {len(data['ids'])} películas")
+    for _, row in duplicates.head(20).iterrows():
+        print(f"   {row['title']} ({row['id']}) → {row['canonical_title']} ({row['canonical_id']}) "
+              f"[{row['similarity']:.3f}]")
+    print(f"📁 Detalle guardado en '{DUPLICATES_FILE}'")
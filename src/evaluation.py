@@ -0,0 +1,279 @@
+"""
+Evaluación offline de la recuperación con un conjunto de queries etiquetadas.
+
+Cada configuración (modelo de embeddings, prefijos de query/documento,
+búsqueda híbrida y pesos del re-ranking) se evalúa sobre el mismo corpus
+que la ingesta (movies_clean.csv) con búsqueda exacta en memoria, así que
+comparar modelos no requiere volver a crear la colección de ChromaDB.
+
+Los embeddings de los documentos se guardan por (modelo, prefijo) en
+data/.cache/eval_embeddings/, con el hash del texto de cada película: al
+cambiar el corpus solo se codifican las películas nuevas o modificadas.
+
+Las etiquetas son títulos (opcionalmente con el año: "Titanic (1997)");
+una película cuenta como acierto si coincide con cualquiera de las filas
+de ese título, de modo que los duplicados no penalizan el recall.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import time
+
+import numpy as np
+
+from build_cache import CACHE_DIR
+from lexical_index import BM25Index, PROJECT_ROOT, normalize_text, reciprocal_rank_fusion
+from search import N_RESULTS, POOL_SIZE, RATING_WEIGHT, RELEVANCE_WEIGHT, rerank
+
+EVAL_QUERIES_FILE = os.path.join(PROJECT_ROOT, 'data', 'eval_queries.json')
+EMBEDDING_CACHE_DIR = os.path.join(CACHE_DIR, 'eval_embeddings')
+EVAL_K = (1, 5, 10)
+
+_YEAR_RE = re.compile(r'^(.*?)\s*\((\d{4})\)$')
+
+
+def default_config(name, model, **overrides):
+    """
+    Configuración de evaluación con los valores de producción.
+
+    Campos: name, model, query_prefix, doc_prefix, hybrid,
+    relevance_weight, rating_weight y expansion (None, 'thesaurus' o 'llm').
+    """
+    config = {
+        'name': name,
+        'model': model,
+        'query_prefix': '',
+        'doc_prefix': '',
+        'hybrid': True,
+        'relevance_weight': RELEVANCE_WEIGHT,
+        'rating_weight': RATING_WEIGHT,
+        'expansion': None,
+    }
+    config.update(overrides)
+    return config
+
+
+def _title_key(title):
+    return ' '.join(re.findall(r'\w+', normalize_text(title)))
+
+
+def _text_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def load_eval_queries(path=EVAL_QUERIES_FILE):
+    """Lista de dicts {'query', 'relevant': [títulos]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['queries']
+
+
+def resolve_labels(queries, titles, years):
+    """
+    Traduce los títulos etiquetados a grupos de posiciones del corpus.
+
+    Returns:
+        Tupla (queries con 'groups': lista de conjuntos de posiciones, una
+        por título encontrado; títulos no encontrados). Las queries sin
+        ningún título encontrado se descartan.
+    """
+    by_title = {}
+    for pos, title in enumerate(titles):
+        by_title.setdefault(_title_key(title), []).append(pos)
+
+    resolved, missing = [], []
+    for item in queries:
+        groups = []
+        for label in item['relevant']:
+            match = _YEAR_RE.match(label)
+            key = _title_key(match.group(1) if match else label)
+            positions = by_title.get(key, [])
+            if match:
+                positions = [p for p in positions if years[p] == int(match.group(2))]
+            if positions:
+                groups.append(set(positions))
+            else:
+                missing.append(label)
+        if groups:
+            resolved.append({**item, 'groups': groups})
+    return resolved, missing
+
+
+def ranking_metrics(ranked, groups, ks=EVAL_K):
+    """
+    recall@k, nDCG@k (relevancia binaria) y reciprocal rank de un ranking.
+
+    Args:
+        ranked: Posiciones del corpus ordenadas por el sistema
+        groups: Conjuntos de posiciones relevantes (uno por película etiquetada)
+    """
+    group_of = {}
+    for g, positions in enumerate(groups):
+        for pos in positions:
+            group_of.setdefault(pos, g)
+
+    # Rango (1-based) de la primera aparición de cada grupo
+    hit_ranks = {}
+    for rank, pos in enumerate(ranked, 1):
+        g = group_of.get(pos)
+        if g is not None and g not in hit_ranks:
+            hit_ranks[g] = rank
+
+    metrics = {'mrr': 1.0 / min(hit_ranks.values()) if hit_ranks else 0.0}
+    for k in ks:
+        hits = [r for r in hit_ranks.values() if r <= k]
+        ideal = sum(1 / math.log2(i + 2) for i in range(min(k, len(groups))))
+        metrics[f'recall@{k}'] = len(hits) / len(groups)
+        metrics[f'ndcg@{k}'] = sum(1 / math.log2(r + 1) for r in hits) / ideal
+    return metrics
+
+
+def cached_document_embeddings(model, model_name, texts, prefix='', cache_dir=EMBEDDING_CACHE_DIR,
+                               batch_size=64):
+    """
+    Embeddings de `texts` con `model`, reutilizando los guardados en disco
+    para los textos que no cambiaron.
+
+    Returns:
+        Tupla (matriz de embeddings, número de textos codificados)
+    """
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', model_name).strip('_')
+    path = os.path.join(cache_dir, f"{slug}-{_text_hash(prefix)[:8]}.npz")
+    hashes = [_text_hash(prefix + text) for text in texts]
+
+    cached = {}
+    if os.path.exists(path):
+        data = np.load(path)
+        cached = {h: row for row, h in enumerate(data['hashes'])}
+        cached_embeddings = data['embeddings']
+
+    missing = [i for i, h in enumerate(hashes) if h not in cached]
+    new_embeddings = None
+    if missing:
+        new_embeddings = np.asarray(model.encode(
+            [prefix + texts[i] for i in missing], batch_size=batch_size, show_progress_bar=len(missing) > batch_size
+        ), dtype=np.float32)
+
+    dim = new_embeddings.shape[1] if new_embeddings is not None else cached_embeddings.shape[1]
+    embeddings = np.empty((len(texts), dim), dtype=np.float32)
+    missing_row = {i: row for row, i in enumerate(missing)}
+    for i, h in enumerate(hashes):
+        embeddings[i] = new_embeddings[missing_row[i]] if i in missing_row else cached_embeddings[cached[h]]
+
+    if missing:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, hashes=np.array(hashes), embeddings=embeddings)
+        os.replace(tmp_path, path)
+    return embeddings, len(missing)
+
+
+class Corpus:
+    """
+    Películas a evaluar (las mismas que ingiere 02_ingest.py).
+
+    Args:
+        ids, titles, texts: Identificador, título y texto enriquecido
+        metadatas: Dicts con al menos rating / vote_average (para el re-ranking)
+        years: Año de estreno (0 si se desconoce)
+    """
+
+    def __init__(self, ids, titles, texts, metadatas, years):
+        self.ids = list(ids)
+        self.titles = list(titles)
+        self.texts = list(texts)
+        self.metadatas = list(metadatas)
+        self.years = list(years)
+        self.lexical_index = BM25Index(range(len(self.ids)), self.titles, self.texts)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Corpus desde un DataFrame con el formato de movies_clean.csv"""
+        def number(value):
+            return float(value) if value == value else 0.0  # NaN -> 0
+
+        nan = float('nan')
+        metadatas = [
+            {
+                'title': str(row.title),
+                'rating': number(getattr(row, 'ml_rating', nan)),
+                'vote_average': number(getattr(row, 'vote_average', nan))
+            }
+            for row in df.itertuples()
+        ]
+        years = [int(y) if y == y else 0 for y in df.get('release_year', [nan] * len(df))]
+        return cls(df['id'].astype(str), df['title'].astype(str), df['text_to_embed'].astype(str),
+                   metadatas, years)
+
+
+def evaluate(config, corpus, queries, model, doc_embeddings, ks=EVAL_K, n_candidates=POOL_SIZE, expand=None):
+    """
+    Evalúa una configuración: búsqueda exacta (L2 al cuadrado, como la
+    colección) con cada variante de la query, fusión RRF de las variantes
+    (y de BM25 si `hybrid`) y re-ranking con los pesos de la configuración.
+
+    Args:
+        queries: Salida de resolve_labels()
+        doc_embeddings: Matriz alineada con el corpus (cached_document_embeddings)
+        expand: Función query -> variantes (la de config['expansion']);
+            None = solo la query original, reproducible
+
+    Returns:
+        Dict con la media de cada métrica, latencias p50/p95 (ms, con la
+        expansión), p50 de la expansión y el detalle por query
+    """
+    per_query = []
+    latencies = []
+    expand_latencies = []
+    doc_sq_norms = np.einsum('ij,ij->i', doc_embeddings, doc_embeddings)
+    n_candidates = min(n_candidates, len(corpus))
+
+    for item in queries:
+        start = time.perf_counter()
+        variants = expand(item['query']) if expand else [item['query']]
+        expand_latencies.append((time.perf_counter() - start) * 1000)
+
+        query_vecs = np.asarray(model.encode([config['query_prefix'] + v for v in variants]), dtype=np.float32)
+        all_distances = (doc_sq_norms[None, :] - 2 * query_vecs @ doc_embeddings.T
+                         + np.einsum('ij,ij->i', query_vecs, query_vecs)[:, None])
+        distances = all_distances.min(axis=0)
+        rankings = []
+        for variant_distances in all_distances:
+            dense = np.argpartition(variant_distances, n_candidates - 1)[:n_candidates]
+            rankings.append(dense[np.argsort(variant_distances[dense])].tolist())
+
+        if config['hybrid']:
+            rankings.append([pos for pos, _ in corpus.lexical_index.search(item['query'], k=n_candidates)])
+        if len(rankings) > 1:
+            fused = reciprocal_rank_fusion(rankings)[:n_candidates]
+            best = fused[0][1]
+            candidates = [(pos, corpus.metadatas[pos], float(distances[pos]), score / best)
+                          for pos, score in fused]
+        else:
+            candidates = [(pos, corpus.metadatas[pos], float(distances[pos]), max(0.0, 1 - float(distances[pos])))
+                          for pos in rankings[0]]
+
+        ranked = [r['id'] for r in rerank(candidates, relevance_weight=config['relevance_weight'],
+                                          rating_weight=config['rating_weight'])]
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        metrics = ranking_metrics(ranked, item['groups'], ks)
+        per_query.append({
+            'query': item['query'],
+            'variants': variants,
+            'top': [corpus.titles[pos] for pos in ranked[:N_RESULTS]],
+            **metrics
+        })
+
+    summary = {
+        name: float(np.mean([q[name] for q in per_query]))
+        for name in per_query[0] if name not in ('query', 'variants', 'top')
+    } if per_query else {}
+    summary['p50_ms'] = float(np.percentile(latencies, 50)) if latencies else 0.0
+    summary['p95_ms'] = float(np.percentile(latencies, 95)) if latencies else 0.0
+    summary['expand_ms'] = float(np.percentile(expand_latencies, 50)) if expand_latencies else 0.0
+    return {'config': config, 'summary': summary, 'queries': per_query}
@@ -4,187 +4,162 @@ Script para obtener datos reales de películas desde TMDB API
 y crear los archivos CSV necesarios para el sistema de recomendación.
 """
 
-import requests
 import pandas as pd
 import json
 import time
 import os
+import sys
+from datetime import date, timedelta
 from pathlib import Path
 
-TMDB_API_KEY = os.getenv("TMDB_API_KEY") or input("Ingresa tu API key de TMDB: ").strip()
-BASE_URL = "https://api.themoviedb.org/3"
+from tmdb_client import ResponseCache, TMDBClient, TMDBError
+
 DATA_DIR = Path(__file__).parent.parent / "data"
 
+# Las listas de populares cambian a diario; los detalles de cada película
+# usan el TTL por defecto de la caché (TMDB_CACHE_TTL)
+POPULAR_CACHE_TTL = 3600
+
+# Sincronización incremental con /movie/changes
+SYNC_STATE_FILE = DATA_DIR / "tmdb_sync_state.json"
+DELTA_DIR = DATA_DIR / "delta"
+CHANGES_WINDOW_DAYS = 14  # Máximo rango de fechas que acepta TMDB
+
 # Crear directorio si no existe
 DATA_DIR.mkdir(exist_ok=True)
 
-def fetch_popular_movies(num_pages=10):
-    """Obtiene películas populares de TMDB"""
+def fetch_popular_movies(client, num_pages=10):
+    """Obtiene películas populares de TMDB (páginas en paralelo)"""
     print(f"\n🎬 Obteniendo películas populares (páginas: {num_pages})...")
-    movies = []
-
-    for page in range(1, num_pages + 1):
-        url = f"{BASE_URL}/movie/popular"
-        params = {
-            "api_key": TMDB_API_KEY,
-            "page": page,
-            "language": "en-US"
-        }
 
+    def fetch_page(page):
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            movies.extend(data['results'])
+            data = client.get("/movie/popular", ttl=POPULAR_CACHE_TTL, page=page, language="en-US")
             print(f"   Página {page}/{num_pages} - {len(data['results'])} películas obtenidas")
-            time.sleep(0.25)  # Respetar rate limits
-        except Exception as e:
+            return data['results']
+        except TMDBError as e:
             print(f"   ⚠️  Error en página {page}: {e}")
-            continue
+            return []
+
+    movies = []
+    for results in client.map(fetch_page, range(1, num_pages + 1)):
+        movies.extend(results)
 
     print(f"   ✅ Total: {len(movies)} películas")
     return movies
 
-def fetch_movie_details(movie_id):
-    """Obtiene detalles completos de una película"""
-    url = f"{BASE_URL}/movie/{movie_id}"
-    params = {
-        "api_key": TMDB_API_KEY,
-        "language": "en-US"
-    }
-
+def fetch_movie_record(client, movie_id, ttl=None):
+    """
+    Obtiene detalles, keywords y créditos de una película en una sola
+    petición usando append_to_response.
+    """
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"   ⚠️  Error obteniendo detalles de movie {movie_id}: {e}")
+        return client.get(f"/movie/{movie_id}", ttl=ttl, language="en-US",
+                          append_to_response="keywords,credits")
+    except TMDBError as e:
+        print(f"   ⚠️  Error obteniendo datos de movie {movie_id}: {e}")
         return None
 
-def fetch_movie_keywords(movie_id):
-    """Obtiene keywords de una película"""
-    url = f"{BASE_URL}/movie/{movie_id}/keywords"
-    params = {"api_key": TMDB_API_KEY}
+def fetch_movie_records(client, movies):
+    """
+    Descarga el registro completo de cada película una única vez.
 
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        return data.get('keywords', [])
-    except Exception as e:
-        print(f"   ⚠️  Error obteniendo keywords de movie {movie_id}: {e}")
-        return []
-
-def fetch_movie_credits(movie_id):
-    """Obtiene créditos (cast y crew) de una película"""
-    url = f"{BASE_URL}/movie/{movie_id}/credits"
-    params = {"api_key": TMDB_API_KEY}
+    Returns:
+        Lista de registros (detalles + keywords + credits) en el orden de
+        `movies`, sin IDs repetidos ni películas que fallaron
+    """
+    print("\n📥 Descargando detalles, keywords y créditos...")
 
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        return {
-            'cast': data.get('cast', [])[:5],
-            'crew': [c for c in data.get('crew', []) if c.get('job') == 'Director']
-        }
-    except Exception as e:
-        print(f"   ⚠️  Error obteniendo créditos de movie {movie_id}: {e}")
-        return {'cast': [], 'crew': []}
+    unique_ids = list(dict.fromkeys(movie['id'] for movie in movies))
+    records = client.map(lambda movie_id: fetch_movie_record(client, movie_id), unique_ids)
+    records = [r for r in records if r]
+
+    print(f"   ✅ {len(records)}/{len(unique_ids)} películas descargadas")
+    return records
 
-def create_movies_metadata(movies):
+def create_movies_metadata(records, output_dir=None):
     """Crea el archivo movies_metadata.csv"""
     print("\n📝 Creando movies_metadata.csv...")
 
     metadata_list = []
-    for movie in movies:
-        # Obtener detalles completos
-        details = fetch_movie_details(movie['id'])
-        if not details:
-            continue
-
+    for details in records:
         metadata = {
-            'id': movie['id'],
-            'original_title': movie.get('original_title', ''),
-            'overview': movie.get('overview', ''),
-            'poster_path': movie.get('poster_path', ''),
+            'id': details['id'],
+            'original_title': details.get('original_title', ''),
+            'overview': details.get('overview', ''),
+            'poster_path': details.get('poster_path', ''),
             'genres': json.dumps([{'name': g['name']} for g in details.get('genres', [])]),
-            'vote_average': movie.get('vote_average', 0),
+            'vote_average': details.get('vote_average', 0),
+            'vote_count': details.get('vote_count', 0),
+            'release_date': details.get('release_date', ''),
             'tagline': details.get('tagline', '')
         }
         metadata_list.append(metadata)
-        time.sleep(0.1)
 
     df = pd.DataFrame(metadata_list)
-    df.to_csv(DATA_DIR / "movies_metadata.csv", index=False)
+    df.to_csv(Path(output_dir or DATA_DIR) / "movies_metadata.csv", index=False)
     print(f"   ✅ {len(df)} películas guardadas")
     return df
 
-def create_keywords(movies):
+def create_keywords(records, output_dir=None):
     """Crea el archivo keywords.csv"""
     print("\n🏷️  Creando keywords.csv...")
 
     keywords_list = []
-    for movie in movies:
-        keywords = fetch_movie_keywords(movie['id'])
+    for details in records:
+        keywords = details.get('keywords', {}).get('keywords', [])
         keywords_formatted = json.dumps([{'name': k['name']} for k in keywords[:5]])
 
         keywords_list.append({
-            'id': movie['id'],
+            'id': details['id'],
             'keywords': keywords_formatted
         })
-        time.sleep(0.1)
 
     df = pd.DataFrame(keywords_list)
-    df.to_csv(DATA_DIR / "keywords.csv", index=False)
+    df.to_csv(Path(output_dir or DATA_DIR) / "keywords.csv", index=False)
     print(f"   ✅ {len(df)} entradas guardadas")
     return df
 
-def create_credits(movies):
+def create_credits(records, output_dir=None):
     """Crea el archivo credits.csv"""
     print("\n🎭 Creando credits.csv...")
 
     credits_list = []
-    for movie in movies:
-        credits = fetch_movie_credits(movie['id'])
+    for details in records:
+        credits = details.get('credits', {})
+        cast = credits.get('cast', [])[:5]
+        crew = [c for c in credits.get('crew', []) if c.get('job') == 'Director']
 
-        cast_formatted = json.dumps([{'name': c['name']} for c in credits['cast']])
-        crew_formatted = json.dumps([{'name': c['name'], 'job': c['job']} for c in credits['crew']])
+        cast_formatted = json.dumps([{'name': c['name']} for c in cast])
+        crew_formatted = json.dumps([{'name': c['name'], 'job': c['job']} for c in crew])
 
         credits_list.append({
-            'id': movie['id'],
+            'id': details['id'],
             'cast': cast_formatted,
             'crew': crew_formatted
         })
-        time.sleep(0.1)
 
     df = pd.DataFrame(credits_list)
-    df.to_csv(DATA_DIR / "credits.csv", index=False)
+    df.to_csv(Path(output_dir or DATA_DIR) / "credits.csv", index=False)
     print(f"   ✅ {len(df)} entradas guardadas")
     return df
 
-def create_links(movies):
+def create_links(records, output_dir=None):
     """Crea el archivo links.csv"""
     print("\n🔗 Creando links.csv...")
 
     links_list = []
-    for movie in movies:
-        # Obtener detalles para conseguir imdb_id
-        details = fetch_movie_details(movie['id'])
-        if not details:
-            continue
-
+    for details in records:
         imdb_id = details.get('imdb_id', '').replace('tt', '') if details.get('imdb_id') else ''
 
         links_list.append({
-            'movieId': movie['id'],
+            'movieId': details['id'],
             'imdbId': imdb_id,
-            'tmdbId': movie['id']
+            'tmdbId': details['id']
         })
-        time.sleep(0.1)
 
     df = pd.DataFrame(links_list)
-    df.to_csv(DATA_DIR / "links.csv", index=False)
+    df.to_csv(Path(output_dir or DATA_DIR) / "links.csv", index=False)
     print(f"   ✅ {len(df)} enlaces guardados")
     return df
 
@@ -221,41 +196,211 @@ def create_ratings(movies, num_users=50):
     print(f"   ✅ {len(df)} ratings guardados")
     return df
 
+def load_sync_state():
+    """Devuelve el estado de la última sincronización (o None)"""
+    try:
+        with open(SYNC_STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_sync_state(last_sync):
+    with open(SYNC_STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'last_sync': last_sync.isoformat()}, f, indent=2)
+
+def fetch_changed_movie_ids(client, start_date, end_date):
+    """
+    Obtiene los IDs de películas modificadas en TMDB entre dos fechas.
+
+    TMDB limita cada consulta a 14 días, así que el rango se recorre en
+    ventanas y cada ventana página a página.
+    """
+    changed = set()
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(window_start + timedelta(days=CHANGES_WINDOW_DAYS - 1), end_date)
+        page, total_pages = 1, 1
+        while page <= total_pages:
+            data = client.get("/movie/changes", ttl=0, page=page,
+                              start_date=window_start.isoformat(),
+                              end_date=window_end.isoformat())
+            changed.update(item['id'] for item in data.get('results', []))
+            total_pages = data.get('total_pages', 1)
+            page += 1
+        window_start = window_end + timedelta(days=1)
+    return changed
+
+def _upsert_csv(path, delta_df, removed_ids, key='id'):
+    """Reemplaza en `path` las filas de `delta_df` y elimina `removed_ids`"""
+    if not path.exists():
+        delta_df.to_csv(path, index=False)
+        return
+    df = pd.read_csv(path, dtype={key: str}, low_memory=False)
+    replaced = {str(i) for i in removed_ids}
+    if len(delta_df):
+        replaced |= {str(i) for i in delta_df[key]}
+    df = df[~df[key].isin(replaced)]
+    pd.concat([df, delta_df], ignore_index=True).to_csv(path, index=False)
+
+def sync_catalog(client, today=None):
+    """
+    Sincroniza el catálogo local con los cambios publicados por TMDB.
+
+    Consulta /movie/changes desde la última sincronización, vuelve a
+    descargar solo las películas del catálogo que cambiaron y escribe el
+    delta en data/delta/ (CSV con el mismo formato que los originales y
+    delta.json con los IDs actualizados y eliminados). Los CSV originales
+    se actualizan en el sitio para que un proceso completo posterior sea
+    coherente.
+
+    Si falla la consulta de cambios no se escribe nada y se conserva la
+    fecha de la última sincronización; si falla alguna película, el delta
+    se escribe pero la fecha tampoco avanza, así la siguiente ejecución
+    vuelve a cubrir el mismo intervalo (las actualizaciones son idempotentes).
+
+    Returns:
+        Dict del delta, o None si no hay sincronización previa o la
+        consulta de cambios falló
+    """
+    print("\n🔄 Sincronizando catálogo con /movie/changes...")
+    state = load_sync_state()
+    metadata_file = DATA_DIR / "movies_metadata.csv"
+    if not state or not metadata_file.exists():
+        print("   ❌ No hay sincronización previa. Ejecuta primero el proceso completo.")
+        return None
+
+    today = today or date.today()
+    since = date.fromisoformat(state['last_sync'])
+    print(f"   📅 Cambios desde {since.isoformat()} hasta {today.isoformat()}")
+
+    catalog_ids = pd.to_numeric(
+        pd.read_csv(metadata_file, usecols=['id'], dtype=str)['id'], errors='coerce'
+    ).dropna().astype(int)
+    catalog_ids = set(catalog_ids)
+
+    try:
+        changed = fetch_changed_movie_ids(client, since, today)
+    except TMDBError as e:
+        print(f"   ❌ Sincronización fallida consultando /movie/changes: {e}")
+        print(f"   La próxima sincronización volverá a empezar en {since.isoformat()}")
+        return None
+    to_refresh = sorted(changed & catalog_ids)
+    print(f"   📝 {len(changed):,} películas cambiadas en TMDB, {len(to_refresh):,} en el catálogo")
+
+    def refresh(movie_id):
+        # ttl=0 fuerza la revalidación; si no cambió, TMDB responde 304
+        try:
+            return movie_id, client.get(f"/movie/{movie_id}", ttl=0, language="en-US",
+                                        append_to_response="keywords,credits")
+        except TMDBError as e:
+            if e.status == 404:
+                return movie_id, None
+            print(f"   ⚠️  Error obteniendo datos de movie {movie_id}: {e}")
+            return movie_id, False
+
+    records, deleted_ids, failed_ids = [], [], []
+    for movie_id, record in client.map(refresh, to_refresh):
+        if record is None:
+            deleted_ids.append(movie_id)
+        elif record:
+            records.append(record)
+        else:
+            failed_ids.append(movie_id)
+
+    DELTA_DIR.mkdir(exist_ok=True)
+    delta_frames = {
+        'movies_metadata.csv': create_movies_metadata(records, output_dir=DELTA_DIR),
+        'keywords.csv': create_keywords(records, output_dir=DELTA_DIR),
+        'credits.csv': create_credits(records, output_dir=DELTA_DIR),
+    }
+    for filename, delta_df in delta_frames.items():
+        _upsert_csv(DATA_DIR / filename, delta_df, deleted_ids)
+
+    delta = {
+        'since': since.isoformat(),
+        'until': today.isoformat(),
+        'updated_ids': [r['id'] for r in records],
+        'deleted_ids': deleted_ids,
+        'failed_ids': failed_ids
+    }
+    with open(DELTA_DIR / "delta.json", 'w', encoding='utf-8') as f:
+        json.dump(delta, f, indent=2)
+    if failed_ids:
+        print(f"   ⚠️  {len(failed_ids)} películas sin actualizar: la próxima sincronización "
+              f"volverá a empezar en {since.isoformat()}")
+    else:
+        save_sync_state(today)
+
+    print(f"   ✅ Delta: {len(records)} actualizadas, {len(deleted_ids)} eliminadas")
+    return delta
+
+def create_client():
+    """Crea el cliente de TMDB con la configuración de entorno"""
+    # TMDB_OFFLINE=1 reconstruye los CSV solo desde la caché, sin red
+    offline = os.getenv("TMDB_OFFLINE", "") == "1"
+    api_key = os.getenv("TMDB_API_KEY", "")
+    if not api_key and not offline:
+        api_key = input("Ingresa tu API key de TMDB: ").strip()
+
+    cache = ResponseCache()
+    client = TMDBClient(api_key, cache=cache, offline=offline)
+    print(f"   ⚙️  Concurrencia: {client.concurrency} | Límite: {client.limiter.rate:.0f} req/s")
+    print(f"   🗄️  Caché de respuestas: {cache.cache_dir}{' (offline)' if offline else ''}")
+    return client
+
 def main():
     print("=" * 60)
     print("🎬 OBTENCIÓN DE DATOS DESDE TMDB API")
     print("=" * 60)
 
+    client = create_client()
+
     # Validar API key
-    print("\n🔑 Validando API key...")
-    test_url = f"{BASE_URL}/configuration"
-    try:
-        response = requests.get(test_url, params={"api_key": TMDB_API_KEY})
-        response.raise_for_status()
-        print("   ✅ API key válida")
-    except Exception as e:
-        print(f"   ❌ Error: API key inválida o problema de conexión")
-        print(f"   Detalle: {e}")
+    if not client.offline:
+        print("\n🔑 Validando API key...")
+        try:
+            client.get("/configuration", ttl=0)
+            print("   ✅ API key válida")
+        except TMDBError as e:
+            print(f"   ❌ Error: API key inválida o problema de conexión")
+            print(f"   Detalle: {e}")
+            return
+
+    if '--sync' in sys.argv:
+        delta = sync_catalog(client)
+        client.close()
+        if delta is not None:
+            print("\n📋 Próximos pasos:")
+            print("   1. python src/01_clean_data.py --delta")
+            print("   2. python src/02_ingest.py --delta")
         return
 
-    movies = fetch_popular_movies(num_pages=10)
+    start = time.time()
+    movies = fetch_popular_movies(client, num_pages=10)
 
     if not movies:
         print("❌ No se pudieron obtener películas")
         return
 
+    # Una sola descarga por película; todos los CSV salen de los mismos registros
+    records = fetch_movie_records(client, movies)
+
     # Crear todos los archivos CSV
-    create_movies_metadata(movies)
-    create_keywords(movies)
-    create_credits(movies)
-    create_links(movies)
+    create_movies_metadata(records)
+    create_keywords(records)
+    create_credits(records)
+    create_links(records)
     create_ratings(movies, num_users=50)
+    save_sync_state(date.today())
+    client.close()
 
     print("\n" + "=" * 60)
     print("✨ PROCESO COMPLETADO CON ÉXITO")
     print("=" * 60)
     print(f"📁 Archivos creados en: {DATA_DIR}")
     print(f"📊 Total de películas: {len(movies)}")
+    print(f"🌐 Peticiones a TMDB: {client.request_count} en {time.time() - start:.1f}s "
+          f"(caché: {client.cache_hits} aciertos, {client.revalidated} revalidadas)")
     print("\n📋 Próximos pasos:")
     print("   1. python src/01_clean_data.py")
     print("   2. python src/02_ingest.py")
@@ -0,0 +1,218 @@
+"""
+Índice difuso de títulos y actores para resolver consultas por nombre
+(incluso mal escritas) sin pasar por el LLM ni por el modelo de embeddings.
+
+Los candidatos se generan con un índice de trigramas y se puntúan con
+difflib.SequenceMatcher, que tolera letras cambiadas o transpuestas.
+"""
+import os
+import pickle
+import threading
+import time
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from lexical_index import INDEX_DIR, normalize_text, tokenize
+from ratings import movie_rating
+
+FUZZY_INDEX_FILE = os.path.join(INDEX_DIR, 'fuzzy_index.pkl')
+
+# Confianza mínima para responder sin la búsqueda semántica
+MIN_CONFIDENCE = 0.8
+MIN_QUERY_LENGTH = 3
+MAX_CANDIDATES = 10
+MAX_RESULTS = 6
+
+# Palabras de género: una consulta formada solo por ellas ("terror",
+# "comedia romántica") es temática aunque exista una película con ese título
+GENRE_TERMS = {
+    'accion', 'animacion', 'aventura', 'aventuras', 'belica', 'ciencia', 'ficcion',
+    'comedia', 'crimen', 'documental', 'drama', 'familia', 'familiar', 'fantasia',
+    'historia', 'miedo', 'misterio', 'musica', 'musical', 'pelicula', 'peliculas',
+    'romance', 'romantica', 'romantico', 'suspense', 'terror', 'thriller', 'western',
+    'movie', 'movies', 'film', 'films', 'scary', 'funny', 'love', 'war', 'sci', 'fi'
+}
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    """
+    Índice de trigramas sobre títulos y nombres del reparto.
+
+    Cada entrada es un nombre normalizado con su tipo ('title' o 'person')
+    y las películas asociadas. Las métricas de uso (consultas, aciertos y
+    tiempo de búsqueda) se acumulan en `stats`.
+    """
+
+    def __init__(self, ids, titles, casts, metadatas, genres=()):
+        self.metadatas = dict(zip(ids, metadatas))
+        self.entries = []
+        self.postings = defaultdict(set)
+        self.genre_terms = set(GENRE_TERMS)
+        for genre_text in genres:
+            self.genre_terms.update(tokenize(genre_text))
+
+        by_name = {}
+        for movie_id, title, cast in zip(ids, titles, casts):
+            names = [('title', title)] + [('person', name) for name in cast]
+            for kind, name in names:
+                norm = normalize_text(name).strip()
+                if len(norm) < MIN_QUERY_LENGTH:
+                    continue
+                key = (kind, norm)
+                if key not in by_name:
+                    by_name[key] = len(self.entries)
+                    self.entries.append({
+                        'kind': kind, 'name': name, 'norm': norm,
+                        # Sin artículos ni stopwords: "Shining" ~ "The Shining"
+                        'key': ' '.join(tokenize(norm)),
+                        'ids': []
+                    })
+                self.entries[by_name[key]]['ids'].append(movie_id)
+
+        # Títulos agrupados por primera palabra, para encontrar secuelas
+        self.titles_by_head = defaultdict(list)
+        for entry_idx, entry in enumerate(self.entries):
+            for gram in trigrams(entry['norm']):
+                self.postings[gram].add(entry_idx)
+            if entry['kind'] == 'title':
+                self.titles_by_head[entry['norm'].split()[0]].append(entry_idx)
+        self.postings = dict(self.postings)
+        self.titles_by_head = dict(self.titles_by_head)
+
+        self.stats = {'lookups': 0, 'hits': 0, 'lookup_ms': 0.0}
+        self._stats_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.metadatas)
+
+    def is_eligible(self, query):
+        """Las consultas temáticas nunca toman la ruta rápida"""
+        norm = normalize_text(query).strip()
+        if len(norm) < MIN_QUERY_LENGTH:
+            return False
+        tokens = tokenize(norm)
+        return bool(tokens) and not all(t in self.genre_terms for t in tokens)
+
+    def lookup(self, query, min_confidence=MIN_CONFIDENCE):
+        """
+        Busca un título o actor que coincida con la consulta.
+
+        Returns:
+            Dict con kind, name, confidence y results (lista de
+            (movie_id, metadata) ordenada), o None si la confianza es baja
+        """
+        start = time.perf_counter()
+        match = self._lookup(query, min_confidence) if self.is_eligible(query) else None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._stats_lock:
+            self.stats['lookups'] += 1
+            self.stats['lookup_ms'] += elapsed_ms
+            if match:
+                self.stats['hits'] += 1
+        return match
+
+    def _lookup(self, query, min_confidence):
+        norm = normalize_text(query).strip()
+        key = ' '.join(tokenize(norm))
+
+        overlap = defaultdict(int)
+        for gram in trigrams(norm):
+            for entry_idx in self.postings.get(gram, ()):
+                overlap[entry_idx] += 1
+        if not overlap:
+            return None
+
+        candidates = sorted(overlap, key=overlap.get, reverse=True)[:MAX_CANDIDATES]
+        scored = []
+        for entry_idx in candidates:
+            entry = self.entries[entry_idx]
+            confidence = max(
+                SequenceMatcher(None, norm, entry['norm']).ratio(),
+                SequenceMatcher(None, key, entry['key']).ratio()
+            )
+            # A igualdad de confianza, los títulos ganan a los actores
+            scored.append((confidence, entry['kind'] == 'title', entry_idx))
+        confidence, _, best_idx = max(scored)
+        if confidence < min_confidence:
+            return None
+
+        best = self.entries[best_idx]
+        movie_ids = list(best['ids'])
+        if best['kind'] == 'title':
+            # Incluir secuelas y títulos relacionados ("Toy Story 2")
+            for entry_idx in self.titles_by_head.get(best['norm'].split()[0], ()):
+                entry = self.entries[entry_idx]
+                if entry is not best and entry['norm'].startswith(best['norm']):
+                    movie_ids.extend(entry['ids'])
+
+        movie_ids = list(dict.fromkeys(movie_ids))
+        results = [(movie_id, self.metadatas[movie_id]) for movie_id in movie_ids]
+        if best['kind'] == 'person':
+            results.sort(key=lambda r: movie_rating(r[1]), reverse=True)
+
+        return {
+            'kind': best['kind'],
+            'name': best['name'],
+            'confidence': confidence,
+            'results': results[:MAX_RESULTS]
+        }
+
+    def hit_rate(self):
+        lookups = self.stats['lookups']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def save(self, path=FUZZY_INDEX_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path=FUZZY_INDEX_FILE):
+        """Carga el índice desde disco, o None si no se ha generado"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_stats_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.stats = {'lookups': 0, 'hits': 0, 'lookup_ms': 0.0}
+        self._stats_lock = threading.Lock()
+
+
+def build_fuzzy_index(df, metadatas, path=FUZZY_INDEX_FILE):
+    """
+    Construye el índice a partir de las filas de movies_clean.csv.
+
+    Args:
+        df: DataFrame con id, title, cast_text y genres_text
+        metadatas: Metadatos de ChromaDB de cada fila, en el mismo orden
+    """
+    def split_cast(cast_text):
+        if not isinstance(cast_text, str):
+            return []
+        return [name.strip() for name in cast_text.split(',') if name.strip()]
+
+    genres = df['genres_text'].dropna().unique() if 'genres_text' in df.columns else ()
+    index = FuzzyIndex(
+        ids=[str(i) for i in df['id']],
+        titles=[str(t) for t in df['title']],
+        casts=[split_cast(c) for c in df.get('cast_text', [''] * len(df))],
+        metadatas=metadatas,
+        genres=genres
+    )
+    index.save(path)
+    return index
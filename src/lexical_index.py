@@ -0,0 +1,163 @@
+"""
+Índice léxico BM25 sobre los documentos de ChromaDB y fusión de rankings
+mediante Reciprocal Rank Fusion (RRF).
+
+Complementa la búsqueda vectorial en consultas por nombre ("Jumanji",
+"Toy Story", actores), donde los embeddings densos fallan con frecuencia.
+"""
+import math
+import os
+import pickle
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+
+INDEX_DIR = os.path.join(PROJECT_ROOT, 'indexes')
+LEXICAL_INDEX_FILE = os.path.join(INDEX_DIR, 'lexical_index.pkl')
+
+# Parámetros estándar de BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Constante de RRF (Cormack et al.)
+RRF_K = 60
+# El título se repite para que pese más que la sinopsis
+TITLE_WEIGHT = 2
+
+STOPWORDS = {
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'es', 'esta', 'la', 'las', 'lo', 'los',
+    'por', 'que', 'se', 'sobre', 'su', 'un', 'una', 'y',
+    'an', 'and', 'by', 'for', 'in', 'is', 'it', 'of', 'on', 'the', 'to', 'with'
+}
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_text(text):
+    """Minúsculas y sin acentos, para comparar títulos y nombres"""
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall(normalize_text(text)) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 en memoria.
+
+    Las listas de postings guardan (posición del documento, frecuencia), de
+    modo que una consulta solo recorre los documentos que contienen alguno
+    de sus términos.
+    """
+
+    def __init__(self, ids, titles, texts):
+        self.ids = list(ids)
+        self.titles = list(titles)
+        self.title_ids = self._title_ids(self.ids, self.titles)
+        self.postings = defaultdict(list)
+        self.doc_lengths = []
+
+        for doc_idx, (title, text) in enumerate(zip(self.titles, texts)):
+            tokens = tokenize(text) + tokenize(title) * TITLE_WEIGHT
+            self.doc_lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                self.postings[term].append((doc_idx, freq))
+
+        self.postings = dict(self.postings)
+        n_docs = len(self.ids)
+        self.avg_length = (sum(self.doc_lengths) / n_docs) if n_docs else 0.0
+        self.idf = {
+            term: math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Índices guardados antes de que existiera el diccionario de títulos
+        if 'title_ids' not in state:
+            self.title_ids = self._title_ids(self.ids, self.titles)
+        self.__dict__.pop('norm_titles', None)
+
+    @staticmethod
+    def _title_ids(ids, titles):
+        """{título normalizado: id}; si se repite un título, el primero"""
+        title_ids = {}
+        for doc_id, title in zip(ids, titles):
+            title_ids.setdefault(normalize_text(title).strip(), doc_id)
+        return title_ids
+
+    def search(self, query, k=20):
+        """
+        Devuelve los `k` documentos con mayor puntuación BM25.
+
+        Returns:
+            Lista de tuplas (id, puntuación) ordenada de mayor a menor
+        """
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for doc_idx, freq in plist:
+                length_norm = 1 - BM25_B + BM25_B * self.doc_lengths[doc_idx] / self.avg_length
+                scores[doc_idx] += idf * freq * (BM25_K1 + 1) / (freq + BM25_K1 * length_norm)
+
+        top = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+        return [(self.ids[doc_idx], score) for doc_idx, score in top]
+
+    def exact_title_match(self, query):
+        """ID de la película cuyo título coincide exactamente con la consulta"""
+        return self.title_ids.get(normalize_text(query).strip())
+
+    def save(self, path=LEXICAL_INDEX_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path=LEXICAL_INDEX_FILE):
+        """Carga el índice desde disco, o None si no se ha generado"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def build_lexical_index(collection, path=LEXICAL_INDEX_FILE):
+    """
+    Construye el índice BM25 a partir de los documentos de la colección,
+    para que siempre refleje exactamente lo que hay en ChromaDB.
+    """
+    data = collection.get(include=['documents', 'metadatas'])
+    titles = [meta.get('title', '') for meta in data['metadatas']]
+    index = BM25Index(data['ids'], titles, data['documents'])
+    index.save(path)
+    return index
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """
+    Fusiona varias listas de IDs ordenadas por relevancia.
+
+    Args:
+        rankings: Lista de listas de IDs (la primera posición es la mejor)
+        k: Constante de RRF; valores altos suavizan la diferencia entre rangos
+
+    Returns:
+        Lista de tuplas (id, puntuación RRF) ordenada de mayor a menor
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
@@ -0,0 +1,184 @@
+"""
+Presupuestos de latencia y circuit breaker para las llamadas al LLM.
+
+Cada llamada tiene un presupuesto por etapa: si el LLM no responde a
+tiempo, quien la hizo sigue sin ella (busca con la query original o
+muestra los resultados sin recomendación) y la petición HTTP al LLM se
+abandona en segundo plano. Así la latencia de cola la fija el presupuesto,
+no el proveedor.
+
+El circuit breaker deja de llamar al LLM tras LLM_BREAKER_FAILURES fallos
+o timeouts seguidos; pasados LLM_BREAKER_RESET_S segundos deja pasar una
+única llamada de prueba y, si responde bien, vuelve a cerrarse.
+
+    closed ──(N fallos)──> open ──(reset_timeout)──> half_open
+       ^                     ^                          │
+       └────(prueba ok)──────┴─────(prueba falla)───────┘
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+# Presupuesto de cada etapa (ms)
+LLM_EXPAND_BUDGET_MS = float(os.getenv("LLM_EXPAND_BUDGET_MS", "1500"))
+LLM_ENRICH_BUDGET_MS = float(os.getenv("LLM_ENRICH_BUDGET_MS", "8000"))
+LLM_INSIGHT_BUDGET_MS = float(os.getenv("LLM_INSIGHT_BUDGET_MS", "3000"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_S = float(os.getenv("LLM_BREAKER_RESET_S", "30"))
+# Llamadas al LLM en curso como máximo (incluidas las abandonadas por timeout)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+
+class LLMUnavailable(Exception):
+    """
+    El LLM no respondió dentro del presupuesto, falló o el circuito está
+    abierto (`reason`: 'timeout', 'error' o 'circuit_open').
+    """
+
+    def __init__(self, message, reason='error'):
+        super().__init__(message)
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker thread-safe (estados closed, open y half_open).
+
+    Args:
+        failure_threshold: Fallos seguidos que abren el circuito
+        reset_timeout: Segundos abierto antes de dejar pasar una prueba
+        name: Nombre en los avisos del log
+    """
+
+    def __init__(self, failure_threshold=LLM_BREAKER_FAILURES, reset_timeout=LLM_BREAKER_RESET_S, name='LLM'):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.stats = {'opened': 0, 'rejected': 0}
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Si se puede llamar ahora (en half_open, solo una llamada de prueba a la vez)"""
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'closed' or (self.state == 'half_open' and not self._probing):
+                self._probing = self.state == 'half_open'
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                print(f"✅ {self.name} recuperado: circuito cerrado")
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                if self.state == 'closed':
+                    print(f"🔌 {self.name} no disponible ({self.failures} fallos seguidos): circuito abierto "
+                          f"durante {self.reset_timeout:g}s")
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                self.stats['opened'] += 1
+
+
+class LLMGuard:
+    """
+    Ejecuta las llamadas al LLM en un pool propio con un tiempo máximo de
+    espera y las cuenta en un circuit breaker por ruta (modelo), de modo
+    que un modelo caído no corta las llamadas a los demás.
+
+    Args:
+        breaker: Circuit breaker de las llamadas sin ruta; las rutas usan
+            uno nuevo con sus mismos parámetros
+    """
+
+    def __init__(self, breaker=None, max_workers=LLM_MAX_CONCURRENCY):
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.breakers = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+        self.stats = {'calls': 0, 'timeouts': 0, 'errors': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def breaker_for(self, route=None):
+        if route is None:
+            return self.breaker
+        with self._lock:
+            breaker = self.breakers.get(route)
+            if breaker is None:
+                breaker = self.breakers[route] = CircuitBreaker(self.breaker.failure_threshold,
+                                                                self.breaker.reset_timeout, name=route)
+            return breaker
+
+    def call(self, func, budget_ms, route=None):
+        """
+        Devuelve func() si termina en `budget_ms`.
+
+        Args:
+            route: Clave del circuit breaker (el modelo); None = el general
+
+        Raises:
+            LLMUnavailable: Circuito abierto, timeout o excepción de func
+        """
+        breaker = self.breaker_for(route)
+        if not breaker.allow():
+            self._count('rejected')
+            raise LLMUnavailable(f"circuito abierto tras fallos seguidos de {route or 'el LLM'}",
+                                 reason='circuit_open')
+        self._count('calls')
+
+        timed_out = threading.Event()
+
+        def done(future):
+            # Una respuesta que llega tarde ya se contó como fallo
+            if timed_out.is_set():
+                return
+            if future.exception() is None:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+        future = self.executor.submit(func)
+        try:
+            return future.result(timeout=budget_ms / 1000)
+        except FuturesTimeout:
+            timed_out.set()
+            future.cancel()
+            self._count('timeouts')
+            breaker.record_failure()
+            raise LLMUnavailable(f"sin respuesta en {budget_ms:g} ms", reason='timeout')
+        except Exception as e:
+            self._count('errors')
+            raise LLMUnavailable(f"{type(e).__name__}: {e}") from e
+        finally:
+            future.add_done_callback(done)
+
+    def health(self):
+        with self._lock:
+            breakers = {None: self.breaker, **self.breakers}
+            stats = dict(self.stats)
+        return {
+            **stats,
+            'circuits': {route or 'default': b.state for route, b in breakers.items()},
+            'circuit_opened': sum(b.stats['opened'] for b in breakers.values()),
+        }
+
+
+# Guardia compartida por todo el proceso (UI y API)
+LLM_GUARD = LLMGuard()
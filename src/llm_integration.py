@@ -1,19 +1,29 @@
 """
 Módulo para integración con NVIDIA NIMs LLM
 """
+from functools import lru_cache
 from openai import OpenAI
 import os
+import re
+
+from llm_guard import LLM_ENRICH_BUDGET_MS, LLM_EXPAND_BUDGET_MS, LLM_INSIGHT_BUDGET_MS, LLMUnavailable
+from llm_router import LLM_ROUTER
+from token_budget import LLM_ENRICH_WORDS, build_movies_context, estimate_tokens, output_token_limit
 
 NVIDIA_API_KEY = os.getenv("NVIDIA_API_KEY", "")
 NVIDIA_BASE_URL = os.getenv("NVIDIA_BASE_URL", "https://integrate.api.nvidia.com/v1")
 
-MODEL_NAME = "deepseek-ai/deepseek-r1"  # Modelo LLM
+# Los modelos de cada tarea (y sus reservas) se eligen en llm_router.py
 
+@lru_cache(maxsize=1)
 def get_llm_client():
-    """Crea y retorna cliente de NVIDIA NIMs"""
+    """Cliente de NVIDIA NIMs compartido (reutiliza las conexiones HTTP)"""
+    # Sin reintentos: con un presupuesto de latencia no hay tiempo para ellos
+    # y, si el LLM está caído, solo multiplican la carga (ver llm_guard.py)
     return OpenAI(
         base_url=NVIDIA_BASE_URL,
-        api_key=NVIDIA_API_KEY
+        api_key=NVIDIA_API_KEY,
+        max_retries=0
     )
 
 def optimize_search_query(user_query):
@@ -42,25 +52,27 @@ Output: "Película de terror con miedo, suspenso y elementos sobrenaturales. Fil
 
 Responde SOLO con la consulta expandida."""
 
-    try:
-        client = get_llm_client()
-        
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
+    def call(model, timeout):
+        return get_llm_client().chat.completions.create(
+            model=model,
             messages=[
                 {"role": "system", "content": "Eres un experto en búsqueda de películas que expande queries para mejor búsqueda semántica."},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.4,
             max_tokens=200,
-            top_p=0.9
+            top_p=0.9,
+            timeout=timeout
         )
+    
+    try:
+        response, _ = LLM_ROUTER.complete('expand', call, LLM_EXPAND_BUDGET_MS)
         
         if response and response.choices and len(response.choices) > 0:
             message = response.choices[0].message
             
             if hasattr(message, 'content') and message.content:
-                optimized = message.content.strip().strip('"').strip("'")
+                optimized = strip_reasoning(message.content).strip().strip('"').strip("'")
                 return optimized
         
         return user_query
@@ -70,26 +82,130 @@ Responde SOLO con la consulta expandida."""
         return user_query
 
 
-def enrich_movie_recommendations(query, movie_results):
+def strip_reasoning(text):
+    """
+    Quita el bloque <think>...</think> de los modelos de razonamiento
+    (también si quedó sin cerrar al agotarse max_tokens)
+    """
+    return re.sub(r'<think>.*?(</think>|$)', '', text or '', flags=re.DOTALL).strip()
+
+
+def parse_query_variants(text, user_query, max_variants=3):
+    """
+    Extrae las variantes de la respuesta del LLM (líneas "ES: ..." y "EN: ...").
+    
+    La consulta original va siempre primero y se descartan duplicados, de
+    modo que una respuesta vacía o mal formada devuelve solo la original.
+    """
+    text = strip_reasoning(text)
+    
+    variants = [user_query.strip()]
+    for line in text.splitlines():
+        match = re.match(r'^\s*[-*]?\s*\**(ES|EN)\**\s*[:\-]\s*(.+)$', line, flags=re.IGNORECASE)
+        if match:
+            variants.append(match.group(2).strip().strip('"').strip("'"))
+    
+    unique = []
+    for variant in variants:
+        if variant and variant.lower() not in [v.lower() for v in unique]:
+            unique.append(variant)
+    return unique[:max_variants]
+
+
+def generate_query_variants(user_query, max_variants=3):
+    """
+    Genera variantes cortas de la consulta para búsqueda multi-query.
+    
+    Una sola expansión puede desviarse (por ejemplo, hacia otro género);
+    buscar con varias variantes y fusionar los rankings es más robusto.
+    
+    Args:
+        user_query: Query original del usuario
+        max_variants: Número máximo de variantes, incluida la original
+    
+    Returns:
+        Lista de variantes: [original, expansión en español, expansión en inglés]
+        (solo la original si el LLM no está disponible)
+    """
+    try:
+        return request_query_variants(user_query, max_variants)
+    except LLMUnavailable as e:
+        print(f"Error generando variantes de la query: {e}")
+        return [user_query]
+
+
+def request_query_variants(user_query, max_variants=3, budget_ms=LLM_EXPAND_BUDGET_MS):
+    """
+    Como generate_query_variants, pero con un presupuesto de latencia y
+    sin ocultar los fallos.
+    
+    Raises:
+        LLMUnavailable: Timeout, error del LLM o circuito abierto
+    """
+    
+    prompt = f"""Eres un experto en búsqueda de películas. Reescribe la siguiente consulta en dos variantes cortas para una búsqueda semántica.
+
+Consulta: "{user_query}"
+
+Reglas:
+- Cada variante en una línea, de 8 a 20 palabras
+- Mantén el género, la época y los temas de la consulta original; no añadas otros
+- ES: expansión en español con sinónimos y conceptos relacionados
+- EN: la misma expansión en inglés
+
+Ejemplo:
+Input: "película de terror"
+ES: Película de terror con miedo, suspenso, elementos sobrenaturales y atmósfera tenebrosa
+EN: Horror movie with fear, suspense, supernatural elements and a dark, tense atmosphere
+
+Responde SOLO con las dos líneas ES y EN."""
+
+    def call(model, timeout):
+        return get_llm_client().chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": "Eres un experto en búsqueda de películas que reescribe queries para mejor búsqueda semántica."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.4,
+            max_tokens=200,
+            top_p=0.9,
+            timeout=timeout
+        )
+    
+    response, _ = LLM_ROUTER.complete('expand', call, budget_ms)
+    
+    if response and response.choices and len(response.choices) > 0:
+        message = response.choices[0].message
+    
+        if hasattr(message, 'content') and message.content:
+            return parse_query_variants(message.content, user_query, max_variants)
+    
+    return [user_query]
+
+
+def enrich_movie_recommendations(query, movie_results, budget_ms=LLM_ENRICH_BUDGET_MS):
     """
     Enriquece los resultados de búsqueda con recomendaciones generadas por LLM.
     
+    El contexto son las sinopsis cortas de las 3 primeras películas, dentro
+    de un presupuesto de tokens, y max_tokens se ajusta a la longitud pedida
+    y al modelo (ver token_budget.py).
+    
     Args:
         query: La consulta de búsqueda del usuario
         movie_results: Lista de películas encontradas con sus metadatos
+        budget_ms: Tiempo máximo de espera de la respuesta del LLM
     
     Returns:
         Texto enriquecido con análisis y recomendaciones del LLM
+    
+    Raises:
+        LLMUnavailable: Timeout, error o respuesta vacía del LLM, o circuito abierto
     """
     
-    # Preparar contexto con las películas encontradas
-    movies_context = "\n\n".join([
-        f"Película {i+1}: {movie['title']}\n"
-        f"Sinopsis: {movie['overview']}\n"
-        f"Géneros: {movie.get('genres', 'N/A')}\n"
-        f"Similitud: {movie['similarity']:.1f}%"
-        for i, movie in enumerate(movie_results[:3])  # Top 3 películas
-    ])
+    # Preparar contexto con las películas encontradas (top 3, sinopsis cortas)
+    movies_context = build_movies_context(movie_results)
     
     # Crear prompt para el LLM
     prompt = f"""Actúa como un experto crítico de cine y recomendador de películas.
@@ -106,44 +222,61 @@ Por favor:
 3. Da una recomendación personalizada sobre cuál ver primero y por qué
 4. Sugiere qué tipo de espectador disfrutaría más de cada película
 
-Sé conciso pero informativo (máximo 150 palabras)."""
+Sé conciso pero informativo (máximo {LLM_ENRICH_WORDS} palabras)."""
+    system = "Eres un experto crítico de cine que da recomendaciones personalizadas y perspicaces."
 
-    try:
-        client = get_llm_client()
-        
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
+    def call(model, timeout):
+        response = get_llm_client().chat.completions.create(
+            model=model,
             messages=[
-                {"role": "system", "content": "Eres un experto crítico de cine que da recomendaciones personalizadas y perspicaces."},
+                {"role": "system", "content": system},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.7,
-            max_tokens=2048,
-            top_p=0.9
+            max_tokens=output_token_limit(model),
+            top_p=0.9,
+            timeout=timeout
         )
-        
-        # Extraer contenido con mejor manejo
-        if response and response.choices and len(response.choices) > 0:
-            message = response.choices[0].message
-            
-            # Intentar extraer el contenido
-            content = None
-            if hasattr(message, 'content') and message.content:
-                content = message.content
-            elif hasattr(message, 'text') and message.text:
-                content = message.text
-            
-            if content:
-                return content
-            else:
-                return f"⚠️ Respuesta recibida pero sin contenido. Estructura: {str(message)[:200]}"
-        else:
-            return "⚠️ No se recibió respuesta válida del modelo"
+        # Se valida aquí para que una respuesta vacía cuente como fallo del
+        # modelo (circuit breaker) y el router pase al siguiente de la cadena
+        response_text(response)
+        return response
     
-    except Exception as e:
-        import traceback
-        error_detail = traceback.format_exc()
-        return f"⚠️ Error al generar recomendación: {str(e)}\n\nDetalle: {error_detail[:300]}"
+    response, model = LLM_ROUTER.complete('enrich', call, budget_ms)
+    log_token_usage('enrich', model, response, estimate_tokens(system + prompt))
+    return response_text(response)
+
+
+def response_text(response):
+    """
+    Texto de una respuesta del LLM sin el bloque de razonamiento.
+
+    Raises:
+        LLMUnavailable: La respuesta no trae texto (p. ej. un <think> cortado
+            por max_tokens)
+    """
+    if not response or not response.choices:
+        raise LLMUnavailable("no se recibió respuesta válida del modelo")
+    choice = response.choices[0]
+    message = choice.message
+    text = strip_reasoning(getattr(message, 'content', None)) or getattr(message, 'text', None)
+    if text:
+        return text
+    if getattr(choice, 'finish_reason', None) == 'length':
+        raise LLMUnavailable("respuesta sin contenido: cortada por max_tokens")
+    raise LLMUnavailable(f"respuesta sin contenido: {str(message)[:200]}")
+
+
+def log_token_usage(task, model, response, estimated_prompt_tokens):
+    """Imprime los tokens de entrada y salida de una llamada (los de `usage` si el LLM los devuelve)"""
+    usage = getattr(response, 'usage', None)
+    prompt_tokens = getattr(usage, 'prompt_tokens', None) or f"~{estimated_prompt_tokens}"
+    completion_tokens = getattr(usage, 'completion_tokens', None)
+    finish_reason = getattr(response.choices[0], 'finish_reason', None) if response and response.choices else None
+    print(f"🧮 {task} ({model}): {prompt_tokens} tokens de entrada, "
+          f"{completion_tokens if completion_tokens is not None else '?'} de salida"
+          f"{' (cortada por max_tokens)' if finish_reason == 'length' else ''}")
+
 
 def get_movie_insight(movie_title, movie_overview):
     """
@@ -163,19 +296,21 @@ Sinopsis: {movie_overview}
 
 En una sola frase corta (máximo 20 palabras), describe la esencia o tema principal de esta película."""
 
-    try:
-        client = get_llm_client()
-        
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
+    def call(model, timeout):
+        return get_llm_client().chat.completions.create(
+            model=model,
             messages=[
                 {"role": "user", "content": prompt}
             ],
             temperature=0.5,
-            max_tokens=50
+            max_tokens=50,
+            timeout=timeout
         )
+    
+    try:
+        response, _ = LLM_ROUTER.complete('insight', call, LLM_INSIGHT_BUDGET_MS)
         
-        return response.choices[0].message.content.strip()
+        return strip_reasoning(response.choices[0].message.content)
     
     except Exception as e:
         return ""
@@ -0,0 +1,168 @@
+"""
+Enrutado de las llamadas al LLM por tarea, con cadenas de fallback.
+
+Cada tarea usa la cadena de modelos que le corresponde:
+
+    expand  - variantes de la query: un modelo instruct pequeño y rápido
+              (un modelo de razonamiento gasta segundos y cientos de tokens
+              "pensando" antes de reescribir una frase)
+    enrich  - recomendación sobre los resultados: DeepSeek-R1, con un
+              modelo instruct como reserva
+    insight - frase breve sobre una película: modelo rápido
+
+Las cadenas se configuran con LLM_<TAREA>_ROUTES como una lista separada
+por comas de `modelo` o `modelo:timeout_ms`. Si un modelo no responde en
+su timeout (o falla, o su circuito está abierto) se pasa al siguiente,
+siempre dentro del presupuesto total de la tarea.
+
+Por cada ruta (tarea, modelo) se cuentan llamadas, fallos por tipo,
+fallbacks, latencia (p50/p95) y tokens de entrada y salida.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+
+from llm_guard import LLM_GUARD, LLMUnavailable
+from metrics import Histogram
+
+DEFAULT_ROUTES = {
+    'expand': "meta/llama-3.1-8b-instruct:1000,mistralai/mistral-7b-instruct-v0.3",
+    'enrich': "deepseek-ai/deepseek-r1:5500,meta/llama-3.3-70b-instruct",
+    'insight': "meta/llama-3.1-8b-instruct",
+}
+
+Route = namedtuple('Route', ['model', 'timeout_ms'])
+
+
+def parse_routes(spec):
+    """
+    Cadena de rutas de una especificación "modelo:timeout_ms,modelo,...".
+    Sin timeout, el modelo puede usar todo el presupuesto que quede.
+    """
+    routes = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        model, _, timeout = item.rpartition(':')
+        if model and timeout.replace('.', '', 1).isdigit():
+            routes.append(Route(model, float(timeout)))
+        else:
+            routes.append(Route(item, None))
+    return routes
+
+
+def routes_from_env():
+    return {task: parse_routes(os.getenv(f"LLM_{task.upper()}_ROUTES", spec))
+            for task, spec in DEFAULT_ROUTES.items()}
+
+
+class RouteStats:
+    """Contadores de una ruta (tarea, modelo)"""
+
+    def __init__(self):
+        self.counts = {'calls': 0, 'ok': 0, 'timeouts': 0, 'errors': 0, 'rejected': 0, 'fallbacks': 0}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency = Histogram()
+
+    def summary(self):
+        ok = self.counts['ok']
+        return {
+            **self.counts,
+            'avg_ms': self.latency.sum / self.latency.count if self.latency.count else 0.0,
+            'p50_ms': self.latency.quantile(0.5),
+            'p95_ms': self.latency.quantile(0.95),
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'avg_completion_tokens': self.completion_tokens / ok if ok else 0.0,
+        }
+
+
+class LLMRouter:
+    """
+    Ejecuta una tarea con su cadena de modelos.
+
+    Args:
+        routes: Dict {tarea: [Route]} (por defecto, el de las variables de entorno)
+        guard: LLMGuard que aplica los timeouts y los circuit breakers por modelo
+    """
+
+    _REASON_KEYS = {'timeout': 'timeouts', 'error': 'errors', 'circuit_open': 'rejected'}
+
+    def __init__(self, routes=None, guard=LLM_GUARD):
+        self.routes = routes if routes is not None else routes_from_env()
+        self.guard = guard
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def _route_stats(self, task, model):
+        key = (task, model)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = RouteStats()
+        return stats
+
+    def complete(self, task, call, budget_ms):
+        """
+        Llama a `call(model, timeout_s)` con cada modelo de la cadena de
+        `task` hasta que uno responda dentro del presupuesto.
+
+        Returns:
+            Tupla (respuesta, modelo que respondió)
+
+        Raises:
+            LLMUnavailable: Ningún modelo respondió dentro de `budget_ms`
+        """
+        deadline = time.perf_counter() + budget_ms / 1000
+        failures = []
+        reason = 'timeout'
+        for attempt, route in enumerate(self.routes[task]):
+            remaining_ms = (deadline - time.perf_counter()) * 1000
+            if remaining_ms <= 0:
+                break
+            timeout_ms = min(route.timeout_ms or remaining_ms, remaining_ms)
+
+            start = time.perf_counter()
+            try:
+                response = self.guard.call(
+                    lambda model=route.model, timeout_s=timeout_ms / 1000: call(model, timeout_s),
+                    timeout_ms, route=route.model)
+            except LLMUnavailable as e:
+                with self._lock:
+                    stats = self._route_stats(task, route.model)
+                    if e.reason != 'circuit_open':
+                        stats.counts['calls'] += 1
+                    stats.counts[self._REASON_KEYS.get(e.reason, 'errors')] += 1
+                failures.append(f"{route.model}: {e}")
+                reason = e.reason
+                continue
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            usage = getattr(response, 'usage', None)
+            with self._lock:
+                stats = self._route_stats(task, route.model)
+                stats.counts['calls'] += 1
+                stats.counts['ok'] += 1
+                stats.counts['fallbacks'] += attempt > 0
+                stats.latency.observe(elapsed_ms)
+                stats.prompt_tokens += getattr(usage, 'prompt_tokens', 0) or 0
+                stats.completion_tokens += getattr(usage, 'completion_tokens', 0) or 0
+            if failures:
+                print(f"🔀 {task}: respondió {route.model} tras {'; '.join(failures)}")
+            return response, route.model
+
+        raise LLMUnavailable('; '.join(failures) or f"sin presupuesto para {task}", reason=reason)
+
+    def summary(self):
+        """Dict {tarea: {modelo: contadores, latencia y tokens}}"""
+        with self._lock:
+            summary = {}
+            for (task, model), stats in sorted(self.stats.items()):
+                summary.setdefault(task, {})[model] = stats.summary()
+            return summary
+
+
+# Enrutador compartido por todo el proceso (UI y API)
+LLM_ROUTER = LLMRouter()
@@ -0,0 +1,250 @@
+"""
+Contabilidad de memoria del proceso: memoria residente (RSS) total, su
+desglose por componente (pesos del modelo, índice HNSW, índices en
+memoria, cachés, sesiones) y su evolución en el tiempo.
+
+Fuentes del desglose:
+    - Incremento de RSS medido en cada paso de la carga (mark()): modelo y
+      runtime de torch, cliente de ChromaDB, índices
+    - Tamaño de cada componente registrado (register()), calculado en cada
+      muestra: exacto para pesos y arrays, estimado por muestreo para las
+      cachés (los objetos compartidos entre cachés se cuentan dos veces)
+
+Un hilo toma una muestra cada MEMORY_REPORT_INTERVAL segundos y avisa en
+el log cuando un componente supera su presupuesto o el RSS supera
+MEMORY_BUDGET_MB.
+"""
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+MEMORY_REPORT_INTERVAL = float(os.getenv("MEMORY_REPORT_INTERVAL", "60"))
+# Presupuestos (MB, 0 = sin límite)
+MEMORY_BUDGET_MB = float(os.getenv("MEMORY_BUDGET_MB", "0"))
+RESULT_CACHE_BUDGET_MB = float(os.getenv("RESULT_CACHE_BUDGET_MB", "256"))
+SESSION_BUDGET_MB = float(os.getenv("SESSION_BUDGET_MB", "256"))
+# Muestras guardadas para calcular el crecimiento (12 h con el intervalo por defecto)
+HISTORY_SIZE = 720
+# Una sesión de la app sin actividad durante más tiempo deja de contarse
+SESSION_TTL = 3600
+MB = 1024 * 1024
+
+
+def process_rss_bytes():
+    """
+    Memoria residente actual (VmRSS de /proc; sin /proc, el pico de
+    getrusage; 0 si tampoco hay `resource`, como en Windows)
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def deep_sizeof(obj, exclude=()):
+    """
+    Tamaño aproximado de un objeto y todo lo que contiene (contenedores,
+    atributos y el buffer de los arrays de numpy).
+
+    Args:
+        exclude: Objetos compartidos que no se recorren (ej: el SearchEngine
+            al que apunta un cursor)
+    """
+    seen = {id(o) for o in exclude}
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+
+        if isinstance(item, np.ndarray):
+            total += sys.getsizeof(item) + (item.nbytes if item.base is None else 0)
+            continue
+        total += sys.getsizeof(item)
+        if isinstance(item, (str, bytes, int, float, bool, type(None))):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        elif hasattr(item, '__dict__'):
+            stack.append(vars(item))
+    return total
+
+
+def estimate_sizeof(items, sample=32, exclude=()):
+    """Tamaño de una colección extrapolando desde una muestra de sus elementos"""
+    items = list(items)
+    if len(items) <= sample:
+        return sum(deep_sizeof(item, exclude) for item in items)
+    chosen = random.sample(items, sample)
+    return int(sum(deep_sizeof(item, exclude) for item in chosen) / sample * len(items))
+
+
+def model_weights_bytes(model):
+    """Pesos y buffers de un modelo de torch (0 si no lo es)"""
+    total = 0
+    for tensors in (getattr(model, 'parameters', None), getattr(model, 'buffers', None)):
+        if tensors:
+            total += sum(t.numel() * t.element_size() for t in tensors())
+    return total
+
+
+def dir_size(path, suffix=''):
+    """Tamaño de los archivos de un directorio (recursivo) que terminan en `suffix`"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            if name.endswith(suffix):
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+    return total
+
+
+def _memoize(func):
+    value = []
+
+    def wrapper():
+        if not value:
+            value.append(func())
+        return value[0]
+    return wrapper
+
+
+class MemoryMonitor:
+    """
+    Desglose de memoria por componente, con historial y presupuestos.
+
+    Args:
+        interval: Segundos entre muestras del hilo de fondo (0 = sin hilo)
+        budget_mb: Presupuesto del RSS total (0 = sin límite)
+    """
+
+    def __init__(self, interval=MEMORY_REPORT_INTERVAL, budget_mb=MEMORY_BUDGET_MB):
+        self.interval = interval
+        self.budget_mb = budget_mb
+        self.components = {}
+        self.load_steps = []
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.sessions = {}
+        self.alerts = set()
+        self.last = None
+        self._last_rss = process_rss_bytes()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def mark(self, step):
+        """Registra cuánto creció el RSS desde la marca anterior (durante la carga)"""
+        rss = process_rss_bytes()
+        self.load_steps.append((step, (rss - self._last_rss) / MB))
+        self._last_rss = rss
+
+    def register(self, name, sizer, budget_mb=0, static=False):
+        """
+        Añade un componente al desglose.
+
+        Args:
+            sizer: Función sin argumentos que devuelve su tamaño en bytes
+            budget_mb: Presupuesto del componente (0 = sin límite)
+            static: El tamaño no cambia (se calcula una sola vez)
+        """
+        if static:
+            sizer = _memoize(sizer)
+        self.components[name] = (sizer, budget_mb)
+
+    def track_session(self, session_id, state, exclude=()):
+        """Actualiza el tamaño estimado del estado de una sesión de la app"""
+        size = deep_sizeof(state, exclude)
+        with self._lock:
+            self.sessions[session_id] = (time.time(), size)
+
+    def sessions_bytes(self):
+        cutoff = time.time() - SESSION_TTL
+        with self._lock:
+            for session_id in [s for s, (seen, _) in self.sessions.items() if seen < cutoff]:
+                del self.sessions[session_id]
+            return sum(size for _, size in self.sessions.values())
+
+    def snapshot(self):
+        """
+        Toma una muestra: RSS, tamaño de cada componente y presupuestos
+        superados. La guarda en el historial y avisa de los nuevos excesos.
+        """
+        components = {}
+        over_budget = []
+        for name, (sizer, budget_mb) in list(self.components.items()):
+            try:
+                size_mb = sizer() / MB
+            except Exception as e:
+                print(f"⚠️ No se pudo medir '{name}': {e}")
+                continue
+            components[name] = round(size_mb, 2)
+            if budget_mb and size_mb > budget_mb:
+                over_budget.append({'name': name, 'mb': round(size_mb, 2), 'budget_mb': budget_mb})
+
+        rss_mb = process_rss_bytes() / MB
+        if self.budget_mb and rss_mb > self.budget_mb:
+            over_budget.append({'name': 'RSS total', 'mb': round(rss_mb, 2), 'budget_mb': self.budget_mb})
+
+        snapshot = {
+            'time': time.time(),
+            'rss_mb': round(rss_mb, 2),
+            'components': components,
+            'over_budget': over_budget,
+        }
+        with self._lock:
+            self.last = snapshot
+            self.history.append((snapshot['time'], snapshot['rss_mb']))
+            # Solo se avisa al pasar a estar por encima del presupuesto
+            new_alerts = [a for a in over_budget if a['name'] not in self.alerts]
+            self.alerts = {a['name'] for a in over_budget}
+        for alert in new_alerts:
+            print(f"🚨 Memoria por encima del presupuesto: {alert['name']} "
+                  f"({alert['mb']:.0f} MB de {alert['budget_mb']:.0f} MB)")
+        return snapshot
+
+    def growth_mb_per_hour(self):
+        """Crecimiento del RSS entre la primera y la última muestra del historial"""
+        with self._lock:
+            if len(self.history) < 2:
+                return 0.0
+            (t0, rss0), (t1, rss1) = self.history[0], self.history[-1]
+        return (rss1 - rss0) / (t1 - t0) * 3600 if t1 > t0 else 0.0
+
+    def report(self):
+        """Muestra actual con el desglose de la carga y el crecimiento"""
+        snapshot = self.snapshot()
+        snapshot['load_mb'] = {step: round(delta, 2) for step, delta in self.load_steps}
+        snapshot['growth_mb_per_hour'] = round(self.growth_mb_per_hour(), 2)
+        snapshot['samples'] = len(self.history)
+        return snapshot
+
+    def start(self):
+        """Arranca el muestreo periódico en segundo plano"""
+        if self.interval and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='memory-monitor', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.snapshot()
@@ -0,0 +1,187 @@
+"""
+Trazas y métricas de latencia por etapa de la búsqueda.
+
+Cada etapa del pipeline (expansión con LLM, encoder, ChromaDB, re-ranking,
+recomendación, render...) se envuelve en `metrics.span(etapa)`, que mide
+su duración y su resultado (ok / tipo de excepción). Las duraciones se
+acumulan en histogramas de buckets fijos, de los que salen:
+
+    - p50/p95/p99 por etapa (resumen periódico en el log y summary())
+    - el formato de texto de Prometheus (prometheus(), en GET /metrics de la API)
+
+Dentro de `metrics.trace()` los spans de la petición actual se guardan
+además en una lista, que la búsqueda devuelve como desglose de tiempos.
+Las trazas se pueden anidar: los spans se añaden a todas las activas.
+"""
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Límites superiores de los buckets (ms); el último bucket es +Inf
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+QUANTILES = (0.5, 0.95, 0.99)
+# Cada cuántos segundos se imprime el resumen de latencias (0 = nunca)
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "300"))
+
+_current_traces = contextvars.ContextVar('search_traces', default=())
+
+
+class Histogram:
+    """Histograma de latencias (ms) con buckets fijos"""
+
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+
+    def observe(self, value_ms, error=False):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value_ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value_ms
+        if error:
+            self.errors += 1
+
+    def quantile(self, q):
+        """
+        Cuantil estimado interpolando dentro del bucket (como
+        histogram_quantile de Prometheus), o None si no hay muestras.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                if i == len(self.buckets):
+                    return float(self.buckets[-1])
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return float(self.buckets[-1])
+
+
+class Metrics:
+    """
+    Registro thread-safe de histogramas por etapa.
+
+    Args:
+        buckets: Límites de los buckets (ms)
+        log_interval: Segundos entre resúmenes en el log (0 = nunca)
+    """
+
+    def __init__(self, buckets=BUCKETS_MS, log_interval=METRICS_LOG_INTERVAL):
+        self.buckets = tuple(buckets)
+        self.log_interval = log_interval
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._last_log = time.monotonic()
+
+    def observe(self, stage, elapsed_ms, outcome='ok'):
+        """Registra una duración de `stage` (y la añade a las trazas activas)"""
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram(self.buckets)
+            histogram.observe(elapsed_ms, error=outcome != 'ok')
+
+        traces = _current_traces.get()
+        if traces:
+            span = {'stage': stage, 'ms': round(elapsed_ms, 3), 'outcome': outcome}
+            for spans in traces:
+                spans.append(span)
+        self._maybe_log()
+
+    @contextmanager
+    def span(self, stage):
+        """Mide el bloque como una ejecución de `stage`"""
+        start = time.perf_counter()
+        outcome = 'ok'
+        try:
+            yield
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            self.observe(stage, (time.perf_counter() - start) * 1000, outcome)
+
+    @contextmanager
+    def trace(self):
+        """Recoge en una lista los spans del bloque (solo los del hilo/tarea actual)"""
+        spans = []
+        token = _current_traces.set(_current_traces.get() + (spans,))
+        try:
+            yield spans
+        finally:
+            _current_traces.reset(token)
+
+    def summary(self):
+        """Dict {etapa: {count, errors, avg_ms, p50, p95, p99}}"""
+        with self._lock:
+            return {
+                stage: {
+                    'count': h.count,
+                    'errors': h.errors,
+                    'avg_ms': h.sum / h.count if h.count else 0.0,
+                    **{f"p{int(q * 100)}": h.quantile(q) for q in QUANTILES}
+                }
+                for stage, h in sorted(self.histograms.items())
+            }
+
+    def prometheus(self):
+        """Métricas en el formato de texto de Prometheus (en segundos)"""
+        lines = [
+            "# HELP search_stage_duration_seconds Duración de cada etapa de la búsqueda",
+            "# TYPE search_stage_duration_seconds histogram",
+        ]
+        errors = []
+        with self._lock:
+            for stage, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (None,), h.counts):
+                    cumulative += count
+                    le = '+Inf' if bound is None else f"{bound / 1000:g}"
+                    lines.append(f'search_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'search_stage_duration_seconds_sum{{stage="{stage}"}} {h.sum / 1000:.6f}')
+                lines.append(f'search_stage_duration_seconds_count{{stage="{stage}"}} {h.count}')
+                errors.append(f'search_stage_errors_total{{stage="{stage}"}} {h.errors}')
+
+        lines += [
+            "# HELP search_stage_errors_total Ejecuciones de cada etapa que terminaron en excepción",
+            "# TYPE search_stage_errors_total counter",
+        ] + errors
+        return "\n".join(lines) + "\n"
+
+    def log_summary(self):
+        """Imprime p50/p95/p99 por etapa"""
+        summary = self.summary()
+        if not summary:
+            return
+        print("⏱️  Latencia por etapa (ms):")
+        print(f"   {'etapa':<14} {'n':>7} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for stage, s in summary.items():
+            print(f"   {stage:<14} {s['count']:>7} {s['errors']:>5} "
+                  f"{s['p50']:>9.1f} {s['p95']:>9.1f} {s['p99']:>9.1f}")
+
+    def _maybe_log(self):
+        if not self.log_interval:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_log < self.log_interval:
+                return
+            self._last_log = now
+        self.log_summary()
+
+
+# Registro compartido por todo el proceso (UI y API)
+METRICS = Metrics()
@@ -0,0 +1,208 @@
+"""
+Grafo precalculado de vecinos ("Películas similares").
+
+Para cada película se guardan sus K vecinos más cercanos según la
+similitud coseno de los embeddings de ChromaDB, como una matriz de
+adyacencia compacta (índices int32 + similitudes float16). Se calcula
+offline por bloques, de modo que la memoria es O(bloque × N) y no O(N²).
+
+Uso:
+    python src/neighbor_graph.py          # Recalcula el grafo completo
+"""
+import os
+
+import numpy as np
+
+from lexical_index import INDEX_DIR
+
+NEIGHBORS_FILE = os.path.join(INDEX_DIR, 'neighbors.npz')
+NEIGHBORS_K = 10
+BLOCK_SIZE = 1024
+
+
+def _normalize(embeddings):
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def _top_k(sims, k):
+    """Índices y valores de las k mayores similitudes de cada fila"""
+    k = min(k, sims.shape[1])
+    idx = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    top = np.take_along_axis(sims, idx, axis=1)
+    order = np.argsort(-top, axis=1)
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+def _neighbors_for_rows(rows, matrix, k, block_size):
+    """Vecinos de `rows` (índices de `matrix`) mediante productos por bloques"""
+    neighbors = np.empty((len(rows), k), dtype=np.int32)
+    scores = np.empty((len(rows), k), dtype=np.float32)
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        sims = matrix[block] @ matrix.T
+        sims[np.arange(len(block)), block] = -np.inf  # Una película no es vecina de sí misma
+        idx, top = _top_k(sims, k)
+        neighbors[start:start + len(block)] = idx
+        scores[start:start + len(block)] = top
+    return neighbors, scores
+
+
+class NeighborGraph:
+    """
+    Lista de adyacencia de K vecinos por película.
+
+    Args:
+        ids: IDs de las películas (posición = fila de la matriz)
+        neighbors: Matriz (N, K) con las posiciones de los vecinos
+        scores: Matriz (N, K) con la similitud coseno de cada vecino
+    """
+
+    def __init__(self, ids, neighbors, scores):
+        self.ids = np.asarray(ids, dtype=str)
+        self.neighbors = np.asarray(neighbors, dtype=np.int32)
+        self.scores = np.asarray(scores, dtype=np.float16)
+        self.positions = {movie_id: i for i, movie_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def k(self):
+        return self.neighbors.shape[1] if self.neighbors.ndim == 2 else 0
+
+    def similar(self, movie_id, k=None):
+        """
+        Vecinos precalculados de una película.
+
+        Returns:
+            Lista de tuplas (id, similitud) de mayor a menor, vacía si la
+            película no está en el grafo
+        """
+        pos = self.positions.get(str(movie_id))
+        if pos is None:
+            return []
+        k = self.k if k is None else min(k, self.k)
+        return [
+            (str(self.ids[n]), float(s))
+            for n, s in zip(self.neighbors[pos, :k], self.scores[pos, :k])
+        ]
+
+    def save(self, path=NEIGHBORS_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, ids=self.ids, neighbors=self.neighbors, scores=self.scores)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path=NEIGHBORS_FILE):
+        """Carga el grafo desde disco, o None si no se ha generado"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return NeighborGraph(data['ids'], data['neighbors'], data['scores'])
+
+
+def build_neighbor_graph(ids, embeddings, k=NEIGHBORS_K, block_size=BLOCK_SIZE):
+    """Calcula el grafo completo a partir de todos los embeddings"""
+    ids = [str(i) for i in ids]
+    matrix = _normalize(embeddings)
+    k = min(k, max(len(ids) - 1, 1))
+    neighbors, scores = _neighbors_for_rows(np.arange(len(ids)), matrix, k, block_size)
+    return NeighborGraph(ids, neighbors, scores)
+
+
+def update_neighbor_graph(graph, ids, embeddings, changed_ids, k=NEIGHBORS_K, block_size=BLOCK_SIZE):
+    """
+    Actualiza el grafo tras una ingesta incremental.
+
+    Solo se recalculan por completo las filas de las películas nuevas o
+    modificadas y las de aquellas cuyos vecinos cambiaron o se eliminaron.
+    El resto conserva sus vecinos y solo se compara con las películas
+    modificadas: O(cambios × N) en lugar de O(N²).
+
+    Args:
+        graph: Grafo anterior (o None para calcularlo entero)
+        ids: IDs actuales de la colección
+        embeddings: Embeddings actuales, en el mismo orden que `ids`
+        changed_ids: IDs añadidos o con embedding actualizado
+    """
+    ids = [str(i) for i in ids]
+    if graph is None or len(graph) == 0 or graph.k == 0:
+        return build_neighbor_graph(ids, embeddings, k, block_size)
+
+    matrix = _normalize(embeddings)
+    k = min(k, max(len(ids) - 1, 1))
+    positions = {movie_id: i for i, movie_id in enumerate(ids)}
+    changed = {str(i) for i in changed_ids} | (set(ids) - set(graph.positions))
+    removed = set(graph.positions) - set(ids)
+
+    # Filas con algún vecino modificado o eliminado (o con menos de K vecinos)
+    old_ids = graph.ids
+    stale_mask = np.isin(old_ids, list(changed | removed))
+    row_is_dirty = stale_mask[graph.neighbors].any(axis=1) | (graph.k < k)
+    dirty = set(changed) | {
+        str(old_ids[pos]) for pos in np.flatnonzero(row_is_dirty)
+        if str(old_ids[pos]) not in removed
+    }
+
+    neighbors = np.empty((len(ids), k), dtype=np.int32)
+    scores = np.empty((len(ids), k), dtype=np.float32)
+
+    dirty_rows = np.array(sorted(positions[m] for m in dirty), dtype=np.int64)
+    if len(dirty_rows):
+        neighbors[dirty_rows], scores[dirty_rows] = _neighbors_for_rows(dirty_rows, matrix, k, block_size)
+
+    clean_rows = np.array(sorted(set(range(len(ids))) - set(dirty_rows.tolist())), dtype=np.int64)
+    if len(clean_rows):
+        old_pos = np.array([graph.positions[ids[r]] for r in clean_rows], dtype=np.int64)
+        # Posición antigua -> nueva (las filas limpias no apuntan a eliminadas)
+        old_to_new = np.array([positions.get(str(m), -1) for m in old_ids], dtype=np.int32)
+        kept_idx = old_to_new[graph.neighbors[old_pos, :k]]
+
+        changed_rows = np.array(sorted(positions[m] for m in changed), dtype=np.int64)
+        for start in range(0, len(clean_rows), block_size):
+            block = slice(start, start + block_size)
+            rows = clean_rows[block]
+            cand_idx = kept_idx[block]
+            # Similitud exacta de los vecinos conservados (las guardadas son float16)
+            cand_scores = np.einsum('bd,bkd->bk', matrix[rows], matrix[cand_idx])
+            if len(changed_rows):
+                sims = matrix[rows] @ matrix[changed_rows].T
+                cand_idx = np.hstack([cand_idx, np.broadcast_to(changed_rows, sims.shape)])
+                cand_scores = np.hstack([cand_scores, sims])
+            order, top = _top_k(cand_scores, k)
+            neighbors[rows] = np.take_along_axis(cand_idx, order, axis=1)
+            scores[rows] = top
+
+    return NeighborGraph(ids, neighbors, scores)
+
+
+def refresh_neighbor_graph(collection, changed_ids=None, path=NEIGHBORS_FILE):
+    """
+    Recalcula (completo si `changed_ids` es None, si no incremental) el
+    grafo con los embeddings de la colección y lo guarda en disco.
+    """
+    data = collection.get(include=['embeddings'])
+    if changed_ids is None:
+        graph = build_neighbor_graph(data['ids'], data['embeddings'])
+    else:
+        graph = update_neighbor_graph(NeighborGraph.load(path), data['ids'], data['embeddings'], changed_ids)
+    graph.save(path)
+    return graph
+
+
+if __name__ == "__main__":
+    import time
+
+    import chromadb
+
+    PROJECT_ROOT = os.path.dirname(INDEX_DIR)
+    client = chromadb.PersistentClient(path=os.path.join(PROJECT_ROOT, 'chroma_db'))
+    collection = client.get_collection(name='movies')
+
+    start = time.perf_counter()
+    graph = refresh_neighbor_graph(collection)
+    print(f"✅ Grafo de vecinos: {len(graph)} películas × {graph.k} vecinos "
+          f"en {time.perf_counter() - start:.1f}s → '{NEIGHBORS_FILE}'")
@@ -0,0 +1,238 @@
+"""
+Perfilado bajo demanda de búsquedas individuales.
+
+Se activa para una petición con `?profile=1` (app y API) o para todas con
+la variable SEARCH_PROFILE; desactivado no cuesta nada (una comprobación).
+Para poder activarlo en producción, como mucho se perfilan
+SEARCH_PROFILE_MAX_PER_MINUTE peticiones por minuto en el proceso.
+
+Modos:
+    sample   - Muestreo de pilas cada SEARCH_PROFILE_INTERVAL_MS del hilo de la
+               petición y del hilo del encoder. Sobrecarga baja. Se guarda en
+               formato "collapsed" (flamegraph.pl, speedscope, inferno).
+    cprofile - Perfilador determinista de cProfile (solo el hilo de la
+               petición). Más preciso pero más caro. Se guarda como .prof
+               (pstats, snakeviz, flameprof). Solo una petición a la vez:
+               las concurrentes se perfilan por muestreo.
+
+Cada perfil se guarda en profiles/ junto a un .json con la query, el modo,
+la duración y los tiempos por etapa de la petición.
+"""
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from lexical_index import PROJECT_ROOT
+from metrics import METRICS
+
+PROFILE_DIR = os.path.join(PROJECT_ROOT, 'profiles')
+SEARCH_PROFILE = os.getenv("SEARCH_PROFILE", "")
+SEARCH_PROFILE_MAX_PER_MINUTE = int(os.getenv("SEARCH_PROFILE_MAX_PER_MINUTE", "6"))
+SEARCH_PROFILE_INTERVAL_MS = float(os.getenv("SEARCH_PROFILE_INTERVAL_MS", "5"))
+# Hilos que trabajan para la petición además del suyo propio
+PROFILE_THREADS = ('batch-encoder',)
+
+_MODES = {'1': 'sample', 'true': 'sample', 'yes': 'sample', 'sample': 'sample',
+          'cprofile': 'cprofile', 'deterministic': 'cprofile'}
+
+
+def resolve_mode(value=None):
+    """
+    Modo de perfilado de una petición: el indicado (parámetro de la URL) o,
+    si es None, el de SEARCH_PROFILE. Devuelve 'sample', 'cprofile' o None.
+    """
+    if value is None:
+        value = SEARCH_PROFILE
+    return _MODES.get(str(value).strip().lower())
+
+
+class RateLimiter:
+    """Como mucho `max_events` eventos en una ventana deslizante de `window` segundos"""
+
+    def __init__(self, max_events, window=60.0):
+        self.max_events = max_events
+        self.window = window
+        self.events = deque()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        now = time.monotonic()
+        with self._lock:
+            while self.events and now - self.events[0] > self.window:
+                self.events.popleft()
+            if len(self.events) >= self.max_events:
+                return False
+            self.events.append(now)
+            return True
+
+
+class SamplingProfiler:
+    """
+    Muestrea las pilas de un hilo (y de los hilos de PROFILE_THREADS) desde
+    un hilo aparte, acumulando cuántas veces aparece cada pila.
+    """
+
+    def __init__(self, thread_id, interval_ms=SEARCH_PROFILE_INTERVAL_MS, extra_threads=PROFILE_THREADS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.extra_threads = extra_threads
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='search-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    @staticmethod
+    def _stack(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            targets = {self.thread_id: 'request'}
+            targets.update({t.ident: t.name for t in threading.enumerate() if t.name in self.extra_threads})
+            frames = sys._current_frames()
+            for ident, name in targets.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[f"{name};{self._stack(frame)}"] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Pilas en formato "collapsed" (una línea `pila;...;hoja recuento` por pila)"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileSession:
+    """
+    Perfil de una petición: perfilador, traza de tiempos por etapa y
+    archivos de salida.
+    """
+
+    def __init__(self, query, mode, metrics=METRICS, profile_dir=None):
+        self.query = query
+        self.mode = mode
+        self.metrics = metrics
+        self.profile_dir = profile_dir or PROFILE_DIR
+        self.path = None
+        self.spans = []
+        self.elapsed_ms = 0.0
+        self.outcome = 'ok'
+
+    @contextmanager
+    def run(self):
+        cprofile_locked = self.mode == 'cprofile' and _cprofile_lock.acquire(blocking=False)
+        try:
+            profiler = self._start_profiler(cprofile_locked)
+            start = time.perf_counter()
+            with self.metrics.trace() as self.spans:
+                try:
+                    yield self
+                except BaseException as e:
+                    self.outcome = type(e).__name__
+                    raise
+                finally:
+                    if self.mode == 'cprofile':
+                        profiler.disable()
+                    else:
+                        profiler.stop()
+                    self.elapsed_ms = (time.perf_counter() - start) * 1000
+                    self.save(profiler)
+        finally:
+            if cprofile_locked:
+                _cprofile_lock.release()
+
+    def _start_profiler(self, cprofile_locked):
+        """
+        Arranca el perfilador del modo pedido. cProfile solo admite una
+        sesión activa por proceso (desde Python 3.12 un segundo enable()
+        lanza ValueError): si otra petición ya lo usa, se muestrea.
+        """
+        if self.mode == 'cprofile':
+            if cprofile_locked:
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                    return profiler
+                except ValueError:
+                    pass
+            print(f"🔬 cProfile ocupado por otra petición: '{self.query}' se perfila por muestreo")
+            self.mode = 'sample'
+        profiler = SamplingProfiler(threading.get_ident())
+        profiler.start()
+        return profiler
+
+    def save(self, profiler):
+        """Guarda el perfil y su .json de contexto; devuelve la ruta del perfil"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        slug = re.sub(r'\W+', '_', self.query.lower()).strip('_')[:40] or 'query'
+        now = time.time()
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now)) + f".{int(now * 1000) % 1000:03d}"
+        base = os.path.join(self.profile_dir, f"{stamp}-{os.getpid()}-{slug}")
+
+        info = {
+            'query': self.query,
+            'mode': self.mode,
+            'outcome': self.outcome,
+            'elapsed_ms': round(self.elapsed_ms, 3),
+            'timings': self.spans,
+        }
+        if self.mode == 'cprofile':
+            self.path = base + '.prof'
+            profiler.dump_stats(self.path)
+        else:
+            self.path = base + '.collapsed'
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(profiler.collapsed())
+            info['samples'] = profiler.samples
+            info['interval_ms'] = profiler.interval * 1000
+
+        info['profile'] = os.path.basename(self.path)
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False, indent=2)
+        print(f"🔬 Perfil de '{self.query}' ({self.mode}, {self.elapsed_ms:.0f} ms) guardado en {self.path}")
+        return self.path
+
+
+_limiter = RateLimiter(SEARCH_PROFILE_MAX_PER_MINUTE)
+# Una sola sesión de cProfile a la vez en el proceso
+_cprofile_lock = threading.Lock()
+
+
+@contextmanager
+def maybe_profile(query, mode=None, metrics=METRICS):
+    """
+    Perfila el bloque si el modo (o SEARCH_PROFILE) lo pide y no se ha
+    superado el límite por minuto.
+
+    Yields:
+        ProfileSession (con .path tras el bloque) o None si no se perfila
+    """
+    mode = resolve_mode(mode)
+    if not mode:
+        yield None
+        return
+    if not _limiter.allow():
+        print(f"🔬 Perfilado omitido: más de {SEARCH_PROFILE_MAX_PER_MINUTE} perfiles por minuto")
+        yield None
+        return
+
+    session = ProfileSession(query, mode, metrics)
+    with session.run():
+        yield session
@@ -0,0 +1,261 @@
+"""
+Restricciones estructuradas (género, década/año y valoración) extraídas de
+la consulta del usuario e índices precalculados para aplicarlas como
+pre-filtro de la búsqueda.
+
+Ej: "película de terror psicológica de los 90" -> género Horror, 1990-1999.
+"""
+import os
+import pickle
+import re
+
+from lexical_index import INDEX_DIR, normalize_text
+
+FILTER_INDEX_FILE = os.path.join(INDEX_DIR, 'filter_index.pkl')
+
+# Por debajo de este número de películas el filtro se descarta: es mejor
+# mostrar resultados aproximados que una lista casi vacía
+MIN_FILTERED_MOVIES = 6
+
+# Rating mínimo (escala 0-5) para "bien valorada", "highly rated"...
+HIGH_RATING = 3.5
+
+# Términos (normalizados, sin acentos, con sus plurales) -> género de TMDB.
+# "wars" no está: en una consulta casi siempre es parte de un título (Star Wars)
+GENRE_SYNONYMS = {
+    'terror': 'Horror', 'horror': 'Horror', 'miedo': 'Horror', 'scary': 'Horror',
+    'comedia': 'Comedy', 'comedias': 'Comedy', 'comedy': 'Comedy', 'comedies': 'Comedy',
+    'divertida': 'Comedy', 'divertidas': 'Comedy',
+    'accion': 'Action', 'action': 'Action',
+    'drama': 'Drama', 'dramas': 'Drama', 'dramatica': 'Drama', 'dramaticas': 'Drama',
+    'romantica': 'Romance', 'romanticas': 'Romance', 'romantico': 'Romance', 'romanticos': 'Romance',
+    'romance': 'Romance', 'romances': 'Romance', 'romantic': 'Romance',
+    'ciencia ficcion': 'Science Fiction', 'science fiction': 'Science Fiction',
+    'sci fi': 'Science Fiction', 'scifi': 'Science Fiction',
+    'animacion': 'Animation', 'animada': 'Animation', 'animadas': 'Animation',
+    'animated': 'Animation', 'animation': 'Animation',
+    'aventura': 'Adventure', 'aventuras': 'Adventure', 'adventure': 'Adventure', 'adventures': 'Adventure',
+    'thriller': 'Thriller', 'thrillers': 'Thriller', 'suspense': 'Thriller', 'suspenso': 'Thriller',
+    'documental': 'Documentary', 'documentales': 'Documentary',
+    'documentary': 'Documentary', 'documentaries': 'Documentary',
+    'fantasia': 'Fantasy', 'fantasy': 'Fantasy',
+    'belica': 'War', 'belicas': 'War', 'guerra': 'War', 'war': 'War',
+    'western': 'Western', 'westerns': 'Western', 'vaqueros': 'Western',
+    'crimen': 'Crime', 'policiaca': 'Crime', 'policiacas': 'Crime', 'crime': 'Crime',
+    'misterio': 'Mystery', 'mystery': 'Mystery',
+    'familiar': 'Family', 'familiares': 'Family', 'family': 'Family',
+    'musical': 'Music', 'musicales': 'Music', 'musicals': 'Music',
+    'historica': 'History', 'historicas': 'History', 'historical': 'History',
+}
+
+# Artículo + sustantivo + "de": el género forma parte de un título
+# ("la guerra de las galaxias", "the war of the worlds"), no es un filtro,
+# salvo que lo que sigue sea una década ("el terror de los 90")
+_TITLE_PHRASE_BEFORE = re.compile(r'\b(?:el|la|los|las|the)\s+$')
+_TITLE_PHRASE_AFTER = re.compile(r'^\s+(?:de|del|of)\b(?!\s+(?:los|las) (?:anos )?\d)')
+
+# Tras "de/en los 90" solo se admite el final de la consulta o un enlace;
+# "las 10 mejores", "los 50 mejores thrillers" son recuentos, no décadas
+_DECADE_FOLLOWER = r'(?=\s*$|\s*[,.;]|\s+(?:y|o|con|sin|que|bien|en|de|del|para|sobre)\b)'
+
+DECADE_WORDS = {
+    'veinte': 1920, 'treinta': 1930, 'cuarenta': 1940, 'cincuenta': 1950,
+    'sesenta': 1960, 'setenta': 1970, 'ochenta': 1980, 'noventa': 1990,
+    'twenties': 1920, 'thirties': 1930, 'forties': 1940, 'fifties': 1950,
+    'sixties': 1960, 'seventies': 1970, 'eighties': 1980, 'nineties': 1990,
+}
+
+HIGH_RATING_PATTERNS = [
+    r'\bbien valorad[ao]s?\b', r'\bmejor(es)? valorad[ao]s?\b', r'\baclamad[ao]s?\b',
+    r'\bhighly rated\b', r'\btop rated\b', r'\bbest rated\b', r'\bobras? maestras?\b',
+]
+
+_GENRE_RE = re.compile(
+    r'\b(' + '|'.join(sorted((re.escape(k) for k in GENRE_SYNONYMS), key=len, reverse=True)) + r')\b'
+)
+
+
+def genre_key(genre):
+    """Nombre del campo booleano de ChromaDB para un género"""
+    return 'genre_' + re.sub(r'\W+', '_', normalize_text(genre)).strip('_')
+
+
+def _two_digit_decade(value):
+    value = int(value)
+    return 1900 + value if value >= 20 else 2000 + value
+
+
+def parse_constraints(query):
+    """
+    Extrae restricciones estructuradas de una consulta en español o inglés.
+
+    Returns:
+        Dict con 'genres' (lista de géneros TMDB), 'year_range' (tupla
+        inclusiva o None) y 'min_rating' (float o None)
+    """
+    text = normalize_text(query).replace('-', ' ')
+
+    genres = []
+    for match in _GENRE_RE.finditer(text):
+        if (_TITLE_PHRASE_BEFORE.search(text[:match.start()])
+                and _TITLE_PHRASE_AFTER.match(text[match.end():])):
+            continue
+        genre = GENRE_SYNONYMS[match.group(1)]
+        if genre not in genres:
+            genres.append(genre)
+
+    year_range = None
+    match = re.search(r'\bentre (\d{4}) y (\d{4})\b', text) or re.search(r'\bbetween (\d{4}) and (\d{4})\b', text)
+    if match:
+        start, end = sorted((int(match.group(1)), int(match.group(2))))
+        year_range = (start, end)
+    if not year_range:
+        match = (re.search(r"\b(1[89]\d0|20[0-2]0)\s?'?s\b", text)
+                 or re.search(r'\b(?:decada de |(?:los|las) (?:anos )?)(1[89]\d0|20[0-2]0)\b', text))
+        if match:
+            start = int(match.group(1))
+            year_range = (start, start + 9)
+    if not year_range:
+        # Dos cifras: con "años"/"década", en la forma "80s"/"'80s" o tras
+        # "de/en los" sin un sustantivo contado detrás
+        match = (re.search(r"\b(?:anos|decada de los) (\d0)s?\b", text)
+                 or re.search(r"(?:\b|')(\d0)\s?'?s\b", text)
+                 or re.search(r"\b(?:de|en) (?:los|las) (\d0)\b" + _DECADE_FOLLOWER, text))
+        if match:
+            start = _two_digit_decade(match.group(1))
+            year_range = (start, start + 9)
+    if not year_range:
+        match = re.search(r'\b(' + '|'.join(DECADE_WORDS) + r')\b', text)
+        if match:
+            start = DECADE_WORDS[match.group(1)]
+            year_range = (start, start + 9)
+    if not year_range:
+        match = re.search(r'\b(?:de|del|en|from|in) (19\d{2}|20\d{2})\b', text)
+        if match:
+            year = int(match.group(1))
+            year_range = (year, year)
+
+    min_rating = None
+    if any(re.search(p, text) for p in HIGH_RATING_PATTERNS):
+        min_rating = HIGH_RATING
+
+    return {'genres': genres, 'year_range': year_range, 'min_rating': min_rating}
+
+
+def has_constraints(constraints):
+    return bool(constraints['genres'] or constraints['year_range'] or constraints['min_rating'])
+
+
+def describe_constraints(constraints):
+    """Texto corto para mostrar los filtros aplicados"""
+    parts = list(constraints['genres'])
+    if constraints['year_range']:
+        start, end = constraints['year_range']
+        parts.append(str(start) if start == end else f"{start}-{end}")
+    if constraints['min_rating']:
+        parts.append(f"rating ≥ {constraints['min_rating']:.1f}")
+    return ' · '.join(parts)
+
+
+def build_where(constraints):
+    """Traduce las restricciones a un filtro `where` de ChromaDB"""
+    conditions = [{genre_key(g): True} for g in constraints['genres']]
+    if constraints['year_range']:
+        start, end = constraints['year_range']
+        conditions.append({'year': {'$gte': start}})
+        conditions.append({'year': {'$lte': end}})
+    if constraints['min_rating']:
+        conditions.append({'rank_rating': {'$gte': constraints['min_rating']}})
+
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {'$and': conditions}
+
+
+class FilterIndex:
+    """
+    Listas de postings precalculadas por género y por década, más el año y
+    el rating de cada película, para saber al instante qué películas cumplen
+    unas restricciones (y cuántas) antes de consultar ChromaDB.
+    """
+
+    def __init__(self, ids, genres, years, ratings, vote_counts):
+        self.ids = list(ids)
+        self.years = dict(zip(self.ids, years))
+        self.ratings = dict(zip(self.ids, ratings))
+        self.vote_counts = dict(zip(self.ids, vote_counts))
+        self.by_genre = {}
+        self.by_decade = {}
+        for movie_id, movie_genres, year in zip(self.ids, genres, years):
+            for genre in movie_genres:
+                self.by_genre.setdefault(genre, set()).add(movie_id)
+            if year:
+                self.by_decade.setdefault(year // 10 * 10, set()).add(movie_id)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def matching_ids(self, constraints):
+        """
+        Conjunto de IDs que cumplen todas las restricciones, o None si la
+        consulta no tiene restricciones.
+        """
+        if not has_constraints(constraints):
+            return None
+
+        result = None
+        for genre in constraints['genres']:
+            postings = self.by_genre.get(genre, set())
+            result = postings if result is None else result & postings
+
+        if constraints['year_range']:
+            start, end = constraints['year_range']
+            in_range = set()
+            for decade in range(start // 10 * 10, end + 1, 10):
+                in_range |= {
+                    movie_id for movie_id in self.by_decade.get(decade, ())
+                    if start <= self.years[movie_id] <= end
+                }
+            result = in_range if result is None else result & in_range
+
+        if constraints['min_rating']:
+            candidates = result if result is not None else self.ids
+            result = {m for m in candidates if self.ratings[m] >= constraints['min_rating']}
+
+        return result
+
+    def save(self, path=FILTER_INDEX_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path=FILTER_INDEX_FILE):
+        """Carga el índice desde disco, o None si no se ha generado"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def build_filter_index(ids, metadatas, path=FILTER_INDEX_FILE):
+    """
+    Construye el índice a partir de los metadatos guardados en ChromaDB.
+
+    Args:
+        ids: IDs de las películas
+        metadatas: Metadatos con genres_text, year, rank_rating y vote_count
+    """
+    index = FilterIndex(
+        ids=[str(i) for i in ids],
+        genres=[[g.strip() for g in m.get('genres_text', '').split(',') if g.strip()] for m in metadatas],
+        years=[int(m.get('year', 0)) for m in metadatas],
+        ratings=[float(m.get('rank_rating', 0.0)) for m in metadatas],
+        vote_counts=[int(m.get('vote_count', 0)) for m in metadatas]
+    )
+    index.save(path)
+    return index
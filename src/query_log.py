@@ -0,0 +1,254 @@
+"""
+Registro de las búsquedas de los usuarios y calentamiento de la caché.
+
+QueryLog guarda cada búsqueda como una línea JSON en QUERY_LOG_FILE
+(solo se añade al final):
+
+    {"ts": 1760870400.1, "q": "terror de los 90",
+     "raw": "Terror de los 90", "expand": true, "source": "semantic",
+     "cached": false, "ms": 812.4,
+     "stages": {"llm_expand": 640.2, "encode": 35.1, ...},
+     "ids": ["694", "..."], "degraded": []}
+
+La query se guarda normalizada en `q` (la misma clave que la caché de
+resultados, para agrupar) y tal como la escribió el usuario en `raw`,
+que es la que se repite al calentar (la normalizada pierde tildes y
+mayúsculas y no daría los mismos resultados).
+
+La búsqueda solo deja la entrada en una cola: un hilo la escribe en
+disco por lotes, así el registro no añade E/S a la petición; si la cola
+se llena, la entrada se descarta y se cuenta. Al superar
+QUERY_LOG_MAX_MB el archivo se rota a `<archivo>.1`.
+
+CacheWarmer repite las QUERY_WARMUP_TOP queries más frecuentes de las
+últimas QUERY_WARMUP_WINDOW_H horas (expansión, encoder y búsqueda) al
+arrancar y cada QUERY_WARMUP_INTERVAL segundos, de modo que tras un
+despliegue las consultas más comunes ya están en la caché de resultados.
+
+El registro también sirve como conjunto de queries reales para los
+benchmarks (scripts/load_test.py --queries logs/queries.jsonl).
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+from lexical_index import PROJECT_ROOT
+from result_cache import normalize_query
+
+# Archivo del registro (vacío = no se registran las búsquedas)
+QUERY_LOG_FILE = os.getenv("QUERY_LOG_FILE", os.path.join(PROJECT_ROOT, 'logs', 'queries.jsonl'))
+QUERY_LOG_MAX_MB = float(os.getenv("QUERY_LOG_MAX_MB", "64"))
+# Entradas pendientes de escribir como máximo
+QUERY_LOG_QUEUE_SIZE = 10000
+# Queries que se repiten al calentar la caché (0 = no se calienta)
+QUERY_WARMUP_TOP = int(os.getenv("QUERY_WARMUP_TOP", "50"))
+QUERY_WARMUP_WINDOW_H = float(os.getenv("QUERY_WARMUP_WINDOW_H", "168"))
+# Segundos entre calentamientos (0 = solo al arrancar)
+QUERY_WARMUP_INTERVAL = float(os.getenv("QUERY_WARMUP_INTERVAL", "0"))
+
+
+def log_entry(response):
+    """Entrada compacta del registro para una respuesta de SearchEngine.search()"""
+    stages = {}
+    for span in response.get('timings') or ():
+        stages[span['stage']] = round(stages.get(span['stage'], 0.0) + span['ms'], 1)
+    return {
+        'ts': round(time.time(), 3),
+        'q': normalize_query(response['query']),
+        'raw': response['query'],
+        'expand': response['expand'],
+        'source': response['source'],
+        'cached': response['cached'],
+        'ms': round(response['elapsed_ms'], 1),
+        'stages': stages,
+        'ids': [result['id'] for result in response['results']],
+        'degraded': response['degraded'],
+    }
+
+
+def read_query_log(path=QUERY_LOG_FILE, since=None):
+    """
+    Entradas del registro (incluido el archivo rotado), de la más antigua
+    a la más reciente. Las líneas incompletas o corruptas se ignoran.
+
+    Args:
+        since: Timestamp mínimo (None = todas)
+    """
+    for file_path in (path + '.1', path):
+        try:
+            f = open(file_path, 'r', encoding='utf-8')
+        except OSError:
+            continue
+        with f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if since is None or entry.get('ts', 0) >= since:
+                    yield entry
+
+
+def top_queries(entries, n=QUERY_WARMUP_TOP):
+    """
+    Las `n` búsquedas más frecuentes, agrupadas por query normalizada.
+
+    Returns:
+        Lista de tuplas ((query, expand), veces), con la query en su forma
+        original más reciente (la normalizada en entradas sin `raw`)
+    """
+    counts = Counter()
+    raw_queries = {}
+    for entry in entries:
+        if entry.get('q'):
+            key = (entry['q'], entry.get('expand', True))
+            counts[key] += 1
+            raw_queries[key] = entry.get('raw') or entry['q']
+    return [((raw_queries[key], key[1]), count) for key, count in counts.most_common(n)]
+
+
+class QueryLog:
+    """
+    Registro de búsquedas en segundo plano (thread-safe).
+
+    Args:
+        path: Archivo JSON Lines
+        max_bytes: Tamaño a partir del cual se rota el archivo
+        queue_size: Entradas pendientes de escribir como máximo
+    """
+
+    def __init__(self, path=QUERY_LOG_FILE, max_bytes=QUERY_LOG_MAX_MB * 1024 * 1024,
+                 queue_size=QUERY_LOG_QUEUE_SIZE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stats = {'written': 0, 'dropped': 0, 'errors': 0}
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def record(self, response):
+        """Encola la búsqueda para escribirla (no hace E/S)"""
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(log_entry(response))
+        except queue.Full:
+            with self._lock:
+                self.stats['dropped'] += 1
+
+    def flush(self):
+        """Espera a que se escriban las entradas encoladas"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def entries(self, since=None):
+        return read_query_log(self.path, since)
+
+    def _ensure_writer(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='query-log', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+                self.stats['written'] += len(batch)
+            except OSError as e:
+                self.stats['errors'] += 1
+                print(f"⚠️ No se pudo escribir el registro de búsquedas: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        try:
+            if self.max_bytes and os.path.getsize(self.path) >= self.max_bytes:
+                os.replace(self.path, self.path + '.1')
+        except OSError:
+            pass
+        lines = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in batch)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+
+class CacheWarmer:
+    """
+    Repite las búsquedas más frecuentes del registro para llenar la caché
+    de resultados (expansión, encoder y búsqueda; sin la recomendación).
+
+    Args:
+        engine: SearchEngine que se calienta
+        query_log: QueryLog del que salen las queries
+        top_n: Queries que se repiten
+        window_h: Antigüedad máxima (horas) de las búsquedas que cuentan
+        interval: Segundos entre calentamientos en segundo plano (0 = uno solo)
+    """
+
+    def __init__(self, engine, query_log, top_n=QUERY_WARMUP_TOP, window_h=QUERY_WARMUP_WINDOW_H,
+                 interval=QUERY_WARMUP_INTERVAL):
+        self.engine = engine
+        self.query_log = query_log
+        self.top_n = top_n
+        self.window_h = window_h
+        self.interval = interval
+        self.last = None
+        self._thread = None
+
+    def warm(self):
+        """
+        Repite las búsquedas frecuentes que no estén ya en la caché.
+
+        Returns:
+            Dict con queries, warmed (añadidas a la caché), cached (ya
+            estaban), degraded (sin LLM, no se cachean), failed y elapsed_ms
+        """
+        start = time.perf_counter()
+        since = time.time() - self.window_h * 3600 if self.window_h else None
+        top = top_queries(self.query_log.entries(since), self.top_n)
+        stats = {'queries': len(top), 'warmed': 0, 'cached': 0, 'degraded': 0, 'failed': 0}
+        for (query, expand), _ in top:
+            try:
+                # Sin registrar: el calentamiento no cuenta como búsqueda de un usuario
+                response = self.engine.search(query, expand=expand, log=False)
+            except Exception as e:
+                stats['failed'] += 1
+                print(f"⚠️ Calentamiento de '{query}' fallido: {e}")
+                continue
+            if response['cached']:
+                stats['cached'] += 1
+            elif response['degraded']:
+                stats['degraded'] += 1
+            else:
+                stats['warmed'] += 1
+
+        stats['elapsed_ms'] = (time.perf_counter() - start) * 1000
+        self.last = stats
+        if top:
+            print(f"🔥 Caché calentada: {stats['warmed']} búsquedas nuevas, {stats['cached']} ya en caché, "
+                  f"{stats['degraded'] + stats['failed']} sin completar ({stats['elapsed_ms'] / 1000:.1f}s)")
+        return stats
+
+    def start(self):
+        """Calienta en segundo plano ahora y, si hay intervalo, periódicamente"""
+        if self.top_n and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self.warm()
+            if not self.interval:
+                return
+            time.sleep(self.interval)
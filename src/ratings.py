@@ -0,0 +1,16 @@
+"""
+Rating de una película a partir de sus metadatos de ChromaDB.
+
+Es el mismo criterio para el re-ranking, los resultados del camino
+rápido, el orden del índice difuso y el `rank_rating` de la ingesta: el
+rating de MovieLens (0-5) o, si la película no lo tiene, el de TMDB
+(0-10) reescalado.
+"""
+
+
+def movie_rating(metadata):
+    """Rating de MovieLens (0-5) o, si falta, el de TMDB reescalado"""
+    rating = float(metadata.get('rating', 0.0))
+    if rating == 0:
+        rating = float(metadata.get('vote_average', 0.0)) / 2.0
+    return rating
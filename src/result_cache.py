@@ -0,0 +1,137 @@
+"""
+Caché de resultados de búsqueda completos (ranking final + recomendación
+del LLM), para servir las consultas repetidas sin tocar el encoder,
+ChromaDB ni el LLM.
+
+La clave es (query normalizada, configuración del ranking); las entradas
+pertenecen a una versión de la colección y se descartan en bloque cuando
+la ingesta publica una nueva.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from lexical_index import INDEX_DIR, normalize_text
+
+COLLECTION_VERSION_FILE = os.path.join(INDEX_DIR, 'collection_version.json')
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "512"))
+
+
+def normalize_query(query):
+    """Minúsculas, sin acentos y con los espacios colapsados"""
+    return ' '.join(normalize_text(query).split())
+
+
+def publish_collection_version(path=COLLECTION_VERSION_FILE):
+    """
+    Registra una nueva versión de la colección. La llama la ingesta cada
+    vez que la colección cambia (carga completa o delta).
+
+    Returns:
+        El identificador de la nueva versión
+    """
+    version = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': version, 'published_at': time.time()}, f)
+    os.replace(tmp_path, path)
+    return version
+
+
+class CollectionVersion:
+    """
+    Lee la versión publicada, releyendo el archivo solo cuando cambia su
+    mtime (un stat por búsqueda).
+    """
+
+    def __init__(self, path=COLLECTION_VERSION_FILE):
+        self.path = path
+        self._mtime = None
+        self._version = None
+
+    def current(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+        if mtime != self._mtime:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._version = json.load(f).get('version')
+            except (OSError, ValueError):
+                return self._version
+            self._mtime = mtime
+        return self._version
+
+
+class ResultCache:
+    """
+    Caché LRU thread-safe de resultados finales.
+
+    Args:
+        max_entries: Número máximo de consultas guardadas
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE):
+        self.max_entries = max(1, int(max_entries))
+        self.version = None
+        self.entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(query, config):
+        return (normalize_query(query), tuple(config))
+
+    def get(self, query, config, version):
+        """
+        Devuelve la entrada guardada o None. Si `version` no coincide con la
+        de las entradas actuales, la caché se vacía.
+        """
+        key = self.key(query, config)
+        with self._lock:
+            self._check_version(version)
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry
+
+    def put(self, query, config, version, results, recommendation=None, **extra):
+        """
+        Guarda los resultados finales (y la recomendación del LLM, si la hay)
+        de una consulta, expulsando la menos usada si la caché está llena.
+        Los campos de `extra` se guardan tal cual en la entrada.
+        """
+        key = self.key(query, config)
+        with self._lock:
+            self._check_version(version)
+            self.entries[key] = {'results': results, 'recommendation': recommendation, **extra}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def values(self):
+        """Copia de las entradas actuales (para medir su tamaño)"""
+        with self._lock:
+            return list(self.entries.values())
+
+    def hit_rate(self):
+        total = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / total if total else 0.0
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self.entries:
+                self.stats['invalidations'] += 1
+            self.entries.clear()
+            self.version = version
@@ -0,0 +1,677 @@
+"""
+Pipeline de búsqueda de películas, independiente de la interfaz.
+
+Lo usan la app de Streamlit y la API HTTP (search_api.py); dentro de un
+mismo proceso ambas comparten el motor devuelto por load_engine(), es
+decir, el mismo modelo, la misma conexión a ChromaDB y los mismos índices.
+
+Etapas: caché de resultados -> ruta rápida difusa (título/actor) ->
+variantes con LLM -> embeddings en lote -> búsqueda híbrida multi-query
+pre-filtrada -> re-ranking por rating. Cada búsqueda se anota en el
+registro de queries (query_log.py), con el que se calienta la caché.
+
+Cada búsqueda ordena de una vez un conjunto de POOL_SIZE candidatos y
+devuelve un SearchCursor para paginarlo ("cargar más") sin volver a
+llamar al LLM ni al encoder; solo cuando el conjunto se agota se amplía
+con otra consulta a ChromaDB reutilizando los embeddings guardados.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+from lexical_index import BM25Index, PROJECT_ROOT, reciprocal_rank_fusion
+from fuzzy_index import FuzzyIndex
+from ratings import movie_rating
+from query_filters import (FilterIndex, MIN_FILTERED_MOVIES, build_where,
+                           describe_constraints, parse_constraints)
+from result_cache import CollectionVersion, ResultCache
+from neighbor_graph import NeighborGraph
+from thesaurus import ThesaurusExpander
+from query_log import QUERY_LOG_FILE, CacheWarmer, QueryLog
+from metrics import METRICS
+from llm_guard import LLM_GUARD, LLMUnavailable
+from llm_router import LLM_ROUTER
+
+EMBEDDING_MODEL = 'Alibaba-NLP/gte-multilingual-base'
+CHROMA_DB_DIR = os.path.join(PROJECT_ROOT, 'chroma_db')
+COLLECTION_NAME = 'movies'
+
+# Candidatos que se recuperan y ordenan en la primera búsqueda (el
+# conjunto que se pagina); al agotarse se duplica hasta MAX_POOL_SIZE
+POOL_SIZE = int(os.getenv("SEARCH_POOL_SIZE", "60"))
+MAX_POOL_SIZE = 1000
+N_RESULTS = 6
+N_SIMILAR = 5
+RELEVANCE_WEIGHT = 0.6
+RATING_WEIGHT = 0.4
+# Expansión de la query: 'llm' (con el tesauro de reserva) o 'thesaurus' (sin red)
+QUERY_EXPANSION = os.getenv("QUERY_EXPANSION", "llm")
+# Todo lo que cambia el ranking forma parte de la clave de la caché
+RANKING_CONFIG = (EMBEDDING_MODEL, POOL_SIZE, RELEVANCE_WEIGHT, RATING_WEIGHT, QUERY_EXPANSION)
+# Campos de la respuesta que se guardan en la caché de resultados
+CACHED_FIELDS = ('results', 'source', 'variants', 'filters', 'fast_match', 'degraded')
+
+
+class SearchError(Exception):
+    """Fallo de la búsqueda (normalmente, de la conexión con ChromaDB)"""
+
+
+def rerank(candidates, limit=None, relevance_weight=RELEVANCE_WEIGHT, rating_weight=RATING_WEIGHT):
+    """
+    Re-ranking por relevancia fusionada y rating.
+
+    Args:
+        candidates: Tuplas (id, metadata, distancia, relevancia 0-1)
+        limit: Número de resultados (None = todos)
+        relevance_weight, rating_weight: Pesos de la puntuación final
+
+    Returns:
+        Los `limit` mejores resultados (dicts con id, metadata, distance,
+        final_score y rating)
+    """
+    scored_results = []
+    for doc_id, meta, dist, relevance in candidates:
+        rating = movie_rating(meta)
+        norm_rating = min(max(rating / 5.0, 0), 1)
+        final_score = (relevance * relevance_weight) + (norm_rating * rating_weight)
+
+        scored_results.append({
+            'id': doc_id,
+            'metadata': meta,
+            'distance': dist,
+            'final_score': final_score,
+            'rating': rating
+        })
+
+    scored_results.sort(key=lambda x: x['final_score'], reverse=True)
+    return scored_results[:limit]
+
+
+class SearchCursor:
+    """
+    Paginación de una búsqueda ("cargar más"), pensada para guardarse en la
+    sesión del usuario.
+
+    Sirve las páginas desde el conjunto de candidatos ya ordenado; cuando
+    se agota, recupera el doble de candidatos de ChromaDB con los
+    embeddings guardados de la query (sin LLM ni encoder). Los resultados
+    ya servidos no cambian de posición: los nuevos se ordenan detrás.
+
+    Args:
+        engine: SearchEngine que creó el cursor
+        query: Consulta del usuario
+        pool: Resultados ya ordenados
+        embeddings: Embeddings de las variantes de la query
+        where: Filtro de ChromaDB de la búsqueda
+        allowed: IDs permitidos por los filtros (None = todos)
+        fetched: Candidatos pedidos a ChromaDB hasta ahora
+        exhausted: True si no hay más candidatos que recuperar
+    """
+
+    def __init__(self, engine, query, pool, embeddings=None, where=None, allowed=None,
+                 fetched=0, exhausted=True):
+        self.engine = engine
+        self.query = query
+        self.pool = list(pool)
+        self.embeddings = embeddings
+        self.where = where
+        self.allowed = allowed
+        self.fetched = fetched
+        self.exhausted = exhausted or embeddings is None
+        self.served = 0
+        self.stats = {'grows': 0}
+        self._lock = threading.Lock()
+
+    def state(self):
+        """Estado necesario para recrear el cursor (se guarda en la caché de resultados)"""
+        with self._lock:
+            return {
+                'pool': list(self.pool), 'embeddings': self.embeddings, 'where': self.where,
+                'allowed': self.allowed, 'fetched': self.fetched, 'exhausted': self.exhausted
+            }
+
+    def fetch(self, count):
+        """
+        Los `count` primeros resultados, ampliando el conjunto si hace falta.
+
+        Raises:
+            SearchError: Si falla la ampliación en ChromaDB
+        """
+        with self._lock:
+            while len(self.pool) < count and not self.exhausted:
+                self._grow()
+            self.served = max(self.served, min(count, len(self.pool)))
+            return self.pool[:count]
+
+    def page(self, offset, limit=N_RESULTS):
+        """Resultados [offset, offset + limit)"""
+        return self.fetch(offset + limit)[offset:]
+
+    def has_more(self, count):
+        """True si existen resultados más allá de los `count` primeros"""
+        return len(self.pool) > count or not self.exhausted
+
+    def _grow(self):
+        limit = MAX_POOL_SIZE if self.allowed is None else min(MAX_POOL_SIZE, len(self.allowed))
+        n_fetch = min(max(self.fetched, 1) * 2, limit)
+        if n_fetch <= self.fetched:
+            self.exhausted = True
+            return
+
+        with self.engine.metrics.span('cursor_grow'):
+            candidates = self.engine._retrieve(self.query, self.embeddings, self.where,
+                                               self.allowed, n_fetch)
+        self.fetched = n_fetch
+        self.stats['grows'] += 1
+
+        # Se conserva el orden de lo ya mostrado y se reordena el resto
+        kept = self.pool[:self.served]
+        kept_ids = {r['id'] for r in kept}
+        rest = rerank([c for c in candidates if c[0] not in kept_ids])
+        if len(kept) + len(rest) <= len(self.pool):
+            self.exhausted = True
+        self.pool = kept + rest
+        if n_fetch >= limit:
+            self.exhausted = True
+
+
+class SearchEngine:
+    """
+    Recursos cargados (encoder, colección e índices) y el pipeline completo.
+
+    Todos los índices son opcionales: si no se han generado, la búsqueda
+    sigue siendo solo vectorial. Es seguro usar la misma instancia desde
+    varios hilos. Cada etapa se mide en `metrics` (metrics.Metrics).
+
+    Con `index_loader` (función que devuelve el dict de índices de
+    load_indexes), los índices se recargan de disco cuando la ingesta
+    publica una nueva versión de la colección, igual que se vacía la caché
+    de resultados; sin él, se usan siempre los que se pasaron.
+    """
+
+    def __init__(self, encoder, collection, lexical_index=None, fuzzy_index=None,
+                 filter_index=None, neighbor_graph=None, result_cache=None,
+                 collection_version=None, metrics=None, memory=None, thesaurus=None, query_log=None,
+                 index_loader=None):
+        self.encoder = encoder
+        self.collection = collection
+        self.lexical_index = lexical_index
+        self.fuzzy_index = fuzzy_index
+        self.filter_index = filter_index
+        self.neighbor_graph = neighbor_graph
+        self.thesaurus = thesaurus
+        self.result_cache = result_cache if result_cache is not None else ResultCache()
+        self.collection_version = collection_version
+        self.metrics = metrics if metrics is not None else METRICS
+        # memory_report.MemoryMonitor con el desglose de memoria (lo crea load_engine)
+        self.memory = memory
+        # query_log.QueryLog donde se anota cada búsqueda (None = no se registran)
+        self.query_log = query_log
+        # Tiempo acumulado de la búsqueda semántica (para estimar lo que ahorra la ruta rápida)
+        self.stats = {'slow_searches': 0, 'slow_ms': 0.0}
+        self._stats_lock = threading.Lock()
+        self.index_loader = index_loader
+        # Versión de la colección de la que salen los índices en memoria
+        self.indexes_version = collection_version.current() if collection_version else None
+        self._index_lock = threading.Lock()
+
+    def refresh_indexes(self, version=None):
+        """
+        Recarga los índices de disco si la versión publicada de la colección
+        ya no es la de los índices en memoria (tras `02_ingest.py --delta`).
+
+        Returns:
+            True si se recargaron
+        """
+        if self.index_loader is None:
+            return False
+        if version is None:
+            version = self.collection_version.current() if self.collection_version else None
+        if version == self.indexes_version:
+            return False
+        with self._index_lock:
+            # Otro hilo pudo recargarlos mientras se esperaba el cerrojo
+            if version == self.indexes_version:
+                return False
+            with self.metrics.span('reload_indexes'):
+                for name, index in self.index_loader().items():
+                    setattr(self, name, index)
+            self.indexes_version = version
+        print(f"🔄 Índices recargados para la versión {version} de la colección")
+        return True
+
+    def search(self, query, expand=True, log=True):
+        """
+        Ejecuta la búsqueda completa (sin la recomendación del LLM).
+
+        Args:
+            query: Consulta del usuario
+            expand: Generar variantes de la query con el LLM
+            log: Anotarla en el registro de queries (no lo hace el calentamiento)
+
+        Returns:
+            Dict con query, results (primera página), cursor (SearchCursor
+            para las siguientes), source ('fast_path' o 'semantic'), cached,
+            variants, filters, fast_match, recommendation (solo si estaba
+            en caché), degraded (etapas del LLM que se omitieron por
+            timeout o fallo), version, expand, elapsed_ms y timings (spans
+            de cada etapa: stage, ms, outcome)
+
+        Raises:
+            SearchError: Si falla la consulta a ChromaDB
+        """
+        start = time.perf_counter()
+        version = self.collection_version.current() if self.collection_version else None
+        config = RANKING_CONFIG + (expand,)
+
+        with self.metrics.trace() as spans:
+            outcome, cached = 'ok', None
+            try:
+                self.refresh_indexes(version)
+                with self.metrics.span('result_cache'):
+                    cached = self.result_cache.get(query, config, version)
+                if cached:
+                    response = {k: v for k, v in cached.items() if k != 'pool_state'}
+                    response['cached'] = True
+                    pool_state = cached['pool_state']
+                else:
+                    response, pool_state = self._search_uncached(query, expand)
+                    # Una búsqueda sin la expansión del LLM no se cachea: se
+                    # repetirá completa cuando el LLM vuelva a responder
+                    if not response['degraded']:
+                        self.result_cache.put(query, config, version, pool_state=pool_state, **response)
+                    response.update(recommendation=None, cached=False)
+            except Exception as e:
+                outcome = type(e).__name__
+                raise
+            finally:
+                # Las búsquedas servidas desde la caché se miden aparte
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                stage = 'search_cached' if outcome == 'ok' and cached else 'search'
+                self.metrics.observe(stage, elapsed_ms, outcome)
+
+        response.update(query=query, version=version, expand=expand,
+                        cursor=SearchCursor(self, query, **pool_state),
+                        elapsed_ms=elapsed_ms, timings=spans)
+        if log and self.query_log is not None:
+            self.query_log.record(response)
+        return response
+
+    def recommend(self, response):
+        """
+        Recomendación del LLM para una respuesta de search(), generada solo
+        si no estaba ya en caché.
+
+        Returns:
+            Texto de la recomendación, o None si el LLM no respondió dentro
+            de su presupuesto (se añade 'enrich' a response['degraded'])
+        """
+        if response.get('recommendation'):
+            return response['recommendation']
+
+        from llm_integration import enrich_movie_recommendations
+
+        movie_results = []
+        for result in response['results']:
+            metadata = result['metadata']
+            movie_results.append({
+                'title': metadata['title'],
+                'overview': metadata['overview'],
+                'synopsis': metadata.get('synopsis'),
+                'genres': metadata.get('genres_text', 'N/A'),
+                'similarity': max(0, (1 - result['distance']) * 100)
+            })
+        try:
+            with self.metrics.span('enrich'):
+                recommendation = enrich_movie_recommendations(response['query'], movie_results)
+        except LLMUnavailable as e:
+            print(f"🤖 Recomendación omitida: {e}")
+            response['degraded'] = response['degraded'] + ['enrich']
+            return None
+
+        response['recommendation'] = recommendation
+        if not response['degraded']:
+            self.result_cache.put(response['query'], RANKING_CONFIG + (response['expand'],),
+                                  response['version'], recommendation=recommendation,
+                                  pool_state=response['cursor'].state(),
+                                  **{k: response[k] for k in CACHED_FIELDS})
+        return recommendation
+
+    def similar_many(self, movie_ids, k=N_SIMILAR):
+        """
+        Películas similares de varias películas según el grafo precalculado.
+
+        Los títulos de todos los vecinos se recuperan en una sola lectura por
+        ID de ChromaDB (sin encoder ni búsqueda vectorial).
+
+        Returns:
+            Dict {id: [{'id', 'title', 'score'}, ...]} (solo las películas
+            que están en el grafo)
+        """
+        self.refresh_indexes()
+        if not self.neighbor_graph:
+            return {}
+
+        neighbors = {m: self.neighbor_graph.similar(m, k) for m in movie_ids if m}
+        neighbor_ids = list({n_id for pairs in neighbors.values() for n_id, _ in pairs})
+        if not neighbor_ids:
+            return {}
+
+        try:
+            with self.metrics.span('similar'):
+                data = self.collection.get(ids=neighbor_ids, include=['metadatas'])
+        except Exception as e:
+            raise SearchError(f"Error cargando películas similares: {e}") from e
+        titles = {doc_id: meta['title'] for doc_id, meta in zip(data['ids'], data['metadatas'])}
+
+        return {
+            movie_id: [
+                {'id': n_id, 'title': titles[n_id], 'score': score}
+                for n_id, score in pairs if n_id in titles
+            ]
+            for movie_id, pairs in neighbors.items() if pairs
+        }
+
+    def similar(self, movie_id, k=N_SIMILAR):
+        """Películas similares de una película, o None si no está en el grafo"""
+        return self.similar_many([str(movie_id)], k).get(str(movie_id))
+
+    def health(self):
+        """Estado de la colección, los índices y las cachés"""
+        return {
+            'status': 'ok',
+            'movies': self.collection.count(),
+            'collection_version': self.collection_version.current() if self.collection_version else None,
+            'indexes_version': self.indexes_version,
+            'indexes': {
+                'lexical': self.lexical_index is not None,
+                'fuzzy': self.fuzzy_index is not None,
+                'filters': self.filter_index is not None,
+                'neighbors': self.neighbor_graph is not None,
+            },
+            'result_cache': {'entries': len(self.result_cache), 'hit_rate': self.result_cache.hit_rate()},
+            'encoder': dict(getattr(self.encoder, 'stats', {})),
+            'llm': {**LLM_GUARD.health(), 'routes': LLM_ROUTER.summary()},
+            'query_log': dict(self.query_log.stats) if self.query_log is not None else None,
+        }
+
+    def _search_uncached(self, query, expand):
+        """
+        Returns:
+            Tupla (respuesta con los CACHED_FIELDS, estado del cursor)
+        """
+        # Ruta rápida: título o actor reconocido (aunque esté mal escrito)
+        fast_match = None
+        if self.fuzzy_index:
+            with self.metrics.span('fast_path'):
+                fast_match = self.fuzzy_index.lookup(query)
+        if fast_match:
+            results = [
+                {
+                    'id': movie_id,
+                    'metadata': meta,
+                    'distance': 1 - fast_match['confidence'],
+                    'final_score': fast_match['confidence'],
+                    'rating': movie_rating(meta)
+                }
+                for movie_id, meta in fast_match['results']
+            ]
+            return {
+                'source': 'fast_path', 'results': results[:N_RESULTS], 'variants': [query], 'filters': None,
+                'fast_match': {k: fast_match[k] for k in ('kind', 'name', 'confidence')}, 'degraded': []
+            }, {'pool': results}
+
+        slow_start = time.perf_counter()
+        pool, variants, filters, pool_state, degraded = self._semantic_search(query, expand)
+        with self._stats_lock:
+            self.stats['slow_searches'] += 1
+            self.stats['slow_ms'] += (time.perf_counter() - slow_start) * 1000
+        return {
+            'source': 'semantic', 'results': pool[:N_RESULTS], 'variants': variants,
+            'filters': filters, 'fast_match': None, 'degraded': degraded
+        }, {'pool': pool, **pool_state}
+
+    def _resolve_filters(self, query, exact_title):
+        """
+        Restricciones de género, década y rating de la consulta, aplicables
+        solo si existe el índice de filtros y dejan suficientes películas.
+
+        Returns:
+            Tupla (where de ChromaDB o None, IDs permitidos o None, descripción o None)
+        """
+        if not self.filter_index or exact_title:
+            return None, None, None
+
+        constraints = parse_constraints(query)
+        allowed = self.filter_index.matching_ids(constraints)
+        if allowed is None:
+            return None, None, None
+
+        if len(allowed) < MIN_FILTERED_MOVIES:
+            print(f"🎛️ Filtros '{describe_constraints(constraints)}' descartados: "
+                  f"solo {len(allowed)} películas")
+            return None, None, None
+
+        description = f"{describe_constraints(constraints)} ({len(allowed)} películas)"
+        return build_where(constraints), allowed, description
+
+    def _semantic_search(self, query, expand):
+        """
+        Variantes de la query con LLM, embeddings en un solo lote, búsqueda
+        híbrida multi-query (pre-filtrada por género, década y rating) y
+        re-ranking por rating.
+
+        Las variantes salen del LLM o, con QUERY_EXPANSION=thesaurus o si
+        el LLM no responde dentro de su presupuesto, del tesauro local.
+
+        Returns:
+            Tupla (conjunto de candidatos ordenado, variantes, descripción de
+            los filtros o None, estado para ampliar el conjunto, etapas
+            omitidas)
+        """
+        lexical_index = self.lexical_index
+        exact_title = lexical_index.exact_title_match(query) if lexical_index else None
+        where, allowed, filters = self._resolve_filters(query, exact_title)
+
+        degraded = []
+        variants = None
+        if exact_title or not expand:
+            # Consulta por nombre exacto: la expansión no aporta nada
+            variants = [query]
+        elif QUERY_EXPANSION == 'llm':
+            from llm_integration import request_query_variants
+            try:
+                with self.metrics.span('llm_expand'):
+                    variants = request_query_variants(query)
+            except LLMUnavailable as e:
+                print(f"🤖 Expansión con LLM omitida, se usa el tesauro: {e}")
+                degraded.append('llm_expand')
+        if variants is None:
+            with self.metrics.span('thesaurus_expand'):
+                variants = self.thesaurus.expand(query) if self.thesaurus else [query]
+
+        # Un único forward pass del encoder para todas las variantes (y las
+        # queries de otras sesiones que lleguen en la misma ventana)
+        with self.metrics.span('encode'):
+            query_embeddings = np.asarray(self.encoder.encode(variants)).tolist()
+
+        n_fetch = POOL_SIZE if allowed is None else min(POOL_SIZE, len(allowed))
+        candidates = self._retrieve(query, query_embeddings, where, allowed, n_fetch)
+        pool_state = {
+            'embeddings': query_embeddings, 'where': where, 'allowed': allowed,
+            'fetched': n_fetch, 'exhausted': len(candidates) < n_fetch
+        }
+        with self.metrics.span('rerank'):
+            pool = rerank(candidates)
+        return pool, variants, filters, pool_state, degraded
+
+    def _retrieve(self, query, query_embeddings, where, allowed, n_candidates):
+        """
+        Búsqueda híbrida de `n_candidates` candidatos con embeddings ya
+        calculados (la usan la búsqueda inicial y SearchCursor al ampliar).
+
+        Returns:
+            Lista de tuplas (id, metadata, distancia, relevancia 0-1)
+
+        Raises:
+            SearchError: Si falla la consulta a ChromaDB
+        """
+        # Búsqueda léxica (microsegundos): títulos, reparto y palabras exactas
+        lexical_hits = []
+        if self.lexical_index:
+            with self.metrics.span('lexical'):
+                lexical_hits = self.lexical_index.search(
+                    query, k=n_candidates if allowed is None else len(self.lexical_index))
+                if allowed is not None:
+                    lexical_hits = [hit for hit in lexical_hits if hit[0] in allowed]
+                lexical_hits = lexical_hits[:n_candidates]
+
+        try:
+            # Una sola consulta a ChromaDB con todos los embeddings; el
+            # filtro se aplica dentro de ChromaDB, antes del top-K
+            with self.metrics.span('db_query'):
+                results = self.collection.query(
+                    query_embeddings=query_embeddings,
+                    n_results=n_candidates,
+                    where=where
+                )
+            with self.metrics.span('fuse'):
+                return self._fuse_candidates(results, lexical_hits, query_embeddings, n_candidates)
+        except Exception as e:
+            raise SearchError(f"Error query: {e}") from e
+
+    def _fuse_candidates(self, dense_results, lexical_hits, query_embeddings, limit):
+        """
+        Fusiona con RRF los rankings vectoriales (uno por variante de la
+        query) y el léxico.
+
+        La distancia de cada película es la menor frente a cualquiera de las
+        variantes. Los candidatos que solo aparecen en el índice léxico se
+        recuperan de ChromaDB y su distancia se calcula contra los embeddings
+        de las variantes (L2 al cuadrado, la métrica de la colección), así
+        todos los candidatos se muestran con la misma escala de similitud.
+
+        Returns:
+            Lista de tuplas (id, metadata, distancia, relevancia 0-1)
+        """
+        dense_rankings = dense_results['ids']
+        if not lexical_hits and len(dense_rankings) == 1:
+            # Una sola query y sin índice léxico: la relevancia es la similitud vectorial
+            return [
+                (doc_id, meta, dist, max(0, 1 - dist))
+                for doc_id, meta, dist in zip(dense_rankings[0], dense_results['metadatas'][0],
+                                              dense_results['distances'][0])
+            ]
+
+        by_id = {}
+        for ids, metas, dists in zip(dense_rankings, dense_results['metadatas'], dense_results['distances']):
+            for doc_id, meta, dist in zip(ids, metas, dists):
+                if doc_id not in by_id or dist < by_id[doc_id][1]:
+                    by_id[doc_id] = (meta, dist)
+        lexical_ids = [doc_id for doc_id, _ in lexical_hits]
+
+        fused = reciprocal_rank_fusion(dense_rankings + [lexical_ids])[:limit]
+
+        missing = [doc_id for doc_id, _ in fused if doc_id not in by_id]
+        if missing:
+            extra = self.collection.get(ids=missing, include=['metadatas', 'embeddings'])
+            query_vecs = np.asarray(query_embeddings)
+            for doc_id, meta, emb in zip(extra['ids'], extra['metadatas'], extra['embeddings']):
+                dist = float(np.min(np.sum((query_vecs - np.asarray(emb)) ** 2, axis=1)))
+                by_id[doc_id] = (meta, dist)
+
+        best = fused[0][1] if fused else 1.0
+        return [
+            (doc_id, by_id[doc_id][0], by_id[doc_id][1], score / best)
+            for doc_id, score in fused
+            if doc_id in by_id
+        ]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def load_indexes():
+    """Índices auxiliares generados por 02_ingest.py, por atributo de SearchEngine"""
+    return {
+        'lexical_index': BM25Index.load(),
+        'fuzzy_index': FuzzyIndex.load(),
+        'filter_index': FilterIndex.load(),
+        'neighbor_graph': NeighborGraph.load(),
+        # Sin el vocabulario del catálogo (02_ingest.py), el tesauro curado
+        'thesaurus': ThesaurusExpander.load() or ThesaurusExpander(),
+    }
+
+
+def load_engine():
+    """
+    Motor compartido por todo el proceso (UI y API): el modelo y la
+    conexión a ChromaDB se cargan una sola vez; los índices, de nuevo cada
+    vez que la ingesta publica una versión de la colección.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            import chromadb
+            from sentence_transformers import SentenceTransformer
+            from batch_encoder import BatchEncoder
+            from memory_report import MemoryMonitor
+
+            print("🔄 (Re)Cargando modelos y conexión a DB...")
+            memory = MemoryMonitor()
+            # Un único encoder compartido que agrupa las queries de todas las sesiones
+            model = SentenceTransformer(EMBEDDING_MODEL, trust_remote_code=True)
+            encoder = BatchEncoder(model)
+            memory.mark('modelo y runtime de torch')
+
+            client = chromadb.PersistentClient(path=CHROMA_DB_DIR)
+            collection = client.get_collection(name=COLLECTION_NAME)
+            memory.mark('cliente de ChromaDB')
+
+            _engine = SearchEngine(
+                encoder, collection,
+                collection_version=CollectionVersion(),
+                memory=memory,
+                query_log=QueryLog() if QUERY_LOG_FILE else None,
+                index_loader=load_indexes,
+                **load_indexes()
+            )
+            memory.mark('índices')
+            register_memory_components(_engine, model)
+            memory.start()
+            if _engine.query_log is not None:
+                # Las búsquedas más frecuentes vuelven a la caché sin esperar al primer usuario
+                CacheWarmer(_engine, _engine.query_log).start()
+        return _engine
+
+
+def register_memory_components(engine, model):
+    """Componentes del desglose de memoria del motor (ver memory_report.py)"""
+    from memory_report import (RESULT_CACHE_BUDGET_MB, SESSION_BUDGET_MB, deep_sizeof,
+                               dir_size, estimate_sizeof, model_weights_bytes)
+
+    memory = engine.memory
+    memory.register('pesos del modelo', lambda: model_weights_bytes(model), static=True)
+    # ChromaDB carga el HNSW al hacer la primera consulta; su tamaño es el de los archivos
+    memory.register('índice HNSW (ChromaDB)', lambda: dir_size(CHROMA_DB_DIR, '.bin'))
+    sizes = {}
+
+    def index_size(attr):
+        # Se mide una vez por índice cargado (de nuevo tras una recarga)
+        index = getattr(engine, attr)
+        if attr not in sizes or sizes[attr][0] is not index:
+            sizes[attr] = (index, deep_sizeof(index))
+        return sizes[attr][1]
+
+    for name, attr in [('índice léxico', 'lexical_index'), ('índice difuso', 'fuzzy_index'),
+                       ('índice de filtros', 'filter_index'), ('grafo de vecinos', 'neighbor_graph'),
+                       ('tesauro', 'thesaurus')]:
+        if getattr(engine, attr) is not None:
+            memory.register(name, lambda attr=attr: index_size(attr))
+    memory.register('caché de resultados',
+                    lambda: estimate_sizeof(engine.result_cache.values(), exclude=(engine,)),
+                    budget_mb=RESULT_CACHE_BUDGET_MB)
+    memory.register('sesiones de la app', memory.sessions_bytes, budget_mb=SESSION_BUDGET_MB)
@@ -0,0 +1,185 @@
+"""
+API HTTP de búsqueda (FastAPI) sobre el mismo pipeline que la app.
+
+Endpoints:
+    GET /search?q=...&expand=true&enrich=false&limit=6&profile=sample
+    GET /search/more?cursor=...&offset=6&limit=6
+    GET /similar/{movie_id}?k=5
+    GET /health
+    GET /metrics      (latencia por etapa, formato de Prometheus)
+    GET /memory       (memoria residente por componente)
+
+El pipeline es síncrono (encoder, ChromaDB, LLM), así que cada petición se
+ejecuta en un pool de SEARCH_API_WORKERS hilos con un tiempo máximo de
+SEARCH_API_TIMEOUT segundos; si hay demasiadas peticiones en cola se
+responde 503 en lugar de acumular latencia.
+
+/search devuelve un `cursor` con el que /search/more pagina el mismo
+conjunto de candidatos sin repetir la búsqueda; se guardan los
+MAX_CURSORS más recientes.
+
+`profile=sample|cprofile` perfila esa petición (ver profiling.py).
+
+Uso:
+    python src/search_api.py                 # Proceso independiente
+    SEARCH_API_PORT=8000 streamlit run app.py  # Dentro del proceso de la UI
+"""
+import asyncio
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from memory_report import estimate_sizeof
+from metrics import METRICS
+from profiling import maybe_profile
+from search import N_RESULTS, N_SIMILAR, SearchError, load_engine
+
+SEARCH_API_HOST = os.getenv("SEARCH_API_HOST", "127.0.0.1")
+SEARCH_API_PORT = int(os.getenv("SEARCH_API_PORT", "8000"))
+SEARCH_API_WORKERS = int(os.getenv("SEARCH_API_WORKERS", "4"))
+SEARCH_API_TIMEOUT = float(os.getenv("SEARCH_API_TIMEOUT", "30"))
+# Peticiones admitidas a la vez (en ejecución + en cola) por cada hilo
+QUEUE_PER_WORKER = 4
+# Cursores de paginación guardados (LRU)
+MAX_CURSORS = 1024
+
+
+def create_app(engine=None, workers=SEARCH_API_WORKERS, timeout=SEARCH_API_TIMEOUT):
+    """
+    Crea la aplicación FastAPI.
+
+    Args:
+        engine: SearchEngine ya cargado (ej: el de la UI); si es None se
+            carga al arrancar con load_engine()
+        workers: Hilos que ejecutan el pipeline
+        timeout: Segundos máximos por petición
+    """
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='search-api')
+    slots = threading.BoundedSemaphore(workers * QUEUE_PER_WORKER)
+    state = {'engine': engine}
+    cursors = OrderedDict()
+    cursors_lock = threading.Lock()
+
+    def cursors_bytes():
+        with cursors_lock:
+            items = list(cursors.values())
+        return estimate_sizeof(items, exclude=(state['engine'],))
+
+    @asynccontextmanager
+    async def lifespan(app):
+        if state['engine'] is None:
+            loop = asyncio.get_running_loop()
+            state['engine'] = await loop.run_in_executor(executor, load_engine)
+        memory = getattr(state['engine'], 'memory', None)
+        if memory is not None:
+            memory.register('cursores de la API', cursors_bytes)
+        yield
+        executor.shutdown(wait=False)
+
+    app = FastAPI(title="Film Suggester API", lifespan=lifespan)
+
+    async def run(func, *args):
+        if not slots.acquire(blocking=False):
+            raise HTTPException(status_code=503, detail="Servidor saturado, inténtalo de nuevo")
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(executor, func, *args)
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"La búsqueda superó {timeout:g}s")
+        except SearchError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+
+    def do_search(query, expand, enrich, limit, profile):
+        engine = state['engine']
+        with maybe_profile(query, profile, engine.metrics) as session:
+            response = engine.search(query, expand=expand)
+            if enrich and response['results']:
+                engine.recommend(response)
+        if session:
+            response['profile'] = os.path.basename(session.path)
+
+        cursor = response.pop('cursor')
+        response['results'] = cursor.fetch(limit)
+        token = uuid.uuid4().hex
+        with cursors_lock:
+            cursors[token] = cursor
+            while len(cursors) > MAX_CURSORS:
+                cursors.popitem(last=False)
+        return {**response, 'cursor': token, 'has_more': cursor.has_more(limit)}
+
+    def do_more(cursor, offset, limit):
+        return {
+            'results': cursor.page(offset, limit),
+            'offset': offset,
+            'has_more': cursor.has_more(offset + limit)
+        }
+
+    @app.get("/search")
+    async def search(q: str = Query(..., min_length=1, max_length=500),
+                     expand: bool = True, enrich: bool = False,
+                     limit: int = Query(N_RESULTS, ge=1, le=100), profile: str = None):
+        return await run(do_search, q, expand, enrich, limit, profile)
+
+    @app.get("/search/more")
+    async def search_more(cursor: str, offset: int = Query(..., ge=0),
+                          limit: int = Query(N_RESULTS, ge=1, le=100)):
+        with cursors_lock:
+            search_cursor = cursors.get(cursor)
+            if search_cursor is not None:
+                cursors.move_to_end(cursor)
+        if search_cursor is None:
+            raise HTTPException(status_code=404, detail="Cursor desconocido o caducado")
+        return await run(do_more, search_cursor, offset, limit)
+
+    @app.get("/similar/{movie_id}")
+    async def similar(movie_id: str, k: int = Query(N_SIMILAR, ge=1, le=50)):
+        movies = await run(state['engine'].similar, movie_id, k)
+        if movies is None:
+            raise HTTPException(status_code=404, detail=f"Película {movie_id} sin vecinos precalculados")
+        return {'id': movie_id, 'similar': movies}
+
+    @app.get("/health")
+    async def health():
+        return await run(state['engine'].health)
+
+    @app.get("/memory")
+    async def memory():
+        monitor = getattr(state['engine'], 'memory', None)
+        if monitor is None:
+            raise HTTPException(status_code=404, detail="Monitor de memoria no disponible")
+        return await run(monitor.report)
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        engine = state['engine']
+        return (engine.metrics if engine is not None else METRICS).prometheus()
+
+    return app
+
+
+def start_background_server(engine, host=SEARCH_API_HOST, port=SEARCH_API_PORT):
+    """
+    Arranca la API en un hilo del proceso actual, compartiendo `engine`
+    (modelo e índices) con quien la llama.
+    """
+    import uvicorn
+
+    config = uvicorn.Config(create_app(engine), host=host, port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, name='search-api', daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(create_app(), host=SEARCH_API_HOST, port=SEARCH_API_PORT)
@@ -0,0 +1,209 @@
+"""
+Expansión bilingüe de queries sin LLM, con un tesauro de géneros y temas.
+
+Casi todo lo que aporta la expansión con LLM es añadir sinónimos en
+español e inglés de los géneros y temas de la consulta ("terror" ->
+horror, scary, suspense). Aquí se hace con un tesauro curado de conceptos
+(términos en español y en inglés) ajustado al vocabulario del propio
+catálogo (`genres_text` y `keywords_text`):
+
+    - Los términos en inglés se ordenan por el número de películas que los
+      usan como género o keyword, así se eligen los que de verdad aparecen
+      en los textos indexados
+    - Se añaden las keywords del catálogo que contienen el término
+      principal del concepto ("zombie" -> "zombie apocalypse")
+
+Devuelve las mismas variantes que el LLM ([original, ES, EN]) en
+microsegundos y sin red. Se usa como expansión por defecto
+(QUERY_EXPANSION=thesaurus) o como reserva cuando el LLM no responde a
+tiempo.
+"""
+import os
+import pickle
+import re
+from collections import Counter, defaultdict
+
+from lexical_index import INDEX_DIR, normalize_text, tokenize
+
+THESAURUS_FILE = os.path.join(INDEX_DIR, 'thesaurus.pkl')
+
+# Sinónimos que se añaden por concepto y lengua
+MAX_TERMS = 3
+# Keywords del catálogo relacionadas que se añaden por concepto
+MAX_RELATED = 2
+# Una keyword relacionada debe aparecer en al menos estas películas
+MIN_KEYWORD_MOVIES = 3
+
+# Conceptos: términos en español y en inglés (el primero de cada lengua es
+# el principal). Se reconocen en la consulta sin acentos ni mayúsculas, así
+# que ningún término puede ser una palabra común en la otra lengua
+# (ej: "sea").
+BILINGUAL_THESAURUS = [
+    # Géneros
+    {'es': ['terror', 'miedo', 'horror', 'suspenso'], 'en': ['horror', 'scary', 'fear', 'suspense']},
+    {'es': ['comedia', 'divertida', 'humor', 'graciosa'], 'en': ['comedy', 'funny', 'humor', 'hilarious']},
+    {'es': ['acción', 'peleas', 'explosiones', 'persecuciones'], 'en': ['action', 'fight', 'explosions', 'car chase']},
+    {'es': ['drama', 'dramática', 'emotiva'], 'en': ['drama', 'dramatic', 'emotional']},
+    {'es': ['romántica', 'romance', 'amor', 'enamorados'], 'en': ['romance', 'love', 'romantic', 'lovers']},
+    {'es': ['ciencia ficción', 'futurista', 'espacial'], 'en': ['science fiction', 'sci-fi', 'futuristic', 'space']},
+    {'es': ['animación', 'animada', 'dibujos animados'], 'en': ['animation', 'animated', 'cartoon']},
+    {'es': ['aventura', 'aventuras', 'expedición'], 'en': ['adventure', 'quest', 'expedition']},
+    {'es': ['thriller', 'suspense', 'tensión', 'intriga'], 'en': ['thriller', 'suspense', 'tension', 'intrigue']},
+    {'es': ['documental'], 'en': ['documentary', 'real events']},
+    {'es': ['fantasía', 'mágica', 'magia'], 'en': ['fantasy', 'magic', 'wizard']},
+    {'es': ['bélica', 'guerra', 'soldados', 'batalla'], 'en': ['war', 'soldier', 'battle', 'world war ii']},
+    {'es': ['western', 'vaqueros', 'oeste'], 'en': ['western', 'cowboy', 'gunslinger', 'wild west']},
+    {'es': ['crimen', 'policiaca', 'criminal', 'detective'], 'en': ['crime', 'police', 'detective', 'criminal']},
+    {'es': ['misterio', 'enigma', 'investigación'], 'en': ['mystery', 'investigation', 'whodunit']},
+    {'es': ['familiar', 'para toda la familia', 'niños'], 'en': ['family', 'kids', 'children']},
+    {'es': ['musical', 'música', 'canciones'], 'en': ['musical', 'music', 'singer', 'songs']},
+    {'es': ['histórica', 'época', 'biografía'], 'en': ['history', 'historical', 'biography', 'period drama']},
+    # Temas
+    {'es': ['psicológico', 'psicológica', 'mente', 'locura'], 'en': ['psychological', 'mind', 'madness', 'insanity']},
+    {'es': ['sobrenatural', 'fantasmas', 'espíritus', 'casa encantada'], 'en': ['supernatural', 'ghost', 'haunted house', 'spirit']},
+    {'es': ['zombis', 'zombies', 'muertos vivientes'], 'en': ['zombie', 'undead', 'living dead']},
+    {'es': ['vampiros', 'vampiro'], 'en': ['vampire', 'bloodsucker']},
+    {'es': ['extraterrestres', 'alienígenas', 'invasión'], 'en': ['alien', 'extraterrestrial', 'alien invasion', 'ufo']},
+    {'es': ['viaje en el tiempo', 'viajes en el tiempo'], 'en': ['time travel', 'time machine', 'time loop']},
+    {'es': ['robots', 'inteligencia artificial', 'androides'], 'en': ['robot', 'artificial intelligence', 'android', 'cyborg']},
+    {'es': ['distopía', 'distópica', 'postapocalíptica', 'apocalipsis'], 'en': ['dystopia', 'post-apocalyptic', 'apocalypse']},
+    {'es': ['superhéroes', 'superhéroe', 'superpoderes'], 'en': ['superhero', 'superpower', 'comic book']},
+    {'es': ['venganza', 'vengarse'], 'en': ['revenge', 'vengeance', 'retribution']},
+    {'es': ['atraco', 'robo', 'golpe'], 'en': ['heist', 'robbery', 'bank robbery', 'thief']},
+    {'es': ['mafia', 'gánsteres', 'crimen organizado'], 'en': ['mafia', 'gangster', 'organized crime', 'mobster']},
+    {'es': ['asesino en serie', 'asesinatos', 'psicópata'], 'en': ['serial killer', 'murder', 'psychopath']},
+    {'es': ['espías', 'espionaje', 'agente secreto'], 'en': ['spy', 'espionage', 'secret agent', 'cia']},
+    {'es': ['piratas', 'barco pirata', 'tesoro'], 'en': ['pirate', 'treasure', 'pirate ship']},
+    {'es': ['dinosaurios'], 'en': ['dinosaur', 'prehistoric', 'jurassic']},
+    {'es': ['espacio', 'astronautas', 'galaxia', 'planetas'], 'en': ['space', 'astronaut', 'galaxy', 'outer space']},
+    {'es': ['juguetes'], 'en': ['toy', 'toys come to life']},
+    {'es': ['amistad', 'amigos'], 'en': ['friendship', 'friends', 'buddy']},
+    {'es': ['familia', 'padre e hijo', 'madre e hija'], 'en': ['family relationships', 'father son relationship', 'mother daughter relationship']},
+    {'es': ['adolescentes', 'instituto', 'juventud'], 'en': ['teenager', 'high school', 'coming of age']},
+    {'es': ['deporte', 'deportes', 'fútbol', 'boxeo'], 'en': ['sport', 'sports', 'football', 'boxing']},
+    {'es': ['pérdida', 'duelo', 'muerte', 'triste'], 'en': ['loss', 'grief', 'death', 'sadness']},
+    {'es': ['supervivencia', 'sobrevivir', 'naufragio'], 'en': ['survival', 'survive', 'shipwreck', 'stranded']},
+    {'es': ['cárcel', 'prisión', 'fuga'], 'en': ['prison', 'jail', 'escape', 'prison escape']},
+    {'es': ['juicio', 'abogados', 'tribunal'], 'en': ['trial', 'lawyer', 'courtroom']},
+    {'es': ['navidad', 'navideña'], 'en': ['christmas', 'holiday']},
+    {'es': ['viaje', 'carretera', 'road movie'], 'en': ['road trip', 'road movie', 'journey']},
+    {'es': ['brujas', 'brujería'], 'en': ['witch', 'witchcraft']},
+    {'es': ['mar', 'océano', 'tiburones'], 'en': ['ocean', 'shark', 'sailing']},
+    {'es': ['selva', 'jungla'], 'en': ['jungle', 'rainforest']},
+    {'es': ['hotel aislado', 'aislamiento', 'aislado'], 'en': ['isolation', 'isolated', 'cabin fever']},
+    {'es': ['juego de mesa', 'videojuego', 'juego'], 'en': ['board game', 'video game', 'game']},
+    {'es': ['nazis', 'holocausto', 'segunda guerra mundial'], 'en': ['nazi', 'holocaust', 'world war ii']},
+    {'es': ['religión', 'fe', 'iglesia'], 'en': ['religion', 'faith', 'church']},
+    {'es': ['drogas', 'narcotráfico'], 'en': ['drugs', 'drug dealer', 'drug cartel']},
+    {'es': ['corrupción', 'política', 'conspiración'], 'en': ['corruption', 'politics', 'conspiracy']},
+]
+
+
+def catalog_vocabulary(genres_texts, keywords_texts):
+    """
+    Número de películas que usan cada género o keyword (normalizados).
+
+    Args:
+        genres_texts, keywords_texts: Textos "a, b, c" de cada película
+    """
+    vocabulary = Counter()
+    for texts in (genres_texts, keywords_texts):
+        for text in texts:
+            if not isinstance(text, str):
+                continue
+            vocabulary.update({normalize_text(term).strip() for term in text.split(',') if term.strip()})
+    return vocabulary
+
+
+class ThesaurusExpander:
+    """
+    Expansión de queries con el tesauro, ajustada al vocabulario del catálogo.
+
+    Args:
+        groups: Conceptos {'es': [...], 'en': [...]}
+        vocabulary: Counter {género o keyword normalizado: nº de películas}
+            (sin él, los términos se usan en el orden del tesauro)
+    """
+
+    def __init__(self, groups=BILINGUAL_THESAURUS, vocabulary=None):
+        vocabulary = vocabulary or {}
+        keywords_by_token = defaultdict(list)
+        for keyword, count in vocabulary.items():
+            if count >= MIN_KEYWORD_MOVIES and ' ' in keyword:
+                for token in set(keyword.split()):
+                    keywords_by_token[token].append(keyword)
+
+        self.groups = []
+        term_to_group = {}
+        for g, group in enumerate(groups):
+            en = sorted(group['en'], key=lambda t: -vocabulary.get(normalize_text(t), 0))
+            known = {normalize_text(t) for t in group['es'] + group['en']}
+            main = normalize_text(group['en'][0])
+            related = sorted((k for k in keywords_by_token.get(main, ()) if k not in known),
+                             key=lambda k: (-vocabulary[k], k))[:MAX_RELATED]
+            self.groups.append({'es': list(group['es']), 'en': en, 'related': related})
+            for term in group['es'] + group['en']:
+                term_to_group.setdefault(normalize_text(term), g)
+
+        self.term_to_group = term_to_group
+        self._pattern = re.compile(
+            r'\b(' + '|'.join(sorted(map(re.escape, term_to_group), key=len, reverse=True)) + r')\b'
+        )
+
+    def expand(self, query, max_variants=3):
+        """
+        Variantes de la consulta: [original, original + sinónimos en
+        español, términos en inglés + resto de la consulta]. Solo la
+        original si no se reconoce ningún concepto.
+        """
+        text = normalize_text(query)
+        matched = []
+        for match in self._pattern.finditer(text):
+            g = self.term_to_group[match.group(1)]
+            if g not in matched:
+                matched.append(g)
+        if not matched:
+            return [query]
+
+        def new_terms(terms):
+            return [t for t in terms if not re.search(r'\b' + re.escape(normalize_text(t)) + r'\b', text)][:MAX_TERMS]
+
+        es = [t for g in matched for t in new_terms(self.groups[g]['es'])]
+        en = [t for g in matched for t in self.groups[g]['en'][:MAX_TERMS] + self.groups[g]['related']]
+        rest = tokenize(self._pattern.sub(' ', text))
+
+        variants = [query.strip(), ' '.join([query.strip()] + es), ' '.join(dict.fromkeys(en + rest))]
+        unique = []
+        for variant in variants:
+            if variant and variant.lower() not in [v.lower() for v in unique]:
+                unique.append(variant)
+        return unique[:max_variants]
+
+    def save(self, path=THESAURUS_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path=THESAURUS_FILE):
+        """Carga el tesauro desde disco, o None si no se ha generado"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def build_thesaurus(df, path=THESAURUS_FILE):
+    """
+    Construye el tesauro con el vocabulario de las filas de movies_clean.csv.
+
+    Args:
+        df: DataFrame con genres_text y (opcionalmente) keywords_text
+    """
+    empty = [''] * len(df)
+    vocabulary = catalog_vocabulary(df.get('genres_text', empty), df.get('keywords_text', empty))
+    expander = ThesaurusExpander(vocabulary=vocabulary)
+    expander.save(path)
+    return expander
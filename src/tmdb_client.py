@@ -0,0 +1,251 @@
+"""
+Cliente HTTP para la API de TMDB con sesión compartida, limitador de
+velocidad (token bucket), reintentos con backoff exponencial, descargas
+concurrentes mediante un pool de hilos y caché de respuestas en disco.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TMDB_BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(PROJECT_ROOT, 'data', '.cache', 'tmdb')
+DEFAULT_CACHE_TTL = float(os.getenv("TMDB_CACHE_TTL", str(24 * 3600)))
+
+# TMDB permite ~50 peticiones/segundo y ~20 conexiones simultáneas por IP
+DEFAULT_RATE_LIMIT = float(os.getenv("TMDB_RATE_LIMIT", "40"))
+DEFAULT_CONCURRENCY = int(os.getenv("TMDB_CONCURRENCY", "8"))
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+REQUEST_TIMEOUT = 10
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Limitador de velocidad thread-safe.
+
+    Se reponen `rate` tokens por segundo hasta un máximo de `capacity`;
+    cada petición consume uno y espera si no hay tokens disponibles.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class TMDBError(Exception):
+    """Error definitivo de la API de TMDB (tras agotar reintentos)"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class ResponseCache:
+    """
+    Caché en disco de respuestas de TMDB, un archivo JSON por petición.
+
+    La clave es el endpoint más los parámetros (sin la API key). Cada
+    entrada guarda el cuerpo, la hora de descarga y las cabeceras ETag y
+    Last-Modified para revalidar con peticiones condicionales.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=DEFAULT_CACHE_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(path, params):
+        params = {k: v for k, v in params.items() if k != 'api_key'}
+        raw = json.dumps([path, sorted((k, str(v)) for k, v in params.items())])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, path, body, etag=None, last_modified=None):
+        entry = {
+            'path': path,
+            'fetched_at': time.time(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'body': body
+        }
+        tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(key))
+        return entry
+
+    def is_fresh(self, entry, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        return time.time() - entry.get('fetched_at', 0) < ttl
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+
+class TMDBClient:
+    """
+    Cliente de TMDB compartido por todos los hilos de descarga.
+
+    Args:
+        api_key: API key de TMDB
+        base_url: URL base de la API (configurable para servidores de prueba)
+        concurrency: Número de descargas simultáneas
+        rate_limit: Peticiones por segundo permitidas
+        max_retries: Reintentos ante 429/5xx o errores de conexión
+        backoff: Espera base (segundos) del backoff exponencial
+        cache: ResponseCache a consultar antes de ir a la red (opcional)
+        offline: Responder solo desde la caché, sin peticiones de red
+    """
+
+    def __init__(self, api_key, base_url=TMDB_BASE_URL, concurrency=DEFAULT_CONCURRENCY,
+                 rate_limit=DEFAULT_RATE_LIMIT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff=DEFAULT_BACKOFF, cache=None, offline=False):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = max(1, int(concurrency))
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.limiter = TokenBucket(rate_limit)
+        self.cache = cache
+        self.offline = offline
+        self.request_count = 0
+        self.cache_hits = 0
+        self.revalidated = 0
+        self._count_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, path, ttl=None, **params):
+        """
+        Hace un GET a `path` (ej: '/movie/862') y devuelve el JSON.
+
+        Si hay caché, una entrada dentro del TTL se devuelve sin red; una
+        caducada se revalida con If-None-Match / If-Modified-Since y un 304
+        reutiliza el cuerpo guardado. Reintenta con backoff exponencial ante
+        429, 5xx y errores de red, respetando la cabecera Retry-After.
+
+        Args:
+            path: Endpoint relativo a la URL base
+            ttl: TTL en segundos para esta petición (por defecto el de la caché)
+            **params: Parámetros de la query
+
+        Raises:
+            TMDBError: Si la petición falla de forma definitiva
+        """
+        cache_key = entry = None
+        if self.cache is not None:
+            cache_key = ResponseCache.key(path, params)
+            entry = self.cache.get(cache_key)
+            if entry and (self.offline or self.cache.is_fresh(entry, ttl)):
+                with self._count_lock:
+                    self.cache_hits += 1
+                return entry['body']
+
+        if self.offline:
+            raise TMDBError(f"{path}: no está en la caché (modo offline)")
+
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        params = {"api_key": self.api_key, **params}
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            with self._count_lock:
+                self.request_count += 1
+
+            try:
+                response = self.session.get(url, params=params, headers=headers,
+                                            timeout=REQUEST_TIMEOUT)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise TMDBError(f"{path}: {e}") from e
+                time.sleep(self._backoff_delay(attempt))
+                continue
+
+            if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                time.sleep(self._backoff_delay(attempt, response.headers.get('Retry-After')))
+                continue
+
+            if response.status_code == 304 and entry:
+                with self._count_lock:
+                    self.revalidated += 1
+                self.cache.put(cache_key, path, entry['body'], entry.get('etag'),
+                               entry.get('last_modified'))
+                return entry['body']
+
+            if response.status_code >= 400:
+                raise TMDBError(f"{path}: HTTP {response.status_code}", status=response.status_code)
+
+            body = response.json()
+            if self.cache is not None:
+                self.cache.put(cache_key, path, body, response.headers.get('ETag'),
+                               response.headers.get('Last-Modified'))
+            return body
+
+    def map(self, func, items):
+        """
+        Aplica `func` a cada elemento usando el pool de hilos.
+
+        Returns:
+            Lista de resultados en el mismo orden que `items`
+        """
+        items = list(items)
+        if self.concurrency == 1 or len(items) <= 1:
+            return [func(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(executor.map(func, items))
+
+    def close(self):
+        self.session.close()
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_BACKOFF)
+            except ValueError:
+                pass
+        return min(self.backoff * (2 ** attempt), MAX_BACKOFF)
@@ -0,0 +1,98 @@
+"""
+Presupuesto de tokens de las recomendaciones del LLM.
+
+El tiempo hasta el primer token crece con el prompt, y el total con los
+tokens generados. Para que ambos sean previsibles:
+
+    - El contexto de cada película es su sinopsis corta (SYNOPSIS_CHARS
+      caracteres, precalculada en la ingesta como metadato `synopsis`) y
+      el conjunto se recorta a LLM_ENRICH_CONTEXT_TOKENS
+    - max_tokens se ajusta a la longitud pedida (LLM_ENRICH_WORDS
+      palabras), más LLM_REASONING_TOKENS para los modelos que razonan
+      antes de responder (DeepSeek-R1)
+
+Los tokens se estiman sin tokenizador (caracteres / CHARS_PER_TOKEN); los
+reales de cada llamada los devuelve el LLM en `usage`.
+"""
+import os
+import re
+
+# Longitud de la sinopsis corta que se guarda por película
+SYNOPSIS_CHARS = int(os.getenv("SYNOPSIS_CHARS", "200"))
+# Tokens del contexto de películas del prompt de recomendación
+LLM_ENRICH_CONTEXT_TOKENS = int(os.getenv("LLM_ENRICH_CONTEXT_TOKENS", "300"))
+# Longitud pedida de la recomendación (palabras)
+LLM_ENRICH_WORDS = int(os.getenv("LLM_ENRICH_WORDS", "150"))
+# Tokens extra para el bloque <think> de los modelos de razonamiento
+LLM_REASONING_TOKENS = int(os.getenv("LLM_REASONING_TOKENS", "1024"))
+# Películas del contexto
+ENRICH_MOVIES = 3
+# Aproximaciones para español: ~3.5 caracteres y ~1.6 tokens por palabra
+CHARS_PER_TOKEN = 3.5
+TOKENS_PER_WORD = 1.6
+# Margen para no cortar la última frase
+OUTPUT_MARGIN = 1.25
+# Modelos que generan un bloque de razonamiento antes de la respuesta
+REASONING_MODELS = ('deepseek-r1', 'qwq', 'reasoning')
+
+
+def estimate_tokens(text):
+    """Tokens aproximados de un texto"""
+    return int(len(text or '') / CHARS_PER_TOKEN + 0.5)
+
+
+def short_synopsis(overview, max_chars=SYNOPSIS_CHARS):
+    """
+    Sinopsis de como mucho `max_chars` caracteres: las frases completas
+    que quepan o, si la primera ya no cabe, cortada en una palabra con '…'.
+    """
+    text = ' '.join(str(overview or '').split())
+    if len(text) <= max_chars:
+        return text
+
+    synopsis = ''
+    for sentence in re.split(r'(?<=[.!?])\s+', text):
+        candidate = f"{synopsis} {sentence}".strip()
+        if len(candidate) > max_chars:
+            break
+        synopsis = candidate
+    if synopsis:
+        return synopsis
+    return text[:max_chars - 1].rsplit(' ', 1)[0].rstrip(',;:') + '…'
+
+
+def build_movies_context(movies, max_tokens=LLM_ENRICH_CONTEXT_TOKENS, n_movies=ENRICH_MOVIES):
+    """
+    Contexto de las `n_movies` primeras películas dentro de `max_tokens`.
+
+    Usa la sinopsis precalculada (o la calcula a partir del overview); si
+    aun así no cabe, acorta las sinopsis por igual.
+
+    Args:
+        movies: Dicts con title, overview, synopsis (opcional) y genres
+
+    Returns:
+        Texto del contexto (una línea por película)
+    """
+    movies = movies[:n_movies]
+    synopses = [movie.get('synopsis') or short_synopsis(movie.get('overview', '')) for movie in movies]
+    headers = [f"{i + 1}. {movie['title']} ({movie.get('genres') or 'N/A'}): " for i, movie in enumerate(movies)]
+
+    available_chars = max_tokens * CHARS_PER_TOKEN - sum(len(h) + 1 for h in headers)
+    if movies and sum(map(len, synopses)) > available_chars:
+        per_movie = max(int(available_chars / len(movies)), 40)
+        synopses = [short_synopsis(s, per_movie) for s in synopses]
+
+    return "\n".join(h + s for h, s in zip(headers, synopses))
+
+
+def is_reasoning_model(model):
+    return any(name in model.lower() for name in REASONING_MODELS)
+
+
+def output_token_limit(model, words=LLM_ENRICH_WORDS):
+    """max_tokens de una respuesta de `words` palabras con `model`"""
+    limit = int(words * TOKENS_PER_WORD * OUTPUT_MARGIN)
+    if is_reasoning_model(model):
+        limit += LLM_REASONING_TOKENS
+    return limit
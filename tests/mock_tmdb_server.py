@@ -0,0 +1,169 @@
+"""
+Servidor local que imita la API de TMDB para probar el fetcher sin red.
+"""
+import hashlib
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MOVIES = {
+    862: {'title': 'Toy Story', 'genres': ['Animation', 'Comedy', 'Family'], 'imdb_id': 'tt0114709',
+          'keywords': ['toy', 'friendship'], 'cast': ['Tom Hanks', 'Tim Allen'], 'director': 'John Lasseter',
+          'release_date': '1995-10-30'},
+    8844: {'title': 'Jumanji', 'genres': ['Adventure', 'Fantasy', 'Family'], 'imdb_id': 'tt0113497',
+           'keywords': ['board game', 'jungle'], 'cast': ['Robin Williams', 'Kirsten Dunst'], 'director': 'Joe Johnston',
+           'release_date': '1995-12-15'},
+    694: {'title': 'The Shining', 'genres': ['Horror', 'Thriller'], 'imdb_id': 'tt0081505',
+          'keywords': ['hotel', 'isolation'], 'cast': ['Jack Nicholson', 'Shelley Duvall'], 'director': 'Stanley Kubrick',
+          'release_date': '1980-05-23'},
+}
+PAGE_SIZE = 2
+
+
+def _summary(movie_id):
+    movie = MOVIES[movie_id]
+    return {
+        'id': movie_id,
+        'original_title': movie['title'],
+        'overview': f"Overview of {movie['title']}",
+        'poster_path': f"/{movie_id}.jpg",
+        'vote_average': 7.5,
+        'vote_count': 1000,
+        'release_date': movie['release_date'],
+    }
+
+
+def _keywords(movie_id):
+    return {'id': movie_id, 'keywords': [{'id': i, 'name': k} for i, k in enumerate(MOVIES[movie_id]['keywords'])]}
+
+
+def _credits(movie_id):
+    movie = MOVIES[movie_id]
+    return {
+        'id': movie_id,
+        'cast': [{'name': name} for name in movie['cast']],
+        'crew': [{'name': movie['director'], 'job': 'Director'}, {'name': 'Someone', 'job': 'Editor'}],
+    }
+
+
+def _details(movie_id):
+    movie = MOVIES[movie_id]
+    data = _summary(movie_id)
+    data.update({
+        'genres': [{'id': i, 'name': g} for i, g in enumerate(movie['genres'])],
+        'imdb_id': movie['imdb_id'],
+        'tagline': f"{movie['title']} tagline",
+    })
+    return data
+
+
+class MockTMDBServer:
+    """
+    Servidor HTTP en un hilo con las rutas de TMDB que usa el fetcher.
+
+    Registra cada petición en `requests` y puede forzar respuestas 429 en
+    las primeras `fail_first` peticiones para probar los reintentos, o un
+    error 500 en las rutas de `broken`.
+    """
+
+    def __init__(self, fail_first=0):
+        self.requests = []
+        self.fail_first = fail_first
+        self.not_modified = 0
+        self.changes = []
+        self.broken = set()
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                status, payload, headers = server.handle(self.path, self.headers)
+                if status == 200:
+                    etag = '"%s"' % hashlib.md5(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+                    headers = {**headers, 'ETag': etag}
+                    if self.headers.get('If-None-Match') == etag:
+                        status, payload = 304, None
+                        with server.lock:
+                            server.not_modified += 1
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/3"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def count(self, pattern):
+        return sum(1 for path in self.requests if re.search(pattern, path))
+
+    def handle(self, raw_path, headers):
+        parsed = urlparse(raw_path)
+        path = parsed.path
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+
+        with self.lock:
+            self.requests.append(path)
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return 429, {'status_message': 'Too many requests'}, {'Retry-After': '0'}
+
+        if path in self.broken:
+            return 500, {'status_message': 'Internal error'}, {}
+
+        if params.get('api_key') != 'test-key':
+            return 401, {'status_message': 'Invalid API key'}, {}
+
+        if path == '/3/configuration':
+            return 200, {'images': {}}, {}
+
+        if path == '/3/movie/changes':
+            page = int(params.get('page', 1))
+            chunk = self.changes[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+            total_pages = max(1, -(-len(self.changes) // PAGE_SIZE))
+            return 200, {'page': page, 'total_pages': total_pages,
+                         'results': [{'id': i, 'adult': False} for i in chunk]}, {}
+
+        if path == '/3/movie/popular':
+            ids = sorted(MOVIES)
+            page = int(params.get('page', 1))
+            chunk = ids[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+            return 200, {'page': page, 'results': [_summary(i) for i in chunk]}, {}
+
+        match = re.fullmatch(r'/3/movie/(\d+)(/keywords|/credits)?', path)
+        if match and int(match.group(1)) in MOVIES:
+            movie_id = int(match.group(1))
+            if match.group(2) == '/keywords':
+                return 200, _keywords(movie_id), {}
+            if match.group(2) == '/credits':
+                return 200, _credits(movie_id), {}
+
+            data = _details(movie_id)
+            for extra in filter(None, params.get('append_to_response', '').split(',')):
+                if extra == 'keywords':
+                    data['keywords'] = _keywords(movie_id)
+                elif extra == 'credits':
+                    data['credits'] = _credits(movie_id)
+            return 200, data, {}
+
+        return 404, {'status_message': 'Not found'}, {}
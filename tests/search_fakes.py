@@ -0,0 +1,84 @@
+"""
+Colección y encoder en memoria con la misma interfaz que ChromaDB y
+BatchEncoder, para probar el pipeline sin el modelo ni la base de datos.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from lexical_index import BM25Index
+from neighbor_graph import build_neighbor_graph
+from search import SearchEngine
+
+MOVIES = {
+    '862': ('Toy Story', 'Juguetes que cobran vida cuando nadie los ve', [1, 0, 0]),
+    '863': ('Toy Story 2', 'Woody es secuestrado por un coleccionista de juguetes', [0.9, 0.1, 0]),
+    '8844': ('Jumanji', 'Un juego de mesa con una selva peligrosa', [0, 1, 0]),
+    '694': ('The Shining', 'Un escritor enloquece en un hotel aislado', [0, 0, 1]),
+}
+
+
+class FakeEncoder:
+    """Embedding = suma de los vectores de las películas cuyo título aparece en el texto"""
+
+    def __init__(self):
+        self.stats = {'requests': 0}
+
+    def encode(self, texts):
+        self.stats['requests'] += 1
+        vectors = []
+        for text in texts:
+            v = np.zeros(3)
+            for title, _, emb in MOVIES.values():
+                if title.lower().split()[0] in text.lower():
+                    v += emb
+            vectors.append(v)
+        return np.array(vectors)
+
+
+class FakeCollection:
+    def __init__(self):
+        self.ids = list(MOVIES)
+        self.embeddings = np.array([m[2] for m in MOVIES.values()], dtype=float)
+        self.metadatas = [
+            {'title': t, 'overview': o, 'rating': 4.0, 'vote_average': 8.0}
+            for t, o, _ in MOVIES.values()
+        ]
+        self.documents = [f"{t}. {o}" for t, o, _ in MOVIES.values()]
+        self.queries = 0
+
+    def count(self):
+        return len(self.ids)
+
+    def query(self, query_embeddings, n_results, where=None):
+        self.queries += 1
+        result = {'ids': [], 'metadatas': [], 'distances': []}
+        for q in query_embeddings:
+            dists = np.sum((self.embeddings - np.asarray(q)) ** 2, axis=1)
+            order = np.argsort(dists)[:n_results]
+            result['ids'].append([self.ids[i] for i in order])
+            result['metadatas'].append([self.metadatas[i] for i in order])
+            result['distances'].append([float(dists[i]) for i in order])
+        return result
+
+    def get(self, ids=None, include=()):
+        positions = [self.ids.index(i) for i in (ids or self.ids) if i in self.ids]
+        return {
+            'ids': [self.ids[i] for i in positions],
+            'metadatas': [self.metadatas[i] for i in positions],
+            'embeddings': [self.embeddings[i] for i in positions],
+            'documents': [self.documents[i] for i in positions],
+        }
+
+
+def make_engine():
+    collection = FakeCollection()
+    data = collection.get()
+    return SearchEngine(
+        FakeEncoder(), collection,
+        lexical_index=BM25Index(data['ids'], [m['title'] for m in data['metadatas']], data['documents']),
+        neighbor_graph=build_neighbor_graph(collection.ids, collection.embeddings, k=2)
+    )
@@ -0,0 +1,95 @@
+"""
+Test del encoder con micro-batching
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pytest
+
+import batch_encoder
+from batch_encoder import BatchEncoder
+
+
+class FakeModel:
+    """Embedding = [longitud del texto, posición en el lote]; registra los lotes"""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def encode(self, texts, show_progress_bar=False):
+        with self.lock:
+            self.batches.append(list(texts))
+        time.sleep(self.delay)
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype=np.float32)
+
+
+def test_concurrent_requests_share_batches():
+    model = FakeModel()
+    encoder = BatchEncoder(model, max_batch_size=64, window_ms=20)
+    texts = [f"query {'x' * i}" for i in range(24)]
+
+    with ThreadPoolExecutor(max_workers=24) as executor:
+        results = list(executor.map(encoder.encode, texts))
+    encoder.close()
+
+    # Cada petición recibe su propio vector
+    assert [int(r[0]) for r in results] == [len(t) for t in texts]
+    assert len(model.batches) < len(texts)
+    assert encoder.stats['requests'] == 24
+    assert encoder.avg_batch_size() > 1
+
+
+def test_batch_size_limit_and_multi_text_requests():
+    model = FakeModel(delay=0)
+    encoder = BatchEncoder(model, max_batch_size=4, window_ms=50)
+    futures = [encoder.submit(["a", "bb", "ccc"]) for _ in range(3)]
+    results = [f.result(timeout=5) for f in futures]
+    encoder.close()
+
+    assert all(r.shape == (3, 2) for r in results)
+    assert [list(r[:, 0]) for r in results] == [[1, 2, 3]] * 3
+    # Una petición nunca se parte entre lotes
+    assert all(len(batch) % 3 == 0 for batch in model.batches)
+
+
+def test_errors_reach_every_caller():
+    class BrokenModel:
+        def encode(self, texts, show_progress_bar=False):
+            raise ValueError("modelo roto")
+
+    encoder = BatchEncoder(BrokenModel())
+    with pytest.raises(ValueError):
+        encoder.encode("hola")
+    encoder.close()
+    with pytest.raises(RuntimeError):
+        encoder.submit(["cerrado"])
+
+
+def test_requests_behind_stop_fail_instead_of_hanging():
+    release = threading.Event()
+
+    class BlockingModel(FakeModel):
+        def encode(self, texts, show_progress_bar=False):
+            release.wait(5)
+            return super().encode(texts)
+
+    encoder = BatchEncoder(BlockingModel(delay=0), window_ms=0)
+    first = encoder.submit(["primera"])
+    time.sleep(0.05)
+    # Una petición que quedó detrás del _STOP (la carrera con close())
+    encoder._queue.put(batch_encoder._STOP)
+    late = encoder.submit(["tardía"])
+    release.set()
+
+    assert first.result(5).shape == (1, 2)
+    with pytest.raises(RuntimeError):
+        late.result(5)
+    encoder.close()
@@ -0,0 +1,84 @@
+"""
+Test de la caché de construcción (huellas de las entradas y resultados intermedios)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from build_cache import BuildCache
+
+
+def write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return str(path)
+
+
+def test_unchanged_inputs_reuse_the_intermediate(tmp_path):
+    movies = write(tmp_path / 'movies.csv', "id,title\n862,Toy Story\n")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'rows': 1}
+
+    cache = BuildCache('clean', cache_dir=str(tmp_path / 'cache'))
+    assert cache.cached('movies', [movies], compute) == ({'rows': 1}, False)
+    cache.save()
+
+    # Nueva ejecución: mismo contenido (aunque cambie el mtime) -> se reutiliza
+    os.utime(movies, (1, 1))
+    cache = BuildCache('clean', cache_dir=str(tmp_path / 'cache'))
+    assert cache.cached('movies', [movies], compute) == ({'rows': 1}, True)
+    assert len(calls) == 1
+
+
+def test_changed_input_or_parameter_invalidates(tmp_path):
+    movies = write(tmp_path / 'movies.csv', "id,title\n862,Toy Story\n")
+    ratings_small = write(tmp_path / 'ratings_small.csv', "movieId,rating\n1,4.0\n")
+    ratings = write(tmp_path / 'ratings.csv', "movieId,rating\n1,4.0\n1,3.0\n")
+    cache_dir = str(tmp_path / 'cache')
+
+    cache = BuildCache('clean', cache_dir=cache_dir)
+    cache.cached('movies', [movies], lambda: 'v1')
+    cache.cached('ratings', [ratings_small], lambda: 'small')
+    cache.save()
+
+    # El contenido de la entrada cambia
+    write(movies, "id,title\n862,Toy Story\n8844,Jumanji\n")
+    # La entrada de la que depende cambia (el archivo de ratings grande aparece)
+    cache = BuildCache('clean', cache_dir=cache_dir)
+    assert cache.cached('movies', [movies], lambda: 'v2') == ('v2', False)
+    assert cache.cached('ratings', [ratings], lambda: 'full') == ('full', False)
+    assert not cache.is_fresh('ratings', [ratings_small])
+
+
+def test_edited_artifact_is_not_fresh(tmp_path):
+    movies = write(tmp_path / 'movies.csv', "id\n862\n")
+    output = write(tmp_path / 'movies_clean.csv', "id\n862\n")
+
+    cache = BuildCache('clean', cache_dir=str(tmp_path / 'cache'))
+    cache.record('movies_clean', [movies], artifact=output)
+    assert cache.is_fresh('movies_clean', [movies], artifact=output)
+
+    write(output, "id\n862\n694\n")
+    assert not cache.is_fresh('movies_clean', [movies], artifact=output)
+
+
+def test_changed_script_invalidates_up_to_date_output(tmp_path):
+    # 01_clean_data.py es una entrada más: nuevas columnas -> se regenera la salida
+    script = write(tmp_path / '01_clean_data.py', "COLUMNS = ['id']\n")
+    movies = write(tmp_path / 'movies.csv', "id\n862\n")
+    output = write(tmp_path / 'movies_clean.csv', "id\n862\n")
+    cache_dir = str(tmp_path / 'cache')
+
+    cache = BuildCache('clean', cache_dir=cache_dir)
+    cache.record('movies_clean', [script, movies], artifact=output)
+    cache.save()
+
+    write(script, "COLUMNS = ['id', 'release_year']\n")
+    cache = BuildCache('clean', cache_dir=cache_dir)
+    assert not cache.is_fresh('movies_clean', [script, movies], artifact=output)
+    # Una entrada registrada sin el script tampoco se da por buena
+    assert not cache.is_fresh('movies_clean', [movies], artifact=output)
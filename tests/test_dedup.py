@@ -0,0 +1,86 @@
+"""
+Test de la detección de películas casi duplicadas
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from dedup import canonical_map, find_duplicates, is_duplicate, save_duplicates
+
+
+def unit(v):
+    v = np.asarray(v, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def catalog():
+    rng = np.random.default_rng(3)
+    base = [unit(rng.normal(size=32)) for _ in range(5)]
+
+    def near(v, distance):
+        # Vector a `distance` (en norma) de `v`: similitud ~ 1 / sqrt(1 + distance²)
+        noise = unit(rng.normal(size=32))
+        return unit(v + distance * noise)
+
+    embeddings = np.vstack(base + [
+        near(base[0], 0.1),   # Fila repetida de "Psycho" (1960)
+        near(base[0], 0.4),   # Remake de 1998
+        near(base[1], 0.15),  # Sinopsis casi idéntica con otro título
+        near(base[2], 0.6),   # Parecida, pero otra película
+    ])
+    ids = ['539', '862', '8844', '694', '603', '90001', '11252', '90002', '90003']
+    titles = ['Psycho', 'Toy Story', 'Jumanji', 'The Shining', 'The Matrix',
+              'Psycho', 'Psycho', 'Toy Story (Re-release)', 'Zathura']
+    years = [1960, 1995, 1995, 1980, 1999, 1960, 1998, 2010, 2005]
+    popularity = [900, 1000, 500, 800, 1200, 3, 150, 10, 300]
+    return ids, embeddings, titles, years, popularity
+
+
+def test_find_duplicates(tmp_path):
+    ids, embeddings, titles, years, popularity = catalog()
+    duplicates = find_duplicates(ids, embeddings, titles, years, popularity, block_size=4)
+
+    mapping = dict(zip(duplicates['id'], duplicates['canonical_id']))
+    assert mapping == {'90001': '539', '11252': '539', '90002': '862'}
+
+    path = str(tmp_path / 'duplicates.csv')
+    save_duplicates(duplicates, path)
+    assert canonical_map(path) == mapping
+
+
+def test_no_duplicates():
+    ids, embeddings, titles, years, popularity = catalog()
+    duplicates = find_duplicates(ids[:5], embeddings[:5], titles[:5], years[:5], popularity[:5])
+    assert duplicates.empty
+    assert canonical_map('/no/existe.csv') == {}
+
+
+def test_sequels_are_never_duplicates():
+    pairs = [("Toy Story", "Toy Story 2"), ("Toy Story 2", "Toy Story 3"), ("Scream 2", "Scream 3"),
+             ("Rocky II", "Rocky III"), ("Alien", "Aliens"), ("Jaws", "Jaws 2"),
+             ("The Godfather", "The Godfather: Part II")]
+    for title_a, title_b in pairs:
+        # Ni con el texto casi idéntico ni con el mismo año
+        assert not is_duplicate(0.99, title_a, title_b), (title_a, title_b)
+        assert not is_duplicate(0.95, title_a, title_b, 1995, 1995), (title_a, title_b)
+
+    # Remake con el mismo título y fila repetida con distinta puntuación
+    assert is_duplicate(0.9, "Psycho", "Psycho", 1960, 1998)
+    assert is_duplicate(0.85, "Se7en", "Se7en.", 1995, 1995)
+    # Títulos parecidos pero distintos solo se unen con el texto casi idéntico
+    assert not is_duplicate(0.95, "The Ring", "The Rings", 2002, 2002)
+    assert not is_duplicate(0.92, "Dracula", "Dracula 2000")
+
+
+def test_sequel_embeddings_survive_find_duplicates():
+    rng = np.random.default_rng(7)
+    # Cada saga con sinopsis casi idénticas entre sí (similitud > 0.99)
+    bases = [unit(rng.normal(size=32)), unit(rng.normal(size=32))]
+    embeddings = np.vstack([unit(bases[i // 2] + 0.05 * unit(rng.normal(size=32))) for i in range(4)])
+    duplicates = find_duplicates(['862', '863', '348', '679'], embeddings,
+                                 ['Toy Story', 'Toy Story 2', 'Alien', 'Aliens'],
+                                 [1995, 1999, 1979, 1986], [1000, 800, 900, 700])
+    assert duplicates.empty
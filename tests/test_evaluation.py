@@ -0,0 +1,86 @@
+"""
+Test del arnés de evaluación offline
+"""
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from evaluation import (Corpus, cached_document_embeddings, default_config, evaluate,
+                        ranking_metrics, resolve_labels)
+
+
+class KeywordModel:
+    """Un eje por palabra clave; cuenta los textos codificados"""
+
+    KEYWORDS = ['juguetes', 'selva', 'hotel']
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts, **kwargs):
+        self.encoded += len(texts)
+        return np.array([[float(k in t.lower()) for k in self.KEYWORDS] for t in texts])
+
+
+def make_corpus():
+    return Corpus.from_frame(pd.DataFrame({
+        'id': [862, 8844, 694, 1000],
+        'title': ['Toy Story', 'Jumanji', 'The Shining', 'Toy Story'],
+        'text_to_embed': ['Juguetes que cobran vida', 'Un juego en la selva',
+                          'Un hotel aislado', 'Remake con juguetes'],
+        'ml_rating': [4.0, 3.5, 4.2, float('nan')],
+        'vote_average': [7.7, 6.9, 8.1, 5.0],
+        'release_year': [1995, 1995, 1980, 2030],
+    }))
+
+
+def test_ranking_metrics():
+    # Dos películas relevantes; la segunda tiene dos filas (duplicado)
+    metrics = ranking_metrics([5, 2, 7, 3], [{2}, {3, 7}], ks=(1, 3))
+    assert metrics['mrr'] == 0.5
+    assert metrics['recall@1'] == 0 and metrics['recall@3'] == 1
+    ideal = 1 + 1 / math.log2(3)
+    assert metrics['ndcg@3'] == pytest.approx((1 / math.log2(3) + 1 / math.log2(4)) / ideal)
+
+
+def test_labels_embedding_cache_and_evaluate(tmp_path):
+    corpus = make_corpus()
+    queries, missing = resolve_labels(
+        [{'query': 'juguetes', 'relevant': ['Toy Story (1995)', 'Cars']},
+         {'query': 'hotel de miedo', 'relevant': ['the shining']},
+         {'query': 'nada', 'relevant': ['Cars']}],
+        corpus.titles, corpus.years)
+    assert [q['groups'] for q in queries] == [[{0}], [{2}]] and missing == ['Cars', 'Cars']
+
+    model = KeywordModel()
+    embeddings, encoded = cached_document_embeddings(model, 'fake/model', corpus.texts, cache_dir=tmp_path)
+    assert encoded == 4
+    texts = corpus.texts[:3] + ['Otra sinopsis con juguetes']
+    again, encoded = cached_document_embeddings(model, 'fake/model', texts, cache_dir=tmp_path)
+    assert encoded == 1 and model.encoded == 5
+    np.testing.assert_array_equal(again[:3], embeddings[:3])
+
+    result = evaluate(default_config('fake', 'fake/model'), corpus, queries, model, embeddings, ks=(1,))
+    assert result['summary']['recall@1'] == 1.0 and result['summary']['mrr'] == 1.0
+    assert result['queries'][0]['top'][0] == 'Toy Story'
+
+
+def test_evaluate_with_query_expansion():
+    corpus = make_corpus()
+    queries, _ = resolve_labels([{'query': 'toys', 'relevant': ['Jumanji']}], corpus.titles, corpus.years)
+    queries[0]['relevant'], queries[0]['groups'] = ['Toy Story (1995)'], [{0}]
+    model = KeywordModel()
+    embeddings = model.encode(corpus.texts)
+    config = default_config('fake', 'fake/model', hybrid=False, expansion='fake')
+
+    plain = evaluate(config, corpus, queries, model, embeddings, ks=(1,))
+    expanded = evaluate(config, corpus, queries, model, embeddings, ks=(1,),
+                        expand=lambda query: [query, 'juguetes'])
+    assert plain['summary']['recall@1'] == 0 and expanded['summary']['recall@1'] == 1.0
+    assert expanded['queries'][0]['variants'] == ['toys', 'juguetes'] and 'expand_ms' in expanded['summary']
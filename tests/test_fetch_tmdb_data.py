@@ -0,0 +1,108 @@
+"""
+Test del fetcher de TMDB de extremo a extremo contra el servidor simulado
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from datetime import date
+
+import pandas as pd
+
+import fetch_tmdb_data
+from mock_tmdb_server import MockTMDBServer, MOVIES
+from tmdb_client import TMDBClient
+
+
+def test_one_request_per_movie_feeds_every_csv(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_tmdb_data, 'DATA_DIR', tmp_path)
+
+    with MockTMDBServer() as server:
+        client = TMDBClient('test-key', base_url=server.base_url, concurrency=4, rate_limit=1000)
+        movies = fetch_tmdb_data.fetch_popular_movies(client, num_pages=2)
+        # Películas repetidas entre páginas se descargan una sola vez
+        records = fetch_tmdb_data.fetch_movie_records(client, movies + movies[:1])
+
+        assert server.count(r'^/3/movie/\d+$') == len(MOVIES)
+        assert server.count(r'/keywords|/credits') == 0
+
+    fetch_tmdb_data.create_movies_metadata(records)
+    fetch_tmdb_data.create_keywords(records)
+    fetch_tmdb_data.create_credits(records)
+    fetch_tmdb_data.create_links(records)
+
+    metadata = pd.read_csv(tmp_path / 'movies_metadata.csv')
+    keywords = pd.read_csv(tmp_path / 'keywords.csv')
+    credits = pd.read_csv(tmp_path / 'credits.csv')
+    links = pd.read_csv(tmp_path / 'links.csv')
+
+    assert sorted(metadata['id']) == sorted(MOVIES)
+    toy_story = metadata.set_index('id').loc[862]
+    assert 'Animation' in toy_story['genres']
+    assert toy_story['tagline'] == 'Toy Story tagline'
+    assert 'friendship' in keywords.set_index('id').loc[862, 'keywords']
+    assert 'Tom Hanks' in credits.set_index('id').loc[862, 'cast']
+    assert 'Editor' not in credits.set_index('id').loc[862, 'crew']
+    assert links.set_index('tmdbId').loc[862, 'imdbId'] == 114709
+
+
+def test_sync_refetches_only_changed_catalog_movies(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_tmdb_data, 'DATA_DIR', tmp_path)
+    monkeypatch.setattr(fetch_tmdb_data, 'SYNC_STATE_FILE', tmp_path / 'tmdb_sync_state.json')
+    monkeypatch.setattr(fetch_tmdb_data, 'DELTA_DIR', tmp_path / 'delta')
+
+    # Catálogo local: 862 y 8844 existen en TMDB, 999 fue eliminada
+    pd.DataFrame([
+        {'id': 862, 'original_title': 'Toy Story (old)', 'overview': 'old'},
+        {'id': 8844, 'original_title': 'Jumanji', 'overview': 'old'},
+        {'id': 999, 'original_title': 'Gone', 'overview': 'old'},
+    ]).to_csv(tmp_path / 'movies_metadata.csv', index=False)
+    fetch_tmdb_data.save_sync_state(date(2026, 1, 1))
+
+    with MockTMDBServer() as server:
+        # 694 cambió en TMDB pero no está en el catálogo local
+        server.changes = [862, 999, 694]
+        client = TMDBClient('test-key', base_url=server.base_url, rate_limit=1000)
+        delta = fetch_tmdb_data.sync_catalog(client, today=date(2026, 1, 20))
+
+        # 20 días -> dos ventanas de cambios, con dos páginas cada una
+        assert server.count(r'/movie/changes') == 4
+        assert server.count(r'^/3/movie/\d+$') == 2
+
+    assert delta['updated_ids'] == [862]
+    assert delta['deleted_ids'] == [999]
+    assert fetch_tmdb_data.load_sync_state() == {'last_sync': '2026-01-20'}
+
+    metadata = pd.read_csv(tmp_path / 'movies_metadata.csv').set_index('id')
+    assert sorted(metadata.index) == [862, 8844]
+    assert metadata.loc[862, 'original_title'] == 'Toy Story'
+    assert metadata.loc[8844, 'overview'] == 'old'
+
+    delta_metadata = pd.read_csv(tmp_path / 'delta' / 'movies_metadata.csv')
+    assert delta_metadata['id'].tolist() == [862]
+
+
+def test_sync_keeps_watermark_when_changes_feed_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_tmdb_data, 'DATA_DIR', tmp_path)
+    monkeypatch.setattr(fetch_tmdb_data, 'SYNC_STATE_FILE', tmp_path / 'tmdb_sync_state.json')
+    monkeypatch.setattr(fetch_tmdb_data, 'DELTA_DIR', tmp_path / 'delta')
+
+    pd.DataFrame([{'id': 862, 'original_title': 'Toy Story (old)', 'overview': 'old'}]).to_csv(
+        tmp_path / 'movies_metadata.csv', index=False)
+    fetch_tmdb_data.save_sync_state(date(2026, 1, 1))
+
+    with MockTMDBServer() as server:
+        server.changes = [862]
+        server.broken.add('/3/movie/changes')
+        client = TMDBClient('test-key', base_url=server.base_url, rate_limit=1000,
+                            max_retries=1, backoff=0)
+        assert fetch_tmdb_data.sync_catalog(client, today=date(2026, 1, 20)) is None
+        # Se reintentó y no se llegó a pedir ninguna película
+        assert server.count(r'/movie/changes') == 2
+        assert server.count(r'^/3/movie/\d+$') == 0
+
+    assert fetch_tmdb_data.load_sync_state() == {'last_sync': '2026-01-01'}
+    assert not (tmp_path / 'delta').exists()
+    assert pd.read_csv(tmp_path / 'movies_metadata.csv').loc[0, 'original_title'] == 'Toy Story (old)'
@@ -0,0 +1,58 @@
+"""
+Test del índice difuso de títulos y reparto (ruta rápida)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pandas as pd
+
+from fuzzy_index import FuzzyIndex, build_fuzzy_index
+
+MOVIES = pd.DataFrame({
+    'id': [862, 863, 8844, 694],
+    'title': ['Toy Story', 'Toy Story 2', 'Jumanji', 'The Shining'],
+    'cast_text': ['Tom Hanks, Tim Allen', 'Tom Hanks, Joan Cusack', 'Robin Williams', 'Jack Nicholson'],
+    'genres_text': ['Animation, Family', 'Animation', 'Adventure, Family', 'Horror'],
+})
+METADATAS = [{'title': t, 'rating': r} for t, r in zip(MOVIES['title'], [4.0, 3.5, 3.2, 4.2])]
+
+
+def build(tmp_path):
+    build_fuzzy_index(MOVIES, METADATAS, path=str(tmp_path / 'fuzzy.pkl'))
+    return FuzzyIndex.load(str(tmp_path / 'fuzzy.pkl'))
+
+
+def test_misspelled_titles_and_people_hit(tmp_path):
+    index = build(tmp_path)
+
+    match = index.lookup('Jumangi')
+    assert match['kind'] == 'title'
+    assert [movie_id for movie_id, _ in match['results']] == ['8844']
+
+    match = index.lookup('toy stroy')
+    assert [movie_id for movie_id, _ in match['results']] == ['862', '863']
+
+    match = index.lookup('tom hanx')
+    assert match['kind'] == 'person'
+    assert match['results'][0][0] == '862'
+
+    assert index.lookup('shining')['name'] == 'The Shining'
+
+
+def test_thematic_queries_fall_through(tmp_path):
+    index = build(tmp_path)
+    assert index.lookup('película de terror') is None
+    assert index.lookup('horror') is None
+    assert index.lookup('animation family') is None
+    assert index.lookup('robin') is None
+
+
+def test_stats_track_hit_rate(tmp_path):
+    index = build(tmp_path)
+    index.lookup('Jumanji')
+    index.lookup('comedia romántica')
+    assert index.stats['lookups'] == 2
+    assert index.stats['hits'] == 1
+    assert index.hit_rate() == 0.5
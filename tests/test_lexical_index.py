@@ -0,0 +1,43 @@
+"""
+Test del índice léxico BM25 y de la fusión RRF
+"""
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from lexical_index import BM25Index, reciprocal_rank_fusion
+
+IDS = ['862', '8844', '694']
+TITLES = ['Toy Story', 'Jumanji', 'The Shining']
+TEXTS = [
+    'Toy Story. Toys come alive. Esta es una película de Animation. Protagonizada por Tom Hanks.',
+    'Jumanji. A magical board game. Esta es una película de Adventure. Protagonizada por Robin Williams.',
+    'The Shining. A writer goes mad in a hotel. Esta es una película de Horror. Protagonizada por Jack Nicholson.',
+]
+
+
+def test_title_and_cast_queries_rank_the_right_film_first():
+    index = BM25Index(IDS, TITLES, TEXTS)
+    assert index.search('Jumanji')[0][0] == '8844'
+    assert index.search('tom hanks')[0][0] == '862'
+    assert index.search('película de horror')[0][0] == '694'
+    assert index.search('zzz') == []
+
+
+def test_exact_title_match_ignores_case_and_accents():
+    index = BM25Index(IDS, ['Toy Story', 'Júmanji', 'The Shining'], TEXTS)
+    assert index.exact_title_match('  jumanji ') == '8844'
+    assert index.exact_title_match('Toy') is None
+
+    # Un índice guardado antes del diccionario de títulos se completa al cargarlo
+    del index.title_ids
+    index.norm_titles = ['toy story', 'jumanji', 'the shining']
+    loaded = pickle.loads(pickle.dumps(index))
+    assert loaded.exact_title_match('JUMANJI') == '8844' and not hasattr(loaded, 'norm_titles')
+
+
+def test_rrf_rewards_documents_ranked_in_both_lists():
+    fused = reciprocal_rank_fusion([['a', 'b', 'c'], ['b', 'd']])
+    assert [doc_id for doc_id, _ in fused][:2] == ['b', 'a']
@@ -0,0 +1,63 @@
+"""
+Test de los presupuestos de latencia y el circuit breaker del LLM
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+from llm_guard import CircuitBreaker, LLMGuard, LLMUnavailable
+
+
+def fail():
+    raise ConnectionError("upstream 500")
+
+
+def test_budget_bounds_latency():
+    guard = LLMGuard(CircuitBreaker(failure_threshold=5))
+    assert guard.call(lambda: "ok", budget_ms=1000) == "ok"
+
+    start = time.perf_counter()
+    with pytest.raises(LLMUnavailable, match="sin respuesta"):
+        guard.call(lambda: time.sleep(0.5), budget_ms=50)
+    assert time.perf_counter() - start < 0.3
+
+    with pytest.raises(LLMUnavailable, match="ConnectionError"):
+        guard.call(fail, budget_ms=1000)
+    assert guard.stats == {'calls': 3, 'timeouts': 1, 'errors': 1, 'rejected': 0}
+    assert guard.breaker.failures == 2
+
+
+def test_circuit_opens_and_recovers():
+    guard = LLMGuard(CircuitBreaker(failure_threshold=2, reset_timeout=0.1))
+    for _ in range(2):
+        with pytest.raises(LLMUnavailable):
+            guard.call(fail, budget_ms=1000)
+    assert guard.breaker.state == 'open'
+
+    # Abierto: no se llama al LLM
+    calls = []
+    with pytest.raises(LLMUnavailable, match="circuito abierto"):
+        guard.call(lambda: calls.append(1), budget_ms=1000)
+    assert calls == [] and guard.stats['rejected'] == 1
+
+    # Una prueba fallida lo vuelve a abrir; una correcta lo cierra
+    time.sleep(0.15)
+    with pytest.raises(LLMUnavailable):
+        guard.call(fail, budget_ms=1000)
+    assert guard.breaker.state == 'open'
+    time.sleep(0.15)
+    assert guard.call(lambda: "ok", budget_ms=1000) == "ok"
+    assert guard.breaker.state == 'closed' and guard.health()['circuit_opened'] == 2
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == 'half_open'
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
@@ -0,0 +1,48 @@
+"""
+Test de las recomendaciones del LLM a través del router de modelos
+"""
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import llm_integration
+from llm_guard import LLMGuard
+from llm_router import LLMRouter, Route
+
+MOVIES = [{'title': 'Toy Story', 'overview': 'Los juguetes cobran vida.', 'genres': 'Animation'}]
+
+
+def fake_client(replies, calls):
+    def create(model, **kwargs):
+        calls.append(model)
+        text, finish_reason = replies[model]
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text), finish_reason=finish_reason)],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=kwargs['max_tokens']))
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def test_truncated_reasoning_falls_back_to_next_model(monkeypatch):
+    calls = []
+    replies = {
+        # Se agota max_tokens dentro del <think>: no queda respuesta
+        'deepseek-ai/deepseek-r1': ("<think>Primero analizo las películas y", 'length'),
+        'meta/llama-3.3-70b-instruct': ("Empieza por Toy Story.", 'stop'),
+    }
+    router = LLMRouter({'enrich': [Route('deepseek-ai/deepseek-r1', None),
+                                   Route('meta/llama-3.3-70b-instruct', None)]}, guard=LLMGuard())
+    monkeypatch.setattr(llm_integration, 'get_llm_client', lambda: fake_client(replies, calls))
+    monkeypatch.setattr(llm_integration, 'LLM_ROUTER', router)
+
+    text = llm_integration.enrich_movie_recommendations("juguetes que cobran vida", MOVIES, budget_ms=5000)
+
+    assert text == "Empieza por Toy Story."
+    assert calls == ['deepseek-ai/deepseek-r1', 'meta/llama-3.3-70b-instruct']
+    summary = router.summary()['enrich']
+    assert summary['deepseek-ai/deepseek-r1']['errors'] == 1
+    assert summary['deepseek-ai/deepseek-r1']['ok'] == 0
+    assert summary['meta/llama-3.3-70b-instruct']['fallbacks'] == 1
+    # El fallo cuenta en el circuit breaker del modelo de razonamiento
+    assert router.guard.breaker_for('deepseek-ai/deepseek-r1').failures == 1
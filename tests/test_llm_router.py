@@ -0,0 +1,65 @@
+"""
+Test del enrutado de tareas del LLM con cadenas de fallback
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+from llm_guard import CircuitBreaker, LLMGuard, LLMUnavailable
+from llm_router import LLMRouter, Route, parse_routes
+
+
+def response(text, completion_tokens):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+                           usage=SimpleNamespace(prompt_tokens=10, completion_tokens=completion_tokens))
+
+
+def test_parse_routes():
+    assert parse_routes("meta/llama-3.1-8b-instruct:800, deepseek-ai/deepseek-r1,") == [
+        Route('meta/llama-3.1-8b-instruct', 800.0), Route('deepseek-ai/deepseek-r1', None)]
+
+
+def test_fallback_chain_and_accounting():
+    calls = []
+
+    def call(model, timeout):
+        calls.append((model, round(timeout, 1)))
+        if model == 'rapido':
+            time.sleep(0.3)
+        if model == 'roto':
+            raise ConnectionError("502")
+        return response("ES: a\nEN: b", 20 if model == 'reserva' else 300)
+
+    guard = LLMGuard(CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    router = LLMRouter({'expand': [Route('rapido', 100), Route('roto', None), Route('reserva', None)]}, guard)
+
+    result, model = router.complete('expand', call, budget_ms=1000)
+    assert model == 'reserva' and result.usage.completion_tokens == 20
+    # El primero tiene su propio timeout; los demás, lo que queda del presupuesto
+    assert calls[0] == ('rapido', 0.1) and calls[2][1] <= 0.9
+
+    stats = router.summary()['expand']
+    assert stats['rapido']['timeouts'] == 1 and stats['roto']['errors'] == 1
+    assert stats['reserva']['ok'] == 1 and stats['reserva']['fallbacks'] == 1
+    assert stats['reserva']['completion_tokens'] == 20 and stats['reserva']['p50_ms'] is not None
+
+    # Con su circuito abierto, los modelos que fallan se saltan sin llamarlos
+    router.complete('expand', call, budget_ms=1000)
+    calls.clear()
+    router.complete('expand', call, budget_ms=1000)
+    assert [model for model, _ in calls] == ['reserva']
+    assert router.summary()['expand']['roto']['rejected'] == 1
+
+
+def test_budget_exhausted():
+    router = LLMRouter({'enrich': [Route('lento', None), Route('reserva', None)]}, LLMGuard())
+    start = time.perf_counter()
+    with pytest.raises(LLMUnavailable) as error:
+        router.complete('enrich', lambda model, timeout: time.sleep(0.5), budget_ms=100)
+    assert error.value.reason == 'timeout' and time.perf_counter() - start < 0.3
+    assert 'reserva' not in router.summary()['enrich']
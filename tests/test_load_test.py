@@ -0,0 +1,57 @@
+"""
+Test del LLM simulado y del generador de carga
+"""
+import json
+import os
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from load_test import run_level
+from stub_llm import StubLLMServer
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return response.read().decode()
+
+
+def test_stub_llm_latency_and_variants():
+    with StubLLMServer(ttft_ms=50, tokens_per_s=200, output_tokens=20, jitter=0) as stub:
+        url = stub.base_url + "/chat/completions"
+
+        start = time.perf_counter()
+        body = json.loads(post(url, {'model': 'm', 'max_tokens': 200, 'messages': [
+            {'role': 'user', 'content': 'Reescribe...\n\nConsulta: "terror en un hotel"\n\nES: ...\nEN: ...'}]}))
+        content = body['choices'][0]['message']['content']
+        assert content.startswith("ES: terror en un hotel") and "\nEN: terror en un hotel" in content
+
+        body = json.loads(post(url, {'model': 'm', 'max_tokens': 10, 'messages': [
+            {'role': 'user', 'content': 'Recomienda algo'}]}))
+        assert body['usage']['completion_tokens'] == 10
+        # Dos respuestas: 2 x 50 ms hasta el primer token + los tokens a 5 ms
+        assert time.perf_counter() - start >= 0.1 + 0.005 * 9
+
+        stream = post(url, {'model': 'm', 'max_tokens': 3, 'stream': True,
+                            'messages': [{'role': 'user', 'content': 'hola'}]})
+        chunks = [json.loads(line[6:]) for line in stream.splitlines()
+                  if line.startswith('data: {')]
+        assert len(chunks) == 3 and stream.rstrip().endswith('data: [DONE]')
+        assert stub.stats['requests'] == 3
+
+
+def test_run_level_counts_requests_and_errors():
+    def call(query):
+        time.sleep(0.01)
+        if query == 'falla':
+            raise RuntimeError("boom")
+
+    result = run_level(call, ['a', 'b', 'falla', 'c'], concurrency=4, requests=20)
+    assert result['requests'] == 20 and result['errors'] == 5
+    assert result['first_error'] == "RuntimeError: boom"
+    assert result['qps'] > 0 and result['p50'] >= 10
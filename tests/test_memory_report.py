@@ -0,0 +1,88 @@
+"""
+Test de la contabilidad de memoria por componente
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+import memory_report
+from memory_report import MB, MemoryMonitor, deep_sizeof, estimate_sizeof
+
+
+class Holder:
+    def __init__(self, data, owner=None):
+        self.data = data
+        self.owner = owner
+
+
+def test_sizes():
+    array = np.zeros((1000, 16), dtype=np.float32)
+    assert deep_sizeof(array) >= array.nbytes
+    # Las vistas no vuelven a contar el buffer, y los objetos compartidos se excluyen
+    assert deep_sizeof(array[:10]) < 1000
+    shared = Holder(np.zeros(100000))
+    items = [Holder(i, owner=shared) for i in range(100)]
+    assert deep_sizeof(items[0]) > 800000
+    assert deep_sizeof(items[0], exclude=(shared,)) < 2000
+
+    exact = sum(deep_sizeof(item, exclude=(shared,)) for item in items)
+    estimate = estimate_sizeof(items, sample=10, exclude=(shared,))
+    assert abs(estimate - exact) / exact < 0.2
+    assert estimate_sizeof([]) == 0
+
+
+def test_components_and_budgets(capsys):
+    monitor = MemoryMonitor(interval=0)
+    calls = []
+    monitor.register('estático', lambda: calls.append(1) or 2 * MB, static=True)
+    cache = []
+    monitor.register('caché', lambda: len(cache) * MB, budget_mb=3)
+
+    snapshot = monitor.snapshot()
+    assert snapshot['components'] == {'estático': 2.0, 'caché': 0.0}
+    assert snapshot['over_budget'] == [] and snapshot['rss_mb'] > 0
+
+    # El aviso solo se imprime al pasar a estar por encima del presupuesto
+    cache.extend(range(5))
+    assert monitor.snapshot()['over_budget'] == [{'name': 'caché', 'mb': 5.0, 'budget_mb': 3}]
+    monitor.snapshot()
+    assert capsys.readouterr().out.count('🚨') == 1
+    cache.clear()
+    monitor.snapshot()
+    cache.extend(range(5))
+    monitor.snapshot()
+    assert capsys.readouterr().out.count('🚨') == 1
+    assert len(calls) == 1
+
+    report = monitor.report()
+    assert report['samples'] == 6 and monitor.last is report
+
+
+def test_load_steps_and_sessions():
+    monitor = MemoryMonitor(interval=0)
+    ballast = np.ones(20 * MB // 8)
+    monitor.mark('carga')
+    assert monitor.load_steps[0][0] == 'carga' and monitor.load_steps[0][1] > 10
+
+    engine = Holder(ballast)
+    monitor.track_session('a', {'results': list(range(1000)), 'engine': engine}, exclude=(engine,))
+    monitor.track_session('b', {'results': []})
+    assert 0 < monitor.sessions_bytes() < MB
+    # Las sesiones sin actividad durante SESSION_TTL dejan de contarse
+    monitor.sessions['a'] = (0, monitor.sessions['a'][1])
+    monitor.sessions_bytes()
+    assert list(monitor.sessions) == ['b']
+
+
+def test_rss_without_proc_or_resource(monkeypatch):
+    # Windows: ni /proc ni el módulo resource -> 0, sin romper el arranque
+    def no_proc(*args, **kwargs):
+        raise OSError("sin /proc")
+
+    monkeypatch.setattr(memory_report, 'open', no_proc, raising=False)
+    assert memory_report.process_rss_bytes() > 0
+    monkeypatch.setitem(sys.modules, 'resource', None)
+    assert memory_report.process_rss_bytes() == 0
@@ -0,0 +1,45 @@
+"""
+Test de las trazas y métricas de latencia por etapa
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from metrics import Histogram, Metrics
+from search_fakes import make_engine
+
+
+def test_histogram_quantiles_and_prometheus():
+    histogram = Histogram(buckets=(10, 100))
+    for value in [1] * 90 + [50] * 9 + [500]:
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == pytest.approx(10 * 50 / 90)
+    assert 10 < histogram.quantile(0.95) <= 100
+    assert histogram.quantile(0.999) == 100
+
+    metrics = Metrics(buckets=(10, 100), log_interval=0)
+    with pytest.raises(ValueError), metrics.span('encode'):
+        raise ValueError("boom")
+    metrics.observe('encode', 5)
+    text = metrics.prometheus()
+    assert 'search_stage_duration_seconds_bucket{stage="encode",le="0.01"} 2' in text
+    assert 'search_stage_duration_seconds_count{stage="encode"} 2' in text
+    assert 'search_stage_errors_total{stage="encode"} 1' in text
+
+
+def test_search_records_stage_spans():
+    engine = make_engine()
+    engine.metrics = Metrics(log_interval=0)
+
+    response = engine.search("toy story", expand=False)
+    stages = [span['stage'] for span in response['timings']]
+    assert stages == ['result_cache', 'encode', 'lexical', 'db_query', 'fuse', 'rerank', 'search']
+    assert all(span['outcome'] == 'ok' for span in response['timings'])
+
+    engine.search("toy story", expand=False)
+    summary = engine.metrics.summary()
+    assert summary['search']['count'] == 1 and summary['search_cached']['count'] == 1
+    assert summary['encode']['p99'] is not None
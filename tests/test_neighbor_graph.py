@@ -0,0 +1,53 @@
+"""
+Test del grafo precalculado de películas similares
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from neighbor_graph import NeighborGraph, build_neighbor_graph, update_neighbor_graph
+
+RNG = np.random.default_rng(7)
+IDS = [str(i) for i in range(300)]
+EMBEDDINGS = RNG.normal(size=(300, 16)).astype(np.float32)
+
+
+def brute_force(embeddings, k):
+    matrix = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    sims = matrix @ matrix.T
+    np.fill_diagonal(sims, -np.inf)
+    return np.argsort(-sims, axis=1)[:, :k]
+
+
+def test_blocked_build_matches_brute_force(tmp_path):
+    graph = build_neighbor_graph(IDS, EMBEDDINGS, k=5, block_size=64)
+    assert (graph.neighbors == brute_force(EMBEDDINGS, 5)).all()
+
+    path = str(tmp_path / 'neighbors.npz')
+    graph.save(path)
+    loaded = NeighborGraph.load(path)
+    assert loaded.similar('0', 3) == graph.similar('0', 3)
+    assert len(loaded.similar('0')) == 5
+    assert loaded.similar('desconocida') == []
+
+
+def test_incremental_update_matches_full_rebuild():
+    graph = build_neighbor_graph(IDS, EMBEDDINGS, k=5, block_size=64)
+
+    # Se eliminan 10 películas, se actualizan 10 y se añaden 20
+    embeddings = EMBEDDINGS.copy()
+    embeddings[10:20] = RNG.normal(size=(10, 16))
+    new_ids = [f"n{i}" for i in range(20)]
+    ids = IDS[10:] + new_ids
+    embeddings = np.vstack([embeddings[10:], RNG.normal(size=(20, 16)).astype(np.float32)])
+
+    updated = update_neighbor_graph(graph, ids, embeddings, changed_ids=IDS[10:20], k=5, block_size=64)
+    full = build_neighbor_graph(ids, embeddings, k=5)
+
+    assert list(updated.ids) == ids
+    for movie_id in ids:
+        assert {n for n, _ in updated.similar(movie_id)} == {n for n, _ in full.similar(movie_id)}
+    assert not any(n in IDS[:10] for movie_id in ids for n, _ in updated.similar(movie_id))
@@ -0,0 +1,85 @@
+"""
+Test del perfilado bajo demanda de búsquedas
+"""
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import profiling
+from metrics import Metrics
+from profiling import RateLimiter, maybe_profile, resolve_mode
+
+
+def slow_stage(metrics):
+    with metrics.span('encode'):
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+
+
+def test_modes_and_rate_limit(monkeypatch):
+    monkeypatch.setattr(profiling, 'SEARCH_PROFILE', '')
+    assert resolve_mode() is None and resolve_mode('0') is None
+    assert resolve_mode('1') == 'sample' and resolve_mode('cProfile') == 'cprofile'
+
+    limiter = RateLimiter(2, window=60)
+    assert [limiter.allow() for _ in range(3)] == [True, True, False]
+
+    with maybe_profile("sin perfilar") as session:
+        pass
+    assert session is None
+
+
+def test_profiles_are_saved_with_timings(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiling, '_limiter', RateLimiter(10))
+    metrics = Metrics(log_interval=0)
+
+    with maybe_profile("terror en un hotel", 'sample', metrics) as session:
+        slow_stage(metrics)
+    collapsed = open(session.path).read()
+    assert session.path.endswith('.collapsed') and 'request;' in collapsed and 'slow_stage' in collapsed
+    info = json.load(open(session.path.replace('.collapsed', '.json')))
+    assert info['query'] == "terror en un hotel" and info['samples'] > 0
+    assert [span['stage'] for span in info['timings']] == ['encode']
+
+    with maybe_profile("comedia", 'cprofile', metrics) as session:
+        slow_stage(metrics)
+    stats = pstats.Stats(session.path)
+    assert any(func[2] == 'slow_stage' for func in stats.stats)
+
+
+def test_concurrent_cprofile_falls_back_to_sampling(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiling, '_limiter', RateLimiter(10))
+    metrics = Metrics(log_interval=0)
+    started, release = threading.Event(), threading.Event()
+    sessions = {}
+
+    def first_request():
+        with maybe_profile("primera", 'cprofile', metrics) as session:
+            started.set()
+            release.wait(5)
+        sessions['first'] = session
+
+    thread = threading.Thread(target=first_request)
+    thread.start()
+    assert started.wait(5)
+    try:
+        with maybe_profile("segunda", 'cprofile', metrics) as session:
+            slow_stage(metrics)
+    finally:
+        release.set()
+        thread.join()
+
+    assert session.mode == 'sample' and session.path.endswith('.collapsed')
+    assert sessions['first'].mode == 'cprofile' and sessions['first'].path.endswith('.prof')
+    # Al terminar la primera, cProfile vuelve a estar libre
+    with maybe_profile("tercera", 'cprofile', metrics) as session:
+        pass
+    assert session.mode == 'cprofile'
@@ -0,0 +1,77 @@
+"""
+Test de la extracción de restricciones y del índice de filtros
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from query_filters import build_filter_index, build_where, parse_constraints
+
+METADATAS = [
+    {'genres_text': 'Horror, Thriller', 'year': 1980, 'rank_rating': 4.2, 'vote_count': 900},
+    {'genres_text': 'Horror', 'year': 1996, 'rank_rating': 3.6, 'vote_count': 400},
+    {'genres_text': 'Horror, Mystery', 'year': 1999, 'rank_rating': 3.1, 'vote_count': 300},
+    {'genres_text': 'Comedy, Romance', 'year': 1993, 'rank_rating': 3.8, 'vote_count': 200},
+    {'genres_text': 'Animation, Family', 'year': 0, 'rank_rating': 4.0, 'vote_count': 0},
+]
+IDS = ['694', '4232', '2108', '9268', '862']
+
+
+def test_parse_constraints():
+    c = parse_constraints("película de terror psicológica de los 90")
+    assert c == {'genres': ['Horror'], 'year_range': (1990, 1999), 'min_rating': None}
+
+    c = parse_constraints("Comedia romántica de los años ochenta bien valorada")
+    assert c['genres'] == ['Comedy', 'Romance']
+    assert c['year_range'] == (1980, 1989)
+    assert c['min_rating'] is not None
+
+    assert parse_constraints("sci-fi from the 1970s")['year_range'] == (1970, 1979)
+    assert parse_constraints("thriller entre 2005 y 2001")['year_range'] == (2001, 2005)
+    assert parse_constraints("una película triste sobre pérdida") == {
+        'genres': [], 'year_range': None, 'min_rating': None
+    }
+
+
+def test_counts_titles_and_plurals_are_not_false_constraints():
+    # Recuentos, no décadas
+    assert parse_constraints("las 10 mejores películas de terror") == {
+        'genres': ['Horror'], 'year_range': None, 'min_rating': None
+    }
+    assert parse_constraints("los 50 mejores thrillers") == {
+        'genres': ['Thriller'], 'year_range': None, 'min_rating': None
+    }
+    # Un sustantivo de género dentro de un título no es un filtro
+    assert parse_constraints("la guerra de las galaxias")['genres'] == []
+    assert parse_constraints("star wars")['genres'] == []
+    assert parse_constraints("películas de guerra")['genres'] == ['War']
+
+    assert parse_constraints("comedias de los 80s") == {
+        'genres': ['Comedy'], 'year_range': (1980, 1989), 'min_rating': None
+    }
+    assert parse_constraints("westerns de los '60s")['year_range'] == (1960, 1969)
+    assert parse_constraints("thriller de la década de los 70")['year_range'] == (1970, 1979)
+
+
+def test_build_where():
+    assert build_where(parse_constraints("algo bonito")) is None
+    assert build_where(parse_constraints("terror")) == {'genre_horror': True}
+    where = build_where(parse_constraints("ciencia ficción de los 80"))
+    assert where == {'$and': [
+        {'genre_science_fiction': True},
+        {'year': {'$gte': 1980}},
+        {'year': {'$lte': 1989}},
+    ]}
+
+
+def test_filter_index(tmp_path):
+    index = build_filter_index(IDS, METADATAS, path=str(tmp_path / 'filters.pkl'))
+
+    assert index.matching_ids(parse_constraints("sin restricciones")) is None
+    assert index.matching_ids(parse_constraints("terror de los 90")) == {'4232', '2108'}
+    assert index.matching_ids(parse_constraints("terror de los 90 bien valorada")) == {'4232'}
+    assert index.matching_ids(parse_constraints("terror de 1980")) == {'694'}
+    assert index.matching_ids(parse_constraints("western")) == set()
+    # Las películas sin año nunca cumplen un filtro de década
+    assert index.matching_ids(parse_constraints("animación de los 2000")) == set()
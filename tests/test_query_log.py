@@ -0,0 +1,94 @@
+"""
+Test del registro de búsquedas y del calentamiento de la caché
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from query_log import CacheWarmer, QueryLog, read_query_log, top_queries
+from search_fakes import make_engine
+
+
+def test_searches_are_logged_off_the_request_path(tmp_path):
+    engine = make_engine()
+    engine.query_log = QueryLog(str(tmp_path / 'queries.jsonl'))
+
+    engine.search("Juguetes  que cobran VIDA", expand=False)
+    engine.search("juguetes que cobran vida", expand=False)
+    engine.search("Jumanji", expand=False, log=False)
+    engine.query_log.flush()
+
+    entries = list(read_query_log(str(tmp_path / 'queries.jsonl')))
+    assert [e['q'] for e in entries] == ["juguetes que cobran vida"] * 2
+    assert [e['raw'] for e in entries] == ["Juguetes  que cobran VIDA", "juguetes que cobran vida"]
+    assert [e['cached'] for e in entries] == [False, True]
+    assert '862' in entries[0]['ids'] and entries[0]['expand'] is False
+    assert 'encode' in entries[0]['stages'] and entries[0]['ms'] > 0
+    assert engine.health()['query_log'] == {'written': 2, 'dropped': 0, 'errors': 0}
+
+
+def test_read_skips_corrupt_lines_and_rotates(tmp_path):
+    path = str(tmp_path / 'queries.jsonl')
+    with open(path + '.1', 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'ts': 1.0, 'q': 'antigua'}) + '\n')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'ts': time.time(), 'q': 'reciente'}) + '\n{"ts": 2, "q": "cort')
+
+    assert [e['q'] for e in read_query_log(path)] == ['antigua', 'reciente']
+    assert [e['q'] for e in read_query_log(path, since=time.time() - 60)] == ['reciente']
+
+    entries = [{'q': 'terror', 'expand': True}] * 3 + [{'q': 'comedia', 'expand': True}, {'q': ''}]
+    assert top_queries(entries, 1) == [(('terror', True), 3)]
+
+    # Al superar el tamaño máximo, el archivo pasa a .1
+    log = QueryLog(path, max_bytes=1)
+    log._write([{'ts': time.time(), 'q': 'nueva'}])
+    assert [e['q'] for e in read_query_log(path)] == ['reciente', 'nueva']
+
+
+def test_cache_warmer_replays_top_queries(tmp_path):
+    path = str(tmp_path / 'queries.jsonl')
+    engine = make_engine()
+    engine.query_log = QueryLog(path)
+    for query in ["juguetes que cobran vida", "juguetes que cobran vida", "jumanji selva", "hotel aislado"]:
+        engine.search(query, expand=False)
+    engine.query_log.flush()
+
+    # Tras un reinicio la caché está vacía: se repiten las 2 más frecuentes
+    engine = make_engine()
+    warmer = CacheWarmer(engine, QueryLog(path), top_n=2)
+    stats = warmer.warm()
+    assert stats['queries'] == 2 and stats['warmed'] == 2 and stats['failed'] == 0
+    assert engine.search("Juguetes que cobran vida", expand=False)['cached']
+    assert not engine.search("hotel aislado", expand=False)['cached']
+    # El calentamiento no se registra como búsqueda
+    assert len(list(read_query_log(path))) == 4
+
+    assert warmer.warm()['cached'] == 2
+
+
+def test_cache_warmer_replays_the_raw_query(tmp_path):
+    path = str(tmp_path / 'queries.jsonl')
+    entries = [{'ts': time.time(), 'q': 'pelicula de terror psicologica', 'raw': raw, 'expand': True}
+               for raw in ("película de terror psicológica", "Película de TERROR psicológica")]
+    entries.append({'ts': time.time(), 'q': 'jumanji', 'expand': False})
+    QueryLog(path)._write(entries)
+
+    # Se agrupa por la query normalizada y se repite la forma original más reciente
+    assert top_queries(read_query_log(path)) == [
+        (("Película de TERROR psicológica", True), 2), (('jumanji', False), 1)]
+
+    engine = make_engine()
+    replayed = []
+    search = engine.search
+
+    def spy(query, **kwargs):
+        replayed.append(query)
+        return search(query, **kwargs)
+
+    engine.search = spy
+    CacheWarmer(engine, QueryLog(path), top_n=2).warm()
+    assert replayed == ["Película de TERROR psicológica", 'jumanji']
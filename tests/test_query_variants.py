@@ -0,0 +1,35 @@
+"""
+Test del parseo de variantes de la query generadas por el LLM
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from llm_integration import parse_query_variants, strip_reasoning
+
+
+def test_parse_query_variants():
+    response = """<think>El usuario quiere terror psicológico.</think>
+ES: Película de terror psicológico con tensión, paranoia y locura
+**EN**: "Psychological horror movie with tension, paranoia and madness"
+"""
+    assert parse_query_variants(response, "terror psicológico") == [
+        "terror psicológico",
+        "Película de terror psicológico con tensión, paranoia y locura",
+        "Psychological horror movie with tension, paranoia and madness",
+    ]
+
+
+def test_parse_query_variants_fallback():
+    # Respuesta sin formato, vacía o repitiendo la original: solo la original
+    assert parse_query_variants("Una expansión sin etiquetas", "comedia") == ["comedia"]
+    assert parse_query_variants(None, "comedia") == ["comedia"]
+    assert parse_query_variants("ES: Comedia\nEN: comedia", "comedia") == ["comedia"]
+    assert len(parse_query_variants("ES: a b\nEN: c d\nEN: e f", "x", max_variants=2)) == 2
+
+
+def test_strip_unclosed_reasoning():
+    # Respuesta cortada por max_tokens en mitad del razonamiento: no queda texto
+    assert strip_reasoning("<think>Primero analizo las películas") == ""
+    assert strip_reasoning("<think>ok</think>\nEmpieza por Toy Story") == "Empieza por Toy Story"
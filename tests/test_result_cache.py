@@ -0,0 +1,45 @@
+"""
+Test de la caché de resultados (LRU e invalidación por versión)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from result_cache import CollectionVersion, ResultCache, publish_collection_version
+
+CONFIG = ('model', 20, 0.6, 0.4)
+
+
+def test_normalized_key_and_lru():
+    cache = ResultCache(max_entries=2)
+    cache.put("Terror  de los 90", CONFIG, 'v1', ['694'], 'Texto')
+
+    assert cache.get("terror de los 90 ", CONFIG, 'v1') == {'results': ['694'], 'recommendation': 'Texto'}
+    assert cache.get("terror de los 90", ('model', 10, 0.6, 0.4), 'v1') is None
+
+    cache.put("comedia", CONFIG, 'v1', ['862'])
+    cache.get("Terror de los 90", CONFIG, 'v1')
+    cache.put("acción", CONFIG, 'v1', ['8844'])
+    # "comedia" era la menos usada
+    assert cache.get("comedia", CONFIG, 'v1') is None
+    assert cache.get("accion", CONFIG, 'v1') is not None
+    assert len(cache) == 2
+
+
+def test_invalidated_by_new_collection_version(tmp_path):
+    path = str(tmp_path / 'collection_version.json')
+    version = CollectionVersion(path)
+    assert version.current() is None
+
+    publish_collection_version(path)
+    v1 = version.current()
+    cache = ResultCache()
+    cache.put("jumanji", CONFIG, v1, ['8844'])
+    assert cache.get("jumanji", CONFIG, version.current()) is not None
+
+    publish_collection_version(path)
+    os.utime(path, ns=(0, 10 ** 18))  # mtime distinto aunque el reloj sea grueso
+    assert version.current() != v1
+    assert cache.get("jumanji", CONFIG, version.current()) is None
+    assert cache.stats['invalidations'] == 1
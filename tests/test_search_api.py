@@ -0,0 +1,57 @@
+"""
+Test de la API HTTP de búsqueda
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+from memory_report import MemoryMonitor
+from search_api import create_app
+from search_fakes import make_engine
+
+
+def test_endpoints():
+    engine = make_engine()
+    engine.memory = MemoryMonitor(interval=0)
+    with TestClient(create_app(engine)) as client:
+        response = client.get("/search", params={'q': 'jumanji', 'expand': 'false'})
+        assert response.status_code == 200
+        assert response.json()['results'][0]['metadata']['title'] == 'Jumanji'
+
+        response = client.get("/similar/862", params={'k': 1})
+        assert response.json() == {'id': '862', 'similar': [response.json()['similar'][0]]}
+        assert response.json()['similar'][0]['id'] == '863'
+        assert client.get("/similar/12345").status_code == 404
+
+        response = client.get("/search", params={'q': 'toy story', 'expand': 'false', 'limit': 2})
+        page = response.json()
+        assert [r['id'] for r in page['results']] == ['862', '863'] and page['has_more']
+        more = client.get("/search/more", params={'cursor': page['cursor'], 'offset': 2, 'limit': 4}).json()
+        assert len(more['results']) == 2 and not more['has_more']
+        assert client.get("/search/more", params={'cursor': 'x', 'offset': 0}).status_code == 404
+
+        assert client.get("/health").json()['movies'] == 4
+        assert 'search_stage_duration_seconds_count{stage="db_query"}' in client.get("/metrics").text
+        assert client.get("/search").status_code == 422
+
+        memory = client.get("/memory").json()
+        assert memory['components']['cursores de la API'] > 0 and memory['samples'] == 1
+
+
+def test_timeout():
+    engine = make_engine()
+    slow_search = engine.search
+    engine.search = lambda query, expand=True: (time.sleep(0.5), slow_search(query, expand))[1]
+
+    with TestClient(create_app(engine, timeout=0.1)) as client:
+        response = client.get("/search", params={'q': 'jumanji', 'expand': 'false'})
+        assert response.status_code == 504
@@ -0,0 +1,133 @@
+"""
+Test del pipeline de búsqueda extraído de app.py
+"""
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import search
+from result_cache import CollectionVersion, publish_collection_version
+from search_fakes import make_engine
+from thesaurus import ThesaurusExpander
+
+
+def test_search_and_result_cache():
+    engine = make_engine()
+
+    response = engine.search("toy story", expand=False)
+    assert response['source'] == 'semantic' and not response['cached']
+    assert [r['id'] for r in response['results']][:2] == ['862', '863']
+    assert response['variants'] == ["toy story"]
+
+    again = engine.search("  Toy   Story ", expand=False)
+    assert again['cached']
+    assert [r['id'] for r in again['results']] == [r['id'] for r in response['results']]
+    assert engine.stats['slow_searches'] == 1
+
+
+def test_similar_and_health():
+    engine = make_engine()
+
+    similar = engine.similar('862')
+    assert similar[0] == {'id': '863', 'title': 'Toy Story 2', 'score': similar[0]['score']}
+    assert engine.similar('no-existe') is None
+    assert set(engine.similar_many(['862', '694'])) == {'862', '694'}
+
+    health = engine.health()
+    assert health['status'] == 'ok' and health['movies'] == 4
+    assert health['indexes']['lexical'] and health['indexes']['neighbors']
+
+
+def test_cursor_pages_without_repeating_search(monkeypatch):
+    monkeypatch.setattr(search, 'POOL_SIZE', 2)
+    engine = make_engine()
+
+    cursor = engine.search("toy story", expand=False)['cursor']
+    first = cursor.fetch(2)
+    assert [r['id'] for r in first] == ['862', '863']
+    assert engine.collection.queries == 1 and cursor.has_more(2)
+
+    # Se agota el conjunto: se amplía en ChromaDB sin volver a codificar
+    second = cursor.page(2, 2)
+    assert engine.collection.queries == 2 and engine.encoder.stats['requests'] == 1
+    assert {r['id'] for r in second} == {'8844', '694'}
+    assert cursor.fetch(2) == first
+
+    assert cursor.page(4, 2) == [] and not cursor.has_more(4)
+
+    # La caché de resultados recrea el cursor con el conjunto ya ordenado
+    cached = engine.search("toy story", expand=False)
+    assert cached['cached'] and cached['cursor'].fetch(2) == first
+    assert engine.collection.queries == 3
+
+
+def test_degraded_llm_is_not_cached(monkeypatch):
+    engine = make_engine()
+
+    def unavailable(*args, **kwargs):
+        raise search.LLMUnavailable("sin respuesta en 1500 ms")
+
+    llm = types.SimpleNamespace(request_query_variants=unavailable, enrich_movie_recommendations=unavailable)
+    monkeypatch.setitem(sys.modules, 'llm_integration', llm)
+
+    response = engine.search("juguetes que cobran vida")
+    assert response['degraded'] == ['llm_expand'] and response['variants'] == ["juguetes que cobran vida"]
+    assert response['results']
+
+    # Con el tesauro, las variantes salen de él
+    engine.thesaurus = ThesaurusExpander()
+    response = engine.search("juguetes que cobran vida")
+    assert response['degraded'] == ['llm_expand'] and response['variants'][-1].startswith('toy')
+    assert engine.recommend(response) is None and response['degraded'] == ['llm_expand', 'enrich']
+    assert not engine.search("juguetes que cobran vida")['cached']
+
+    # Con el LLM de vuelta, la búsqueda completa sí se cachea
+    llm.request_query_variants = lambda query: [query, "Toy Story"]
+    llm.enrich_movie_recommendations = lambda query, movies: "Empieza por Toy Story"
+    response = engine.search("juguetes que cobran vida")
+    assert response['degraded'] == [] and engine.recommend(response) == "Empieza por Toy Story"
+    cached = engine.search("juguetes que cobran vida")
+    assert cached['cached'] and cached['recommendation'] == "Empieza por Toy Story"
+
+
+def test_fast_path_rating_falls_back_to_tmdb():
+    engine = make_engine()
+    unrated = {'title': 'Jumanji', 'overview': '', 'rating': 0.0, 'vote_average': 7.0}
+    engine.fuzzy_index = types.SimpleNamespace(lookup=lambda query: {
+        'kind': 'title', 'name': 'Jumanji', 'confidence': 0.95, 'results': [('8844', unrated)]})
+
+    response = engine.search("jumanji", expand=False)
+    # Misma escala que la ruta semántica: sin rating de MovieLens, el de TMDB / 2
+    assert response['source'] == 'fast_path' and response['results'][0]['rating'] == 3.5
+
+
+def test_indexes_reload_when_a_new_collection_version_is_published(tmp_path):
+    path = str(tmp_path / 'collection_version.json')
+    publish_collection_version(path)
+    stale = {'title': 'Jumanji', 'overview': '', 'rating': 4.0, 'vote_average': 7.0}
+    loads = []
+
+    def load_indexes():
+        # Tras el delta, Jumanji ya no está en el índice difuso
+        loads.append(1)
+        return {'fuzzy_index': None}
+
+    engine = make_engine()
+    engine.fuzzy_index = types.SimpleNamespace(lookup=lambda query: {
+        'kind': 'title', 'name': 'Jumanji', 'confidence': 0.95, 'results': [('8844', stale)]})
+    engine.collection_version = CollectionVersion(path)
+    engine.indexes_version = engine.collection_version.current()
+    engine.index_loader = load_indexes
+
+    assert engine.search("jumanji", expand=False)['source'] == 'fast_path'
+    assert loads == []
+
+    version = publish_collection_version(path)
+    response = engine.search("jumanji", expand=False)
+    assert response['source'] == 'semantic' and not response['cached']
+    assert engine.fuzzy_index is None and engine.indexes_version == version
+    assert engine.health()['indexes_version'] == version
+    engine.search("jumanji", expand=False)
+    assert loads == [1]
@@ -0,0 +1,49 @@
+"""
+Test de la expansión bilingüe de queries con el tesauro
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pandas as pd
+
+from thesaurus import ThesaurusExpander, build_thesaurus, catalog_vocabulary
+
+
+def test_expand_genres_and_themes():
+    expander = ThesaurusExpander()
+    variants = expander.expand("película de terror psicológica de los 90")
+    assert variants[0] == "película de terror psicológica de los 90"
+    assert 'miedo' in variants[1] and 'horror' in variants[2] and 'psychological' in variants[2]
+    assert variants[2].endswith('pelicula 90')
+
+    # Consulta en inglés: se añaden los términos en español
+    variants = expander.expand("Time travel comedy")
+    assert 'viaje en el tiempo' in variants[1] and 'comedia' in variants[1]
+
+    # Sin conceptos reconocidos (un título): solo la original
+    assert expander.expand("Jumanji") == ["Jumanji"]
+    assert expander.expand("que sea divertida")[2].startswith('comedy')
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        expander.expand("comedia romántica en París")
+    assert (time.perf_counter() - start) / 1000 < 0.001
+
+
+def test_catalog_vocabulary_ranks_terms(tmp_path):
+    df = pd.DataFrame({
+        'genres_text': ['Horror', 'Horror, Thriller', None],
+        'keywords_text': ['zombie, zombie apocalypse, fear', 'zombie apocalypse, fear', 'zombie apocalypse'],
+    })
+    vocabulary = catalog_vocabulary(df['genres_text'], df['keywords_text'])
+    assert vocabulary['zombie apocalypse'] == 3 and vocabulary['horror'] == 2
+
+    expander = build_thesaurus(df, path=str(tmp_path / 'thesaurus.pkl'))
+    # "fear" aparece en el catálogo y "scary" no: pasa delante
+    assert expander.expand("terror")[2].split()[:2] == ['horror', 'fear']
+    assert expander.expand("zombis")[2].endswith('zombie apocalypse')
+    assert ThesaurusExpander.load(str(tmp_path / 'thesaurus.pkl')).expand("zombis") == expander.expand("zombis")
+    assert ThesaurusExpander.load(str(tmp_path / 'missing.pkl')) is None
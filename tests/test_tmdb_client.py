@@ -0,0 +1,88 @@
+"""
+Test del cliente concurrente de TMDB contra un servidor local simulado
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from mock_tmdb_server import MockTMDBServer, MOVIES
+from tmdb_client import ResponseCache, TMDBClient, TMDBError, TokenBucket
+
+
+def test_map_preserves_order_under_concurrency():
+    with MockTMDBServer() as server:
+        client = TMDBClient('test-key', base_url=server.base_url, concurrency=4, rate_limit=1000)
+        ids = sorted(MOVIES) * 3
+        titles = client.map(lambda i: client.get(f"/movie/{i}")['original_title'], ids)
+        assert titles == [MOVIES[i]['title'] for i in ids]
+        assert client.request_count == len(ids)
+
+
+def test_retries_on_429_with_backoff():
+    with MockTMDBServer(fail_first=2) as server:
+        client = TMDBClient('test-key', base_url=server.base_url, rate_limit=1000, backoff=0.01)
+        data = client.get("/movie/862")
+        assert data['original_title'] == 'Toy Story'
+        assert client.request_count == 3
+
+
+def test_client_error_is_not_retried():
+    with MockTMDBServer() as server:
+        client = TMDBClient('bad-key', base_url=server.base_url, rate_limit=1000, backoff=0.01)
+        with pytest.raises(TMDBError):
+            client.get("/movie/862")
+        assert client.request_count == 1
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    # 10 tokens a 50/s -> al menos ~0.2s
+    assert time.monotonic() - start >= 0.18
+
+
+def test_response_cache_serves_fresh_entries_without_network(tmp_path):
+    with MockTMDBServer() as server:
+        cache = ResponseCache(str(tmp_path), ttl=3600)
+        client = TMDBClient('test-key', base_url=server.base_url, rate_limit=1000, cache=cache)
+        first = client.get("/movie/862", language="en-US")
+        second = client.get("/movie/862", language="en-US")
+        assert first == second
+        assert len(server.requests) == 1
+        assert client.cache_hits == 1
+
+        # Parámetros distintos son otra entrada de la caché
+        client.get("/movie/862", language="es-ES")
+        assert len(server.requests) == 2
+
+
+def test_expired_entries_are_revalidated_with_etag(tmp_path):
+    with MockTMDBServer() as server:
+        cache = ResponseCache(str(tmp_path), ttl=0)
+        client = TMDBClient('test-key', base_url=server.base_url, rate_limit=1000, cache=cache)
+        first = client.get("/movie/8844")
+        second = client.get("/movie/8844")
+        assert first == second
+        assert server.not_modified == 1
+        assert client.revalidated == 1
+
+
+def test_offline_mode_reads_recorded_cache(tmp_path):
+    with MockTMDBServer() as server:
+        cache = ResponseCache(str(tmp_path))
+        client = TMDBClient('test-key', base_url=server.base_url, rate_limit=1000, cache=cache)
+        recorded = client.get("/movie/694")
+
+    offline = TMDBClient('', base_url='http://127.0.0.1:9', cache=ResponseCache(str(tmp_path), ttl=0),
+                         offline=True)
+    assert offline.get("/movie/694") == recorded
+    assert offline.request_count == 0
+    with pytest.raises(TMDBError):
+        offline.get("/movie/862")
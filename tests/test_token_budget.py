@@ -0,0 +1,43 @@
+"""
+Test del presupuesto de tokens del prompt de recomendación
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from token_budget import (build_movies_context, estimate_tokens, output_token_limit,
+                          short_synopsis)
+
+OVERVIEW = ("Un grupo de juguetes cobra vida cuando nadie los ve. Woody, el favorito de Andy, "
+            "teme ser sustituido por Buzz Lightyear, un astronauta recién llegado. Juntos tendrán "
+            "que volver a casa antes de la mudanza, mientras huyen de Sid, el vecino que destroza juguetes.")
+
+
+def test_short_synopsis_keeps_whole_sentences():
+    assert short_synopsis("Corta.") == "Corta."
+    assert short_synopsis(OVERVIEW, 150) == (
+        "Un grupo de juguetes cobra vida cuando nadie los ve. Woody, el favorito de Andy, "
+        "teme ser sustituido por Buzz Lightyear, un astronauta recién llegado.")
+    # La primera frase no cabe: se corta en una palabra
+    synopsis = short_synopsis(OVERVIEW, 30)
+    assert synopsis == "Un grupo de juguetes cobra…" and len(synopsis) <= 30
+    assert short_synopsis(None) == ""
+
+
+def test_context_fits_the_budget():
+    movies = [{'title': f"Película {i}", 'overview': OVERVIEW * 3, 'genres': 'Animation, Comedy'}
+              for i in range(6)]
+    context = build_movies_context(movies, max_tokens=120)
+    assert context.count('\n') == 2 and context.startswith("1. Película 0 (Animation, Comedy): ")
+    assert estimate_tokens(context) <= 120
+
+    # La sinopsis precalculada tiene prioridad sobre el overview
+    movies[0]['synopsis'] = "Juguetes que cobran vida."
+    assert build_movies_context(movies[:1]) == "1. Película 0 (Animation, Comedy): Juguetes que cobran vida."
+
+
+def test_output_limit_matches_requested_length():
+    instruct = output_token_limit('meta/llama-3.3-70b-instruct', words=150)
+    assert 240 <= instruct <= 400
+    assert output_token_limit('deepseek-ai/deepseek-r1', words=150) > instruct